@@ -1,15 +1,44 @@
-from flask import Flask
+import json
+import logging
+import multiprocessing
+import os
+
+from flask import Flask, jsonify
 from flask_cors import CORS
+from app.config import Config
 from app.routes.features import features_bp
 from app.routes.search import search_bp
 from app.routes.auth import auth_bp
 from app.routes.llm import llm_bp
 from app.routes.chat import chat_bp
+from app.routes.jobs import jobs_bp
+from app.routes.metrics import metrics_bp
+from app.routes.profiling import profiling_bp
+from app.services.extraction_jobs import start_job_workers
+from app.services.image_ingest import ImageRejected
+from app.services.inference import start_inference_pool
+from app.services.ollama_residency import start_residency_manager
+from app.services.upload_manager import start_upload_gc
+
+logger = logging.getLogger(__name__)
+
 
 def create_app():
+    if not Config.CHAT_BLOB_URL_SECRET:
+        # Signed chat image URLs are the only access check on the blob
+        # endpoint; refuse to start rather than sign with a guessable key.
+        raise RuntimeError("CHAT_BLOB_URL_SECRET must be set (see backend/.env.example)")
+    if not Config.SUPABASE_JWT_SECRET:
+        logger.warning(json.dumps({"event": "auth_hs256_remote_only", "reason": "SUPABASE_JWT_SECRET is not set"}))
+
     app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
     CORS(app)
 
+    @app.errorhandler(ImageRejected)
+    def image_rejected(exc):
+        return jsonify({"error": str(exc)}), exc.status
+
     @app.get("/")
     def root():
         return {"status": "ok", "message": "VisioNiX backend is running"}
@@ -19,6 +48,17 @@ def create_app():
     app.register_blueprint(auth_bp)
     app.register_blueprint(llm_bp)
     app.register_blueprint(chat_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(profiling_bp)
+
+    # Spawned helpers (inference workers) re-import the entry module and so
+    # build an app too; only the serving process runs the background services.
+    if multiprocessing.parent_process() is None:
+        start_residency_manager()
+        start_job_workers()
+        start_inference_pool()
+        start_upload_gc()
 
     return app
 
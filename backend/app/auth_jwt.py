@@ -1,27 +1,181 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
 
 import jwt
 from flask import request, jsonify
 from functools import wraps
 
 from app.config import Config
+from app.services import metrics
 
+# Positive cache of verified claims, keyed by a hash of the token and valid
+# until the token's own `exp`, so repeat requests skip signature checks too.
+_TOKEN_CACHE: OrderedDict[str, dict] = OrderedDict()
+_TOKEN_CACHE_LOCK = Lock()
+_JWK_CLIENT: jwt.PyJWKClient | None = None
+_JWK_CLIENT_LOCK = Lock()
 
-def require_supabase_auth(f):
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        auth_header = request.headers.get("Authorization")
 
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return jsonify({"error": "Missing token"}), 401
+def extract_bearer_token(auth_header: str):
+    if not auth_header:
+        return None
 
-        token = auth_header.split(" ")[1]
+    parts = auth_header.split(" ", 1)
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return None
 
+    return parts[1]
+
+
+def _jwk_client() -> jwt.PyJWKClient:
+    # PyJWKClient caches the key set and refetches it when a token carries an
+    # unknown `kid`, which is how Supabase signing-key rotation shows up.
+    global _JWK_CLIENT
+
+    with _JWK_CLIENT_LOCK:
+        if _JWK_CLIENT is None:
+            supabase_url = (os.getenv("SUPABASE_URL") or "").rstrip("/")
+            jwks_url = os.getenv("SUPABASE_JWKS_URL") or f"{supabase_url}/auth/v1/.well-known/jwks.json"
+            _JWK_CLIENT = jwt.PyJWKClient(
+                jwks_url,
+                cache_keys=True,
+                lifespan=int(os.getenv("SUPABASE_JWKS_TTL_SECONDS", "600")),
+            )
+        return _JWK_CLIENT
+
+
+def _cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _cached_claims(token: str) -> dict | None:
+    key = _cache_key(token)
+    with _TOKEN_CACHE_LOCK:
+        claims = _TOKEN_CACHE.get(key)
+        if claims is None:
+            return None
+        if claims.get("exp", 0) <= time.time():
+            del _TOKEN_CACHE[key]
+            return None
+        _TOKEN_CACHE.move_to_end(key)
+        return claims
+
+
+def _cache_claims(token: str, claims: dict) -> None:
+    max_entries = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "2048"))
+    with _TOKEN_CACHE_LOCK:
+        _TOKEN_CACHE[_cache_key(token)] = claims
+        while len(_TOKEN_CACHE) > max_entries:
+            _TOKEN_CACHE.popitem(last=False)
+
+
+def verify_access_token(token: str) -> dict:
+    """Verify a Supabase access token locally and return its claims.
+
+    HS256 tokens are checked against the project's JWT secret; asymmetric
+    tokens against the project's JWKS. Without SUPABASE_JWT_SECRET there is
+    nothing to check an HS256 signature against, so GoTrue verifies those
+    tokens instead. Raises jwt.InvalidTokenError.
+    """
+    claims = _cached_claims(token)
+    metrics.count_cache("auth_token", claims is not None)
+    if claims is not None:
+        return claims
+
+    algorithm = jwt.get_unverified_header(token).get("alg")
+    options = {"require": ["exp", "sub"]}
+    if algorithm == Config.SUPABASE_JWT_ALGORITHM and not Config.SUPABASE_JWT_SECRET:
+        _verify_remote(token)
+        claims = jwt.decode(
+            token,
+            algorithms=[algorithm],
+            audience=Config.SUPABASE_JWT_AUDIENCE,
+            options={**options, "verify_signature": False, "verify_exp": True, "verify_aud": True},
+        )
+        _cache_claims(token, claims)
+        return claims
+    if algorithm == Config.SUPABASE_JWT_ALGORITHM:
+        key = Config.SUPABASE_JWT_SECRET
+    elif algorithm in ("RS256", "ES256"):
+        key = _jwk_client().get_signing_key_from_jwt(token).key
+    else:
+        raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {algorithm}")
+
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=Config.SUPABASE_JWT_AUDIENCE,
+        options=options,
+    )
+    _cache_claims(token, claims)
+    return claims
+
+
+def _verify_remote(token: str) -> None:
+    # Imported lazily: only revocation-sensitive routes pay for the Supabase client.
+    from supabase import AuthApiError
+
+    from app.services.supabase_client import get_supabase_client
+
+    try:
+        user_response = get_supabase_client().auth.get_user(token)
+    except AuthApiError as exc:
+        raise jwt.InvalidTokenError(str(exc)) from exc
+    if not user_response.user:
+        raise jwt.InvalidTokenError("Invalid user session")
+
+
+def authenticate_request(remote_check: bool = False):
+    """Return (claims, None) for a valid bearer token, else (None, error response)."""
+    token = extract_bearer_token(request.headers.get("Authorization", ""))
+    if not token:
+        return None, (jsonify({"error": "Bearer token is required"}), 401)
+    if not isinstance(token, str) or token.count(".") != 2:
+        return None, (jsonify({"error": "Malformed access token"}), 401)
+
+    try:
+        claims = verify_access_token(token)
+    except jwt.PyJWKClientError as exc:
+        return None, (jsonify({"error": f"unable to load signing keys: {exc}"}), 503)
+    except jwt.InvalidTokenError as exc:
+        return None, (jsonify({"error": f"Invalid token: {exc}"}), 401)
+    except Exception as exc:
+        # Only reachable through the GoTrue fallback: the auth server is down.
+        return None, (jsonify({"error": f"unable to verify token: {exc}"}), 503)
+
+    if remote_check or os.getenv("AUTH_ALWAYS_REMOTE_CHECK", "false").lower() == "true":
         try:
-            decoded = jwt.decode(token, Config.SUPABASE_JWT_SECRET, algorithms=[Config.SUPABASE_JWT_ALGORITHM])
-        except Exception:
-            return jsonify({"error": "Invalid token"}), 401
+            _verify_remote(token)
+        except jwt.InvalidTokenError as exc:
+            return None, (jsonify({"error": str(exc)}), 401)
+        except Exception as exc:
+            return None, (jsonify({"error": f"unexpected error: {exc}"}), 500)
+
+    return claims, None
+
+
+def require_supabase_auth(f=None, *, remote_check: bool = False):
+    """Decorator that sets request.user to the verified token claims.
+
+    Use `@require_supabase_auth(remote_check=True)` on routes that must
+    notice revoked sessions before `exp`.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            claims, error = authenticate_request(remote_check=remote_check)
+            if error:
+                return error
+
+            request.user = claims
+            return func(*args, **kwargs)
 
-        request.user = decoded
-        return f(*args, **kwargs)
+        return wrapper
 
-    return wrapper
\ No newline at end of file
+    if f is not None:
+        return decorator(f)
+    return decorator
@@ -10,11 +10,55 @@ class Config:
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY")
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    OLLAMA_BASE_URLS = os.getenv("OLLAMA_BASE_URLS", "")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen3-vl:8b")
+    OLLAMA_TRACKED_MODELS = os.getenv("OLLAMA_TRACKED_MODELS", "")
     OLLAMA_TIMEOUT_SECONDS = int(os.getenv("OLLAMA_TIMEOUT_SECONDS", "120"))
     OLLAMA_MAX_RETRIES = int(os.getenv("OLLAMA_MAX_RETRIES", "1"))
-    SUPABASE_JWT_SECRET = "7258a8bb-8fe1-41fc-a583-ab7e28240497"
+    OLLAMA_DEADLINE_SECONDS = float(os.getenv("OLLAMA_DEADLINE_SECONDS", "180"))
+    OLLAMA_MIN_ATTEMPT_SECONDS = float(os.getenv("OLLAMA_MIN_ATTEMPT_SECONDS", "15"))
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_PROBE_INTERVAL_SECONDS = float(os.getenv("OLLAMA_PROBE_INTERVAL_SECONDS", "15"))
+    OLLAMA_HEDGE_AFTER_SECONDS = float(os.getenv("OLLAMA_HEDGE_AFTER_SECONDS", "0"))
+    # Unset: HS256 tokens are verified with GoTrue instead of locally.
+    SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
     SUPABASE_JWT_ALGORITHM = "HS256"
+    SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+    EXTRACTION_DB_PATH = os.getenv("EXTRACTION_DB_PATH", "data/extractions.sqlite3")
+    EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+    EXTRACTION_JOB_DB_PATH = os.getenv("EXTRACTION_JOB_DB_PATH", "data/extraction_jobs.sqlite3")
+    EXTRACTION_JOB_MAX_QUEUED = int(os.getenv("EXTRACTION_JOB_MAX_QUEUED", "200"))
+    # Required: signs the chat image URLs (see blob_store.sign_blob).
+    CHAT_BLOB_URL_SECRET = os.getenv("CHAT_BLOB_URL_SECRET")
+    UPLOAD_BLOB_ROOT = os.getenv("UPLOAD_BLOB_ROOT", "uploads/store")
+    UPLOAD_RETENTION_SECONDS = int(os.getenv("UPLOAD_RETENTION_SECONDS", str(7 * 86400)))
+    UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(5 * 1024**3)))
+    CHAT_IMAGE_RETENTION_SECONDS = int(os.getenv("CHAT_IMAGE_RETENTION_SECONDS", str(90 * 86400)))
+    CHAT_IMAGE_MAX_BYTES = int(os.getenv("CHAT_IMAGE_MAX_BYTES", str(5 * 1024**3)))
+    UPLOAD_GC_INTERVAL_SECONDS = int(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", "900"))
+    UPLOAD_GC_MIN_AGE_SECONDS = int(os.getenv("UPLOAD_GC_MIN_AGE_SECONDS", "3600"))
+    # Per process: under prefork the node admits VISIONIX_WORKERS times this.
+    ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "4"))
+    ADMISSION_INTERACTIVE_RESERVED = int(os.getenv("ADMISSION_INTERACTIVE_RESERVED", "1"))
+    MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+    INGEST_MAX_PIXELS = int(os.getenv("INGEST_MAX_PIXELS", str(80_000_000)))
+    INGEST_WORK_MAX_SIDE = int(os.getenv("INGEST_WORK_MAX_SIDE", "1024"))
+    INGEST_OCR_MAX_SIDE = int(os.getenv("INGEST_OCR_MAX_SIDE", "2560"))
+    TORCH_RUNTIME_PROFILE = os.getenv("TORCH_RUNTIME_PROFILE", "torch_runtime_profile.json")
+    # /metrics and /admission answer 404 until this is set.
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+    PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
     DESCRIBE_RUNS_LOG_PATH = os.getenv(
         "DESCRIBE_RUNS_LOG_PATH", "logs/describe_runs.jsonl"
     )
+    RUN_LOG_QUEUE_SIZE = int(os.getenv("RUN_LOG_QUEUE_SIZE", "10000"))
+    RUN_LOG_FSYNC_INTERVAL_SECONDS = float(os.getenv("RUN_LOG_FSYNC_INTERVAL_SECONDS", "1.0"))
+    RUN_LOG_MAX_BYTES = int(os.getenv("RUN_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+    RUN_LOG_BACKUPS = int(os.getenv("RUN_LOG_BACKUPS", "10"))
+    RUN_LOG_BATCH_SIZE = int(os.getenv("RUN_LOG_BATCH_SIZE", "256"))
+    RUN_LOG_PROMPT_CHARS = int(os.getenv("RUN_LOG_PROMPT_CHARS", "200"))
@@ -10,9 +10,11 @@ from PIL import Image
 import urllib.request
 import os
 
+from app.services import torch_runtime
 
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
+torch_runtime.configure_process()
 
 yolo_model = YOLO("yolov8n.pt")
 
@@ -22,6 +24,7 @@ blip_model = BlipForConditionalGeneration.from_pretrained(
 ).to(device)
 
 ocr_model = ocr_predictor("db_resnet50","crnn_vgg16_bn",pretrained=True)
+torch_runtime.prepare_model("ocr", ocr_model.det_predictor.model)
 
 
 clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
@@ -30,7 +33,8 @@ clip_model = CLIPModel.from_pretrained(
     "openai/clip-vit-base-patch32"
 ).to(device)
 
-clip_model.eval()
+torch_runtime.prepare_model("clip", clip_model)
+torch_runtime.prepare_model("blip", blip_model)
 
 label_file = "categories_places365.txt"
 if not os.path.exists(label_file):
@@ -57,7 +61,7 @@ checkpoint = torch.load(weight_file, map_location=device)
 state_dict = {k.replace("module.", ""): v for k, v in checkpoint["state_dict"].items()}
 scene_model.load_state_dict(state_dict)
 scene_model = scene_model.to(device)
-scene_model.eval()
+torch_runtime.prepare_model("scene", scene_model)
 
 # ---------- Transform ----------
 scene_transform = transforms.Compose([
@@ -70,12 +74,12 @@ scene_transform = transforms.Compose([
     )
 ])
 
-def classify_scene(image_path):
+def classify_scene(image_path, image=None):
     try:
-        img = Image.open(image_path).convert("RGB")
-        input_tensor = scene_transform(img).unsqueeze(0).to(device)
+        img = image if image is not None else Image.open(image_path).convert("RGB")
+        input_tensor = torch_runtime.model_input("scene", scene_transform(img).unsqueeze(0).to(device))
 
-        with torch.no_grad():
+        with torch_runtime.inference("scene"):
             logits = scene_model(input_tensor)
             probs = torch.softmax(logits, 1).squeeze()
             topk = torch.topk(probs, 3)
@@ -105,7 +109,7 @@ def predict_severity(image_path):
             padding=True
         ).to(device)
 
-        with torch.no_grad():
+        with torch_runtime.inference("clip"):
             outputs = clip_model(**inputs)
 
         logits_per_image = outputs.logits_per_image
@@ -1,24 +1,13 @@
-from typing import Optional
 from flask import Blueprint, jsonify, request
 from supabase import AuthApiError
 
+from app.auth_jwt import authenticate_request, extract_bearer_token
 from app.services.supabase_client import get_supabase_client
 
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
 
-def _extract_bearer_token(auth_header: str) -> Optional[str]:
-    if not auth_header:
-        return None
-
-    parts = auth_header.split(" ", 1)
-    if len(parts) != 2 or parts[0].lower() != "bearer":
-        return None
-
-    return parts[1]
-
-
 @auth_bp.route("/signup", methods=["POST"])
 def signup():
     payload = request.get_json(silent=True) or {}
@@ -78,9 +67,11 @@ def login():
 
 @auth_bp.route("/me", methods=["GET"])
 def me():
-    token = _extract_bearer_token(request.headers.get("Authorization", ""))
-    if not token:
-        return jsonify({"error": "Bearer token is required"}), 401
+    # Reject bad or expired tokens locally before spending a round trip on the profile.
+    _, error = authenticate_request()
+    if error:
+        return error
+    token = extract_bearer_token(request.headers.get("Authorization", ""))
 
     try:
         supabase = get_supabase_client()
@@ -1,49 +1,156 @@
 import base64
+import json
 import os
 import uuid
 from datetime import datetime, timezone
 
-from flask import Blueprint, jsonify, request
-from supabase import AuthApiError
+from flask import Blueprint, abort, jsonify, request, send_file
 from werkzeug.utils import secure_filename
 
-from app.services.extraction_store import add_extraction_record
-from app.services.feature_extractor import extract_features
-from app.services.ollama_service import generate_with_ollama
+from app.auth_jwt import authenticate_request
+from app.services.admission import admission_controlled
+from app.services.chat_persistence import enqueue_write, timed_execute
+from app.services.blob_store import blob_path, blob_urls, put_blob, verify_blob_signature
+from app.services.extraction_store import add_extraction_record, find_extraction_by_image_path
+from app.services.image_ingest import ImageRejected
+from app.services.inference import extract_features
+from app.services.ollama_service import generate_with_ollama, prepare_vlm_image
+from app.services.room_cache import forget_room, get_room_image, remember_room_image
 from app.services.supabase_client import get_supabase_client
+from app.services.upload_manager import save_upload
 
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
 
 
-def _extract_bearer_token(auth_header: str):
-    if not auth_header:
-        return None
+def _get_user_from_request(remote_check: bool = False):
+    # Tokens are verified locally (see app/auth_jwt.py); no Supabase round trip
+    # unless the route asks for a revocation check.
+    return authenticate_request(remote_check=remote_check)
 
-    parts = auth_header.split(" ", 1)
-    if len(parts) != 2 or parts[0].lower() != "bearer":
-        return None
 
-    return parts[1]
+_MESSAGE_COLUMNS = "id,room_id,role,content,image_name,image_mime_type,image_hash,created_at"
+_SERVABLE_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp"}
 
 
-def _get_user_from_request():
-    token = _extract_bearer_token(request.headers.get("Authorization", ""))
-    if not token:
-        return None, (jsonify({"error": "Bearer token is required"}), 401)
-    if not isinstance(token, str) or token.count(".") != 2:
-        return None, (jsonify({"error": "Malformed access token"}), 401)
+def _with_image_urls(message: dict | None):
+    if not message:
+        return message
+    return {**message, **blob_urls(message.get("image_hash"), message.get("image_mime_type"))}
 
-    try:
-        supabase = get_supabase_client()
-        user_response = supabase.auth.get_user(token)
-        if not user_response.user:
-            return None, (jsonify({"error": "Invalid user session"}), 401)
-        return user_response.user, None
-    except (AuthApiError, ValueError) as exc:
-        return None, (jsonify({"error": str(exc)}), 401)
-    except Exception as exc:
-        return None, (jsonify({"error": f"unexpected error: {exc}"}), 500)
+
+def _encode_cursor(message: dict) -> str:
+    raw = json.dumps([message["created_at"], message["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str | None):
+    # Both parts end up inside a PostgREST or=() filter, so they are parsed and
+    # re-serialised rather than passed through; anything else is a ValueError.
+    if not cursor:
+        return None
+    created_at, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    timestamp = datetime.fromisoformat(_pad_fraction(str(created_at).replace("Z", "+00:00")))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.isoformat(), str(uuid.UUID(str(message_id)))
+
+
+def _pad_fraction(value: str) -> str:
+    # Postgres trims trailing zeros from fractional seconds; fromisoformat
+    # before Python 3.11 only accepts 3 or 6 digits.
+    head, dot, tail = value.partition(".")
+    if not dot:
+        return value
+    digits = len(tail) - len(tail.lstrip("0123456789"))
+    return f"{head}.{tail[:digits].ljust(6, '0')}{tail[digits:]}"
+
+
+def _list_message(message: dict, include_images: bool):
+    # Listings carry image metadata only; URLs are added on request and the
+    # per-message image endpoint serves the rest.
+    row = {key: value for key, value in message.items() if key != "image_hash"}
+    row["has_image"] = bool(message.get("image_hash") or message.get("image_name"))
+    if include_images:
+        row.update(blob_urls(message.get("image_hash"), message.get("image_mime_type")))
+    return row
+
+
+def _migrate_legacy_images(supabase, room_id: str):
+    # Rooms created before blob storage keep base64 in image_data; move them
+    # to the blob store once so later listings never carry the payload.
+    legacy = (
+        supabase.table("chat_messages")
+        .select("id,image_data")
+        .eq("room_id", room_id)
+        .is_("image_hash", "null")
+        .not_.is_("image_data", "null")
+        .execute()
+    )
+    for row in legacy.data or []:
+        blob = put_blob(base64.b64decode(row["image_data"]))
+        supabase.table("chat_messages").update(
+            {"image_hash": blob["hash"], "image_data": None}
+        ).eq("id", row["id"]).execute()
+    return len(legacy.data or [])
+
+
+def _latest_room_image(supabase, room_id: str):
+    response = timed_execute(
+        "chat_messages.latest_image",
+        supabase.table("chat_messages")
+        .select("image_name,image_mime_type,image_hash,created_at")
+        .eq("room_id", room_id)
+        .eq("role", "user")
+        .not_.is_("image_hash", "null")
+        .order("created_at", desc=True)
+        .limit(1),
+    )
+    return response.data[0] if response.data else None
+
+
+def _load_room_image(room_id: str, image_hash: str, image_name: str | None, fresh_upload: bool):
+    # Cache miss: build the room's working set from the blob. Features come from
+    # an earlier extraction of the same blob when this node has one, including
+    # for a fresh upload of an image that is already stored.
+    image_path = blob_path(image_hash)
+    if not os.path.exists(image_path):
+        return None
+    image_name = image_name or "previous_image"
+    features = {}
+    extraction_record = None
+    extraction_error = None
+
+    existing = find_extraction_by_image_path(image_path)
+    if existing:
+        features = existing
+    else:
+        try:
+            features = extract_features(image_path)
+            extraction_record = add_extraction_record(
+                features=features,
+                image_name=image_name,
+                image_path=image_path,
+                source="chat",
+            )
+        except Exception as exc:
+            features = {}
+            extraction_error = str(exc)
+
+    room_image = {
+        "image_hash": image_hash,
+        "image_path": image_path,
+        "image_name": image_name,
+        "image_b64": prepare_vlm_image(image_path),
+        "features": features,
+        "extraction_id": (extraction_record or existing or {}).get("id"),
+    }
+    if extraction_error is None:
+        remember_room_image(room_id, **room_image)
+    if fresh_upload and extraction_record is None:
+        # A re-upload reports the record it was deduplicated against.
+        extraction_record = existing
+    return {**room_image, "extraction_record": extraction_record, "extraction_error": extraction_error}
 
 
 def _suggest_chat_title(prompt: str):
@@ -67,7 +174,7 @@ def list_rooms():
         response = (
             supabase.table("chat_rooms")
             .select("id,title,created_at,updated_at")
-            .eq("user_id", user.id)
+            .eq("user_id", user["sub"])
             .order("updated_at", desc=True)
             .execute()
         )
@@ -89,7 +196,7 @@ def create_room():
         supabase = get_supabase_client()
         response = (
             supabase.table("chat_rooms")
-            .insert({"user_id": user.id, "title": title})
+            .insert({"user_id": user["sub"], "title": title})
             .execute()
         )
         room = response.data[0] if response.data else None
@@ -100,7 +207,7 @@ def create_room():
 
 @chat_bp.route("/rooms/<room_id>", methods=["DELETE"])
 def delete_room(room_id: str):
-    user, error = _get_user_from_request()
+    user, error = _get_user_from_request(remote_check=True)
     if error:
         return error
 
@@ -110,14 +217,15 @@ def delete_room(room_id: str):
             supabase.table("chat_rooms")
             .select("id")
             .eq("id", room_id)
-            .eq("user_id", user.id)
+            .eq("user_id", user["sub"])
             .limit(1)
             .execute()
         )
         if not room_check.data:
             return jsonify({"error": "chat room not found"}), 404
 
-        supabase.table("chat_rooms").delete().eq("id", room_id).eq("user_id", user.id).execute()
+        supabase.table("chat_rooms").delete().eq("id", room_id).eq("user_id", user["sub"]).execute()
+        forget_room(room_id)
         return jsonify({"status": "deleted"})
     except Exception as exc:
         return jsonify({"error": f"failed to delete chat room: {exc}"}), 500
@@ -129,37 +237,120 @@ def get_room_messages(room_id: str):
     if error:
         return error
 
+    try:
+        limit = min(max(int(request.args.get("limit", "50")), 1), 200)
+        before = _decode_cursor(request.args.get("before"))
+        after = _decode_cursor(request.args.get("after"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "invalid limit or cursor"}), 400
+    include_images = request.args.get("include_images", "").lower() in ("1", "true", "yes")
+
     try:
         supabase = get_supabase_client()
-        room_check = (
+        room_check = timed_execute(
+            "chat_rooms.check",
             supabase.table("chat_rooms")
             .select("id")
             .eq("id", room_id)
-            .eq("user_id", user.id)
-            .limit(1)
-            .execute()
+            .eq("user_id", user["sub"])
+            .limit(1),
         )
         if not room_check.data:
             return jsonify({"error": "chat room not found"}), 404
 
-        response = (
+        # Keyset pagination on (created_at, id), served by
+        # idx_chat_messages_room_id_created_at. Without a cursor the newest page
+        # is returned; one extra row tells whether more pages exist.
+        query = supabase.table("chat_messages").select(_MESSAGE_COLUMNS).eq("room_id", room_id)
+        if after:
+            query = query.or_(
+                f'created_at.gt."{after[0]}",and(created_at.eq."{after[0]}",id.gt.{after[1]})'
+            )
+            descending = False
+        else:
+            if before:
+                query = query.or_(
+                    f'created_at.lt."{before[0]}",and(created_at.eq."{before[0]}",id.lt.{before[1]})'
+                )
+            descending = True
+        response = timed_execute(
+            "chat_messages.page",
+            query.order("created_at", desc=descending).order("id", desc=descending).limit(limit + 1),
+        )
+
+        rows = response.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if descending:
+            rows.reverse()
+
+        messages = [_list_message(row, include_images) for row in rows]
+        return jsonify(
+            {
+                "messages": messages,
+                "has_more": has_more,
+                "next_before": _encode_cursor(rows[0]) if rows and (has_more or not descending) else None,
+                "next_after": _encode_cursor(rows[-1]) if rows else None,
+            }
+        )
+    except Exception as exc:
+        return jsonify({"error": f"failed to fetch chat messages: {exc}"}), 500
+
+
+@chat_bp.route("/rooms/<room_id>/messages/<message_id>/image", methods=["GET"])
+def get_message_image(room_id: str, message_id: str):
+    user, error = _get_user_from_request()
+    if error:
+        return error
+
+    try:
+        supabase = get_supabase_client()
+        response = timed_execute(
+            "chat_messages.image",
             supabase.table("chat_messages")
-            .select("id,room_id,role,content,image_name,image_mime_type,image_data,created_at")
+            .select("id,image_name,image_mime_type,image_hash,image_data,chat_rooms!inner(user_id)")
+            .eq("id", message_id)
             .eq("room_id", room_id)
-            .order("created_at", desc=False)
-            .execute()
+            .eq("chat_rooms.user_id", user["sub"])
+            .limit(1),
+        )
+        if not response.data:
+            return jsonify({"error": "message not found"}), 404
+
+        message = response.data[0]
+        if not message.get("image_hash") and message.get("image_data"):
+            # Legacy row: move its base64 payload into the blob store on first view.
+            blob = put_blob(base64.b64decode(message["image_data"]))
+            supabase.table("chat_messages").update(
+                {"image_hash": blob["hash"], "image_data": None}
+            ).eq("id", message_id).execute()
+            message["image_hash"] = blob["hash"]
+        if not message.get("image_hash"):
+            return jsonify({"error": "message has no image"}), 404
+
+        return jsonify(
+            {
+                "id": message["id"],
+                "image_name": message.get("image_name"),
+                "image_mime_type": message.get("image_mime_type"),
+                **blob_urls(message["image_hash"], message.get("image_mime_type")),
+            }
         )
-        return jsonify({"messages": response.data or []})
     except Exception as exc:
-        return jsonify({"error": f"failed to fetch chat messages: {exc}"}), 500
+        return jsonify({"error": f"failed to fetch message image: {exc}"}), 500
 
 
 @chat_bp.route("/rooms/<room_id>/messages", methods=["POST"])
 def send_message(room_id: str):
+    # Authenticate before admission so rejected callers never hold a slot.
     user, error = _get_user_from_request()
     if error:
         return error
+    return _send_message(room_id, user)
+
 
+@admission_controlled("chat")
+def _send_message(room_id: str, user: dict):
     prompt = (request.form.get("prompt") or "").strip()
     model = (request.form.get("model") or "qwen3-vl:8b").strip() or "qwen3-vl:8b"
 
@@ -168,121 +359,114 @@ def send_message(room_id: str):
 
     try:
         supabase = get_supabase_client()
-        room_response = (
+        room_response = timed_execute(
+            "chat_rooms.check",
             supabase.table("chat_rooms")
             .select("id,title")
             .eq("id", room_id)
-            .eq("user_id", user.id)
-            .limit(1)
-            .execute()
+            .eq("user_id", user["sub"])
+            .limit(1),
         )
         if not room_response.data:
             return jsonify({"error": "chat room not found"}), 404
 
         image_file = request.files.get("image")
-        image_b64_for_reasoning = None
+        image_hash = None
         image_name_for_reasoning = None
-        image_mime_type_for_reasoning = None
-        image_b64_for_message = None
         image_name_for_message = None
         image_mime_type_for_message = None
+        room_image = None
 
         uploaded_image = bool(image_file and image_file.filename)
         if uploaded_image:
             image_name_for_reasoning = secure_filename(image_file.filename)
-            image_mime_type_for_reasoning = image_file.mimetype or "application/octet-stream"
-            image_bytes = image_file.read()
-            image_b64_for_reasoning = base64.b64encode(image_bytes).decode("ascii")
             image_name_for_message = image_name_for_reasoning
-            image_mime_type_for_message = image_mime_type_for_reasoning
-            image_b64_for_message = image_b64_for_reasoning
-        else:
-            # Reuse the most recent uploaded image in this room for follow-up queries.
-            recent_messages = (
-                supabase.table("chat_messages")
-                .select("image_name,image_mime_type,image_data,created_at")
-                .eq("room_id", room_id)
-                .eq("role", "user")
-                .order("created_at", desc=True)
-                .limit(50)
-                .execute()
-            )
-            for msg in recent_messages.data or []:
-                if msg.get("image_data"):
-                    image_b64_for_reasoning = msg.get("image_data")
-                    image_name_for_reasoning = msg.get("image_name") or "previous_image"
-                    image_mime_type_for_reasoning = msg.get("image_mime_type") or "application/octet-stream"
-                    break
-
-        user_message_payload = {
-            "room_id": room_id,
-            "role": "user",
-            "content": prompt,
-            "image_name": image_name_for_message,
-            "image_mime_type": image_mime_type_for_message,
-            "image_data": image_b64_for_message,
-        }
-        user_message_result = supabase.table("chat_messages").insert(user_message_payload).execute()
-        user_message = user_message_result.data[0] if user_message_result.data else None
-
-        image_path = None
-        if image_b64_for_reasoning:
-            os.makedirs("uploads/chat_images", exist_ok=True)
-            image_path = os.path.join("uploads/chat_images", f"{uuid.uuid4()}_{image_name_for_reasoning}")
-            with open(image_path, "wb") as out:
-                out.write(base64.b64decode(image_b64_for_reasoning))
+            image_mime_type_for_message = image_file.mimetype or "application/octet-stream"
+            image_hash = save_upload(image_file, namespace="chat")["hash"]
         else:
+            # The room's image may have changed through another worker, so the
+            # cached working set is only reused for the hash the database has.
+            latest_image = _latest_room_image(supabase, room_id)
+            if latest_image is None and _migrate_legacy_images(supabase, room_id):
+                latest_image = _latest_room_image(supabase, room_id)
+            if latest_image:
+                image_hash = latest_image["image_hash"]
+                image_name_for_reasoning = latest_image.get("image_name")
+                room_image = get_room_image(room_id, image_hash)
+
+        if not image_hash:
             return jsonify({"error": "Please upload an image to start this chat."}), 400
 
-        extracted_features = {}
         extraction_record = None
         extraction_error = None
-        if uploaded_image and image_path:
-            try:
-                extracted_features = extract_features(image_path)
-                extraction_record = add_extraction_record(
-                    features=extracted_features,
-                    image_name=image_name_for_reasoning or "uploaded_image",
-                    image_path=image_path,
-                    source="chat",
-                )
-            except Exception as exc:
-                extracted_features = {}
-                extraction_error = str(exc)
+        if room_image is None:
+            room_image = _load_room_image(
+                room_id,
+                image_hash,
+                image_name_for_reasoning,
+                fresh_upload=uploaded_image,
+            )
+            if room_image is None:
+                return jsonify({"error": "The image for this chat is no longer available. Please upload it again."}), 400
+            extraction_record = room_image.pop("extraction_record", None)
+            extraction_error = room_image.pop("extraction_error", None)
+
+        # Written before generation so the prompt survives an Ollama failure,
+        # and so other workers see a new image as the room's latest at once.
+        user_result = timed_execute(
+            "chat_messages.insert_user",
+            supabase.table("chat_messages").insert(
+                {
+                    "room_id": room_id,
+                    "role": "user",
+                    "content": prompt,
+                    "image_name": image_name_for_message,
+                    "image_mime_type": image_mime_type_for_message,
+                    "image_hash": image_hash if uploaded_image else None,
+                }
+            ),
+        )
+        user_message = _with_image_urls((user_result.data or [None])[0])
 
         try:
             assistant_text = generate_with_ollama(
-                features=extracted_features,
-                image_path=image_path,
+                features=room_image["features"],
+                image_path=room_image["image_path"],
                 user_prompt=prompt,
                 ollama_model=model,
+                image_b64=room_image["image_b64"],
+                affinity_key=room_id,
             )
         except Exception as exc:
             assistant_text = f"I could not complete that request right now: {exc}"
 
-        assistant_message_payload = {
-            "room_id": room_id,
-            "role": "assistant",
-            "content": assistant_text,
-            "image_name": None,
-            "image_mime_type": None,
-            "image_data": None,
-        }
-        assistant_message_result = supabase.table("chat_messages").insert(assistant_message_payload).execute()
-        assistant_message = (
-            assistant_message_result.data[0] if assistant_message_result.data else None
+        completed_at = datetime.now(timezone.utc).isoformat()
+        assistant_result = timed_execute(
+            "chat_messages.insert_assistant",
+            supabase.table("chat_messages").insert(
+                {
+                    "room_id": room_id,
+                    "role": "assistant",
+                    "content": assistant_text,
+                    "image_name": None,
+                    "image_mime_type": None,
+                    "image_hash": None,
+                    "created_at": completed_at,
+                }
+            ),
+        )
+        assistant_message = (assistant_result.data or [None])[0]
+
+        # Title and updated_at do not change the response: merge them into one
+        # update and let the background writer apply it.
+        room_update = {"updated_at": completed_at}
+        if room_response.data[0].get("title") == "New Chat":
+            room_update["title"] = _suggest_chat_title(prompt)
+        user_id = user["sub"]
+        enqueue_write(
+            "chat_rooms.touch",
+            lambda: supabase.table("chat_rooms").update(room_update).eq("id", room_id).eq("user_id", user_id),
         )
-
-        room_title = room_response.data[0].get("title")
-        if room_title == "New Chat":
-            suggested_title = _suggest_chat_title(prompt)
-            supabase.table("chat_rooms").update({"title": suggested_title}).eq("id", room_id).eq(
-                "user_id", user.id
-            ).execute()
-
-        supabase.table("chat_rooms").update(
-            {"updated_at": datetime.now(timezone.utc).isoformat()}
-        ).eq("id", room_id).eq("user_id", user.id).execute()
 
         return jsonify(
             {
@@ -292,5 +476,30 @@ def send_message(room_id: str):
                 "extraction_error": extraction_error,
             }
         ), 201
+    except ImageRejected as exc:
+        return jsonify({"error": str(exc)}), exc.status
     except Exception as exc:
         return jsonify({"error": f"failed to send message: {exc}"}), 500
+
+
+@chat_bp.route("/blobs/<blob_hash>", methods=["GET"])
+def get_blob(blob_hash: str):
+    # Authorised by the HMAC in the URL handed out with each message, since
+    # browsers load <img> sources without the bearer token.
+    if not verify_blob_signature(blob_hash, request.args.get("sig", "")):
+        abort(404)
+
+    if request.args.get("thumb") == "1":
+        path = blob_path(blob_hash, thumbnail=True)
+        mimetype = "image/jpeg"
+    else:
+        path = blob_path(blob_hash)
+        requested = (request.args.get("type") or "").lower()
+        mimetype = requested if requested in _SERVABLE_MIME_TYPES else "application/octet-stream"
+
+    if not os.path.exists(path):
+        abort(404)
+
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=blob_hash)
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
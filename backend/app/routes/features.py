@@ -1,19 +1,17 @@
-import os
-import uuid
-
 import numpy as np
 from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
 
-from app.services.feature_extractor import extract_features
+from app.services.admission import admission_controlled
+from app.services.inference import extract_features
 from app.services.extraction_store import (
     add_extraction_record,
     delete_extraction_record,
     list_extraction_records,
 )
+from app.services.upload_manager import save_upload
 from app.services.vector_store import add_vector
 
-from app.services.feature_extractor import (
+from app.services.inference import (
     extract_features,
     extract_features_with_model
 )
@@ -39,6 +37,7 @@ from app.auth_jwt import require_supabase_auth
 
 @features_bp.route("/extract", methods=["POST"])
 @require_supabase_auth
+@admission_controlled("extract")
 def extract():
     print("Incoming model_id:", request.form.get("model_id"))
     # ==============================
@@ -72,11 +71,9 @@ def extract():
     # ==============================
     # SAVE IMAGE
     # ==============================
-    os.makedirs("uploads", exist_ok=True)
-    filename = secure_filename(file.filename)
-    unique_filename = f"{uuid.uuid4().hex}_{filename}"
-    path = os.path.join("uploads", unique_filename)
-    file.save(path)
+    upload = save_upload(file)
+    filename = upload["name"]
+    path = upload["path"]
 
     # ==============================
     # FEATURE EXTRACTION
@@ -109,6 +106,7 @@ def extract():
         image_name=filename,
         image_path=path,
         source="extract",
+        user_id=user_id,
     )
 
     response_payload = {
@@ -123,7 +121,22 @@ def extract():
 
 @features_bp.route("/extractions", methods=["GET"])
 def list_extractions():
-    return jsonify(list_extraction_records())
+    try:
+        limit = min(max(int(request.args.get("limit", "50")), 1), 200)
+        cursor = request.args.get("cursor")
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "invalid limit or cursor"}), 400
+
+    page = list_extraction_records(
+        limit=limit,
+        cursor=cursor,
+        source=request.args.get("source") or None,
+        user_id=request.args.get("user_id") or None,
+        since=request.args.get("since") or None,
+        until=request.args.get("until") or None,
+    )
+    return jsonify(page)
 
 
 @features_bp.route("/extractions/<extraction_id>", methods=["DELETE"])
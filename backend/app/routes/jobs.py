@@ -0,0 +1,148 @@
+import json
+import os
+import time
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from werkzeug.utils import secure_filename
+
+from app.auth_jwt import require_supabase_auth
+from app.services.extraction_jobs import (
+    JOB_KINDS,
+    TERMINAL_STATUSES,
+    JobQueueFull,
+    draining,
+    get_job_queue,
+    submit_job,
+)
+from app.services.upload_manager import save_upload
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+def _public_job(job: dict, include_result: bool = True) -> dict:
+    payload = {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "queue_position": get_job_queue().queue_position(job),
+    }
+    if include_result and job["status"] == "succeeded":
+        payload["result"] = job["result"]
+    return payload
+
+
+def _load_owned_job(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None or job["user_id"] != request.user["sub"]:
+        return None
+    return job
+
+
+@jobs_bp.route("/jobs", methods=["POST"])
+@require_supabase_auth
+def create_job():
+    kind = (request.form.get("kind") or "extract").strip().lower()
+    if kind not in JOB_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(JOB_KINDS)}"}), 400
+
+    file = request.files.get("image")
+    if not file or not file.filename:
+        return jsonify({"error": "image is required"}), 400
+
+    filename = secure_filename(file.filename)
+    if not filename:
+        return jsonify({"error": "invalid filename"}), 400
+
+    path = save_upload(file)["path"]
+
+    params = {
+        "image_path": path,
+        "image_name": filename,
+        "model_id": request.form.get("model_id"),
+        "prompt": request.form.get("prompt"),
+        "model": (request.form.get("model") or "").strip() or None,
+    }
+    try:
+        job = submit_job(kind, params, user_id=request.user["sub"])
+    except JobQueueFull as exc:
+        response = jsonify({"error": str(exc)})
+        response.headers["Retry-After"] = os.getenv("EXTRACTION_JOB_RETRY_AFTER_SECONDS", "10")
+        return response, 503
+
+    response = jsonify(_public_job(job))
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return response, 202
+
+
+@jobs_bp.route("/jobs/<job_id>", methods=["GET"])
+@require_supabase_auth
+def get_job(job_id: str):
+    job = _load_owned_job(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(_public_job(job))
+
+
+@jobs_bp.route("/jobs/<job_id>/events", methods=["GET"])
+@require_supabase_auth
+def stream_job_events(job_id: str):
+    """Server-sent events: a `progress` event on every status or stage change, then `done`.
+
+    When the worker process is shutting down, the stream ends with a `retry`
+    event so the client reconnects (to another worker) instead of holding the
+    old one past its graceful timeout.
+    """
+    job = _load_owned_job(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+
+    poll_seconds = float(os.getenv("EXTRACTION_JOB_SSE_POLL_SECONDS", "0.5"))
+    keepalive_seconds = float(os.getenv("EXTRACTION_JOB_SSE_KEEPALIVE_SECONDS", "15"))
+    max_seconds = float(os.getenv("EXTRACTION_JOB_SSE_MAX_SECONDS", "900"))
+    retry_ms = int(os.getenv("EXTRACTION_JOB_SSE_RETRY_MS", "1000"))
+
+    def _events():
+        # The job row is the source of truth, so any worker process can be
+        # running the job this stream reports on.
+        queue = get_job_queue()
+        started = time.monotonic()
+        last_sent = started
+        last_state = None
+        current = job
+        while True:
+            state = (current["status"], current["stage"])
+            if state != last_state:
+                terminal = current["status"] in TERMINAL_STATUSES
+                event = "done" if terminal else "progress"
+                data = json.dumps(_public_job(current, include_result=terminal), ensure_ascii=False)
+                yield f"event: {event}\ndata: {data}\n\n"
+                last_state = state
+                last_sent = time.monotonic()
+                if terminal:
+                    return
+            elif time.monotonic() - last_sent >= keepalive_seconds:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+
+            if time.monotonic() - started >= max_seconds:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            if draining():
+                yield f"retry: {retry_ms}\nevent: retry\ndata: {{}}\n\n"
+                return
+            time.sleep(poll_seconds)
+            current = queue.get(job_id)
+            if current is None:
+                yield "event: gone\ndata: {}\n\n"
+                return
+
+    response = Response(stream_with_context(_events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
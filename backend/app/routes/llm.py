@@ -5,51 +5,42 @@ import uuid
 import logging
 from typing import Any
 from flask import Blueprint, jsonify, request
-from werkzeug.utils import secure_filename
 
-from app.services.feature_extractor import extract_features
+from app.routes.metrics import require_metrics_token
+from app.services.admission import admission_controlled
+from app.services.inference import extract_features
 from app.services.extraction_store import add_extraction_record
+from app.services.ollama_pool import pool_stats
 from app.services.ollama_service import generate_with_ollama, check_ollama_health
+from app.services.reasoning_history import schedule_compaction, select_history
+from app.services.run_log import record_run
+from app.services.session_store import compact_features, get_session_store
+from app.services.upload_manager import save_upload
 
 llm_bp = Blueprint("llm", __name__)
 logger = logging.getLogger(__name__)
-_REASONING_SESSIONS: dict[str, dict[str, Any]] = {}
-
-
-def _persist_describe_run(payload: dict) -> None:
-    log_path = os.getenv("DESCRIBE_RUNS_LOG_PATH", "logs/describe_runs.jsonl")
-    log_dir = os.path.dirname(log_path)
-    if log_dir:
-        os.makedirs(log_dir, exist_ok=True)
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(payload, ensure_ascii=True) + "\n")
-
-
-def _prune_reasoning_sessions() -> None:
-    max_sessions = int(os.getenv("REASONING_MAX_SESSIONS", "25"))
-    if len(_REASONING_SESSIONS) <= max_sessions:
-        return
-
-    ordered = sorted(
-        _REASONING_SESSIONS.items(),
-        key=lambda item: item[1].get("updated_at", 0),
-    )
-    remove_count = len(_REASONING_SESSIONS) - max_sessions
-    for session_id, _ in ordered[:remove_count]:
-        _REASONING_SESSIONS.pop(session_id, None)
 
 
 @llm_bp.route("/llm/health", methods=["GET"])
 def llm_health():
     model = (request.args.get("model") or "").strip() or None
-    try:
-        health = check_ollama_health(model)
+    health = check_ollama_health(model)
+    if health["status"] == "ok":
         return jsonify(health)
-    except Exception as exc:
-        return jsonify({"status": "error", "error": str(exc), "model": model}), 502
+    if health["status"] == "unknown":
+        return jsonify(health), 503
+    return jsonify(health), 502
+
+
+@llm_bp.route("/llm/backends", methods=["GET"])
+def llm_backends():
+    # Backend URLs, error rates and ejection reasons: same audience as /metrics.
+    require_metrics_token()
+    return jsonify({"backends": pool_stats()})
 
 
 @llm_bp.route("/describe", methods=["POST"])
+@admission_controlled("describe")
 def describe_image():
     request_id = str(uuid.uuid4())
     start_ts = time.time()
@@ -64,10 +55,9 @@ def describe_image():
     prompt = request.form.get("prompt")
     model = (request.form.get("model") or "").strip() or None
 
-    os.makedirs("uploads", exist_ok=True)
-    filename = secure_filename(file.filename)
-    path = os.path.join("uploads", filename)
-    file.save(path)
+    upload = save_upload(file)
+    filename = upload["name"]
+    path = upload["path"]
 
     features = extract_features(path)
     extraction_record = add_extraction_record(
@@ -96,7 +86,7 @@ def describe_image():
             "status": "error",
         }
         logger.error(json.dumps(event, ensure_ascii=True))
-        _persist_describe_run(event)
+        record_run(event, "/describe")
         return jsonify(
             {
                 "error": "Ollama request failed",
@@ -116,13 +106,12 @@ def describe_image():
         "model": model or os.getenv("OLLAMA_MODEL", "qwen3-vl:8b"),
         "image_name": filename,
         "prompt": prompt,
-        "features": features,
         "llm_response": llm_text,
         "latency_ms": elapsed_ms,
         "status": "ok",
     }
     logger.info(json.dumps(run_record, ensure_ascii=True))
-    _persist_describe_run(run_record)
+    record_run(run_record, "/describe")
 
     return jsonify(
         {
@@ -137,6 +126,7 @@ def describe_image():
 
 
 @llm_bp.route("/reason", methods=["POST"])
+@admission_controlled("reason")
 def reason_over_image():
     request_id = str(uuid.uuid4())
     start_ts = time.time()
@@ -151,9 +141,10 @@ def reason_over_image():
     session: dict[str, Any] | None = None
     created_new_session = False
     extraction_record: dict[str, Any] | None = None
+    session_store = get_session_store()
 
     if session_id:
-        session = _REASONING_SESSIONS.get(session_id)
+        session = session_store.get(session_id)
         if not session:
             return jsonify(
                 {
@@ -174,11 +165,9 @@ def reason_over_image():
         if not file.filename:
             return jsonify({"error": "Empty file name", "request_id": request_id}), 400
 
-        os.makedirs("uploads", exist_ok=True)
-        original_filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4().hex}_{original_filename}"
-        image_path = os.path.join("uploads", unique_filename)
-        file.save(image_path)
+        upload = save_upload(file)
+        original_filename = upload["name"]
+        image_path = upload["path"]
 
         features = extract_features(image_path)
         extraction_record = add_extraction_record(
@@ -192,15 +181,14 @@ def reason_over_image():
             "session_id": session_id,
             "image_name": original_filename,
             "image_path": image_path,
-            "features": features,
+            "features": compact_features(features),
             "extraction_id": extraction_record["id"],
             "history": [],
             "created_at": time.time(),
             "updated_at": time.time(),
             "model": model or os.getenv("OLLAMA_MODEL", "qwen3-vl:8b"),
         }
-        _REASONING_SESSIONS[session_id] = session
-        _prune_reasoning_sessions()
+        session_store.put(session)
         created_new_session = True
 
     assert session is not None
@@ -210,8 +198,9 @@ def reason_over_image():
         session["model"] = model
     active_model = session.get("model") or os.getenv("OLLAMA_MODEL", "qwen3-vl:8b")
 
-    history_window = int(os.getenv("REASONING_HISTORY_WINDOW", "8"))
-    history_for_model = list(session.get("history", []))[-history_window:]
+    history_for_model, history_report = select_history(session)
+    reuse_prefix = os.getenv("REASONING_PREFIX_CACHE", "true").lower() == "true"
+    usage: dict[str, Any] = {}
 
     try:
         llm_text = generate_with_ollama(
@@ -220,6 +209,9 @@ def reason_over_image():
             user_prompt=prompt,
             ollama_model=active_model,
             conversation_history=history_for_model,
+            reuse_prefix=reuse_prefix,
+            usage=usage,
+            affinity_key=session_id,
         )
     except Exception as exc:
         elapsed_ms = int((time.time() - start_ts) * 1000)
@@ -233,7 +225,7 @@ def reason_over_image():
             "status": "error",
         }
         logger.error(json.dumps(event, ensure_ascii=True))
-        _persist_describe_run(event)
+        record_run(event, "/reason")
         return jsonify(
             {
                 "error": "Ollama reasoning failed",
@@ -249,7 +241,10 @@ def reason_over_image():
     session_history.append(
         {
             "user": prompt,
+            # Exact text sent for this turn, replayed so the session prefix stays byte-identical.
+            "user_message": usage.get("user_message"),
             "assistant": llm_text,
+            "prefill_tokens": usage.get("prefill_tokens"),
             "timestamp": time.time(),
         }
     )
@@ -258,6 +253,17 @@ def reason_over_image():
         session["history"] = session_history[-max_history_store:]
 
     session["updated_at"] = time.time()
+    # Only the fields this request owns are written back, so a synopsis stored
+    # by the background compactor in the meantime is not overwritten.
+    session_store.update(
+        session_id,
+        {
+            "history": session["history"],
+            "model": active_model,
+            "updated_at": session["updated_at"],
+        },
+    )
+    schedule_compaction(session, active_model)
 
     elapsed_ms = int((time.time() - start_ts) * 1000)
     turn_index = len(session["history"])
@@ -269,11 +275,15 @@ def reason_over_image():
         "image_name": session.get("image_name"),
         "prompt": prompt,
         "turn_index": turn_index,
+        "prefill_tokens": usage.get("prefill_tokens"),
+        "generated_tokens": usage.get("generated_tokens"),
+        "prefill_ms": usage.get("prefill_ms"),
+        "history_tokens": history_report["history_tokens"],
         "latency_ms": elapsed_ms,
         "status": "ok",
     }
     logger.info(json.dumps(run_record, ensure_ascii=True))
-    _persist_describe_run(run_record)
+    record_run(run_record, "/reason")
 
     return jsonify(
         {
@@ -284,6 +294,10 @@ def reason_over_image():
             "extraction_id": session.get("extraction_id"),
             "extraction": extraction_record if created_new_session else None,
             "turn_index": turn_index,
+            "usage": {
+                **{key: value for key, value in usage.items() if key != "user_message"},
+                **history_report,
+            },
             "created_new_session": created_new_session,
             "timing_ms": elapsed_ms,
         }
@@ -298,5 +312,5 @@ def end_reason_session():
     if not session_id:
         return jsonify({"error": "session_id is required"}), 400
 
-    removed = _REASONING_SESSIONS.pop(session_id, None)
-    return jsonify({"status": "ok", "ended": bool(removed), "session_id": session_id})
+    removed = get_session_store().delete(session_id)
+    return jsonify({"status": "ok", "ended": removed, "session_id": session_id})
@@ -0,0 +1,101 @@
+import hmac
+import os
+import time
+
+from flask import Blueprint, Response, abort, g, jsonify, request
+
+from app.services import metrics
+from app.services.admission import admission_state
+from app.services.chat_persistence import write_queue_depth
+from app.services.extraction_jobs import get_job_queue
+from app.services.inference import inference_stats
+from app.services.ollama_pool import pool_stats
+from app.services.vector_store import index
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+def _route_label() -> str:
+    # The URL rule, not the path, keeps label cardinality bounded.
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+@metrics_bp.before_app_request
+def _start_request_timer():
+    g.metrics_started = time.perf_counter()
+    g.metrics_route = _route_label()
+    metrics.inc("visionix_http_requests_in_flight__started", route=g.metrics_route)
+
+
+@metrics_bp.after_app_request
+def _record_request(response):
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        metrics.observe(
+            "visionix_http_request_duration_seconds",
+            time.perf_counter() - started,
+            route=g.metrics_route,
+            method=request.method,
+            status=response.status_code,
+        )
+    return response
+
+
+@metrics_bp.teardown_app_request
+def _finish_request(exc):
+    route = g.pop("metrics_route", None)
+    if route is not None:
+        metrics.inc("visionix_http_requests_in_flight__finished", route=route)
+
+
+def _job_queue_depth():
+    counts = get_job_queue().status_counts()
+    return [({"status": status}, counts.get(status, 0)) for status in ("queued", "running")]
+
+
+def _ollama_outstanding():
+    return [({"backend": backend["url"]}, backend["outstanding"]) for backend in pool_stats()]
+
+
+metrics.register_gauge("visionix_extraction_jobs", "Extraction jobs by status.", _job_queue_depth)
+metrics.register_gauge("visionix_chat_write_queue_depth", "Chat writes waiting for the background writer.", write_queue_depth)
+metrics.register_gauge("visionix_ollama_outstanding_requests", "In-flight Ollama requests per backend.", _ollama_outstanding)
+metrics.register_gauge(
+    "visionix_inference_workers",
+    "Inference worker processes and tasks in flight.",
+    lambda: [({"state": key}, value) for key, value in inference_stats().items()],
+)
+metrics.register_gauge(
+    "visionix_admission_slots",
+    "Admission-controlled requests running or queued, by route.",
+    lambda: [
+        ({"route": route, "state": key}, state[key])
+        for route, state in admission_state()["routes"].items()
+        for key in ("active", "queued")
+    ],
+)
+metrics.register_gauge("visionix_vector_index_size", "Vectors in the FAISS index.", lambda: index.ntotal)
+
+
+def require_metrics_token():
+    # Route names, queue depths and backend URLs are internal; the scraper
+    # sends METRICS_TOKEN as a bearer token (Prometheus `authorization`).
+    expected = os.getenv("METRICS_TOKEN")
+    if not expected:
+        abort(404)
+    header = request.headers.get("Authorization", "")
+    token = header[len("Bearer "):] if header.startswith("Bearer ") else ""
+    if not hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8")):
+        abort(403)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    require_metrics_token()
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+@metrics_bp.route("/admission", methods=["GET"])
+def admission():
+    require_metrics_token()
+    return jsonify(admission_state())
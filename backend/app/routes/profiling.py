@@ -0,0 +1,76 @@
+import os
+
+from flask import Blueprint, Response, abort, g, jsonify, request
+
+from app.services.profiling import (
+    collapsed_stacks,
+    finish_profile,
+    get_profile,
+    list_profiles,
+    profile_summary,
+    requested_mode,
+    start_profile,
+    token_matches,
+)
+
+profiling_bp = Blueprint("profiling", __name__)
+
+
+@profiling_bp.before_app_request
+def _maybe_start_profile():
+    mode = requested_mode(request.headers.get("X-Profile"), request.headers.get("X-Profile-Token"))
+    if mode is not None:
+        g.profile = start_profile(mode, request.method, request.path)
+
+
+@profiling_bp.after_app_request
+def _tag_profiled_response(response):
+    profile = g.get("profile")
+    if profile is not None:
+        response.headers["X-Profile-Id"] = profile["id"]
+        g.profile_status = response.status_code
+    return response
+
+
+@profiling_bp.teardown_app_request
+def _finish_profile(exc):
+    # Teardown runs after the response body was produced, so serialisation is included.
+    profile = g.pop("profile", None)
+    if profile is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        finish_profile(profile, route, g.pop("profile_status", 500 if exc else None))
+
+
+def _require_admin():
+    expected = os.getenv("PROFILING_TOKEN")
+    if not expected:
+        abort(404)
+    if not token_matches(request.headers.get("X-Profile-Token")):
+        abort(403)
+
+
+@profiling_bp.route("/admin/profiles", methods=["GET"])
+def profiles():
+    _require_admin()
+    return jsonify({"profiles": list_profiles()})
+
+
+@profiling_bp.route("/admin/profiles/<profile_id>", methods=["GET"])
+def profile_detail(profile_id: str):
+    _require_admin()
+    profile = get_profile(profile_id)
+    if profile is None:
+        return jsonify({"error": "profile not found"}), 404
+
+    output = request.args.get("format", "collapsed")
+    if output == "collapsed":
+        response = Response(collapsed_stacks(profile), mimetype="text/plain")
+        response.headers["Content-Disposition"] = f'attachment; filename="profile-{profile_id}.folded"'
+        return response
+    if output == "pstats":
+        if "pstats" not in profile:
+            return jsonify({"error": "pstats output needs a cprofile-mode profile"}), 400
+        return Response(profile["pstats"], mimetype="text/plain")
+    if output == "json":
+        return jsonify({**profile_summary(profile), "stacks": dict(profile["stacks"].most_common())})
+    return jsonify({"error": "format must be collapsed, pstats or json"}), 400
@@ -0,0 +1,221 @@
+import json
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from itertools import count
+from threading import Condition
+from typing import Iterator
+
+from flask import jsonify
+
+from app.services import metrics
+
+# Admission control for the compute-heavy routes (feature extraction and
+# Ollama generation). Every admitted request holds one slot of this process's
+# budget (ADMISSION_CAPACITY) and one of its route's own slots. The budgets
+# are per process: under prefork_server.py the node admits VISIONIX_WORKERS
+# times these numbers, so size them per worker. Waiters are
+# served by priority class, then arrival order, and bulk traffic can never
+# take the ADMISSION_INTERACTIVE_RESERVED slots kept for interactive routes,
+# so a burst of /extract uploads queues behind chat rather than in front of
+# it. A route whose queue is full, or whose request waited longer than its
+# max wait, is answered 503 with a Retry-After estimated from recent
+# service times.
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"interactive": 0, "bulk": 1, "background": 2}
+
+# route: (priority class, concurrency, queue limit, max wait seconds)
+_DEFAULT_POLICIES: dict[str, tuple[str, int, int, float]] = {
+    "chat": ("interactive", 4, 16, 30.0),
+    "reason": ("interactive", 4, 16, 30.0),
+    "describe": ("interactive", 2, 8, 30.0),
+    "search": ("bulk", 2, 8, 10.0),
+    "extract": ("bulk", 2, 8, 10.0),
+    "jobs": ("background", 2, 0, 0.0),
+}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, route: str, reason: str, retry_after: int) -> None:
+        super().__init__(f"{route} is overloaded ({reason})")
+        self.route = route
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _policy(route: str) -> dict:
+    priority, concurrency, queue, max_wait = _DEFAULT_POLICIES[route]
+    prefix = f"ADMISSION_{route.upper()}"
+    return {
+        "priority": priority,
+        "concurrency": max(int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))), 1),
+        "queue": int(os.getenv(f"{prefix}_QUEUE", str(queue))),
+        "max_wait": float(os.getenv(f"{prefix}_MAX_WAIT_SECONDS", str(max_wait))),
+    }
+
+
+def process_capacity() -> int:
+    """Requests this process admits at once, across all routes."""
+    return max(int(os.getenv("ADMISSION_CAPACITY", "4")), 1)
+
+
+class _Controller:
+    def __init__(self) -> None:
+        self._cond = Condition()
+        self._seq = count()
+        self._waiters: list[tuple[int, int, str]] = []
+        self._active: dict[str, int] = {}
+        self._queued: dict[str, int] = {}
+        self._service_ewma: dict[str, float] = {}
+
+    def _class_limit(self, priority: str) -> int:
+        capacity = process_capacity()
+        if priority == "interactive":
+            return capacity
+        reserved = int(os.getenv("ADMISSION_INTERACTIVE_RESERVED", "1"))
+        return max(capacity - reserved, 1)
+
+    def _has_room(self, route: str) -> bool:
+        policy = _policy(route)
+        return (
+            self._active.get(route, 0) < policy["concurrency"]
+            and sum(self._active.values()) < self._class_limit(policy["priority"])
+        )
+
+    def _can_admit(self, ticket: tuple[int, int, str]) -> bool:
+        if not self._has_room(ticket[2]):
+            return False
+        # A waiter ahead of us (higher priority or earlier) that could run now
+        # goes first; one blocked only by its own route limit does not hold us up.
+        return not any(waiter < ticket and self._has_room(waiter[2]) for waiter in self._waiters)
+
+    def _retry_after(self, route: str) -> int:
+        policy = _policy(route)
+        service = self._service_ewma.get(route, 5.0)
+        backlog = self._queued.get(route, 0) + self._active.get(route, 0)
+        estimate = math.ceil(service * backlog / policy["concurrency"])
+        return min(max(estimate, 1), int(os.getenv("ADMISSION_MAX_RETRY_AFTER_SECONDS", "60")))
+
+    def _reject(self, route: str, reason: str) -> AdmissionRejected:
+        retry_after = self._retry_after(route)
+        metrics.inc("visionix_admission_rejected_total", route=route, reason=reason)
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "admission_rejected",
+                    "route": route,
+                    "reason": reason,
+                    "active": self._active.get(route, 0),
+                    "queued": self._queued.get(route, 0),
+                    "retry_after": retry_after,
+                }
+            )
+        )
+        return AdmissionRejected(route, reason, retry_after)
+
+    def acquire(self, route: str, block: bool = False) -> None:
+        """Take a slot for `route`, waiting by priority; raises AdmissionRejected.
+
+        `block` waits without a queue limit or deadline, for callers such as
+        the job workers whose backlog is already bounded elsewhere.
+        """
+        policy = _policy(route)
+        ticket = (PRIORITIES[policy["priority"]], next(self._seq), route)
+        started = time.monotonic()
+        with self._cond:
+            if not self._can_admit(ticket):
+                if not block and self._queued.get(route, 0) >= policy["queue"]:
+                    raise self._reject(route, "queue_full")
+                self._waiters.append(ticket)
+                self._queued[route] = self._queued.get(route, 0) + 1
+                deadline = None if block else started + policy["max_wait"]
+                try:
+                    while not self._can_admit(ticket):
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise self._reject(route, "queue_timeout")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiters.remove(ticket)
+                    self._queued[route] -= 1
+                    # Our departure may unblock a lower-priority waiter.
+                    self._cond.notify_all()
+            self._active[route] = self._active.get(route, 0) + 1
+        metrics.observe("visionix_admission_wait_seconds", time.monotonic() - started, route=route)
+
+    def release(self, route: str, service_seconds: float) -> None:
+        with self._cond:
+            self._active[route] -= 1
+            previous = self._service_ewma.get(route)
+            self._service_ewma[route] = (
+                service_seconds if previous is None else 0.8 * previous + 0.2 * service_seconds
+            )
+            self._cond.notify_all()
+
+    def state(self) -> dict:
+        with self._cond:
+            routes = {
+                route: {
+                    **_policy(route),
+                    "active": self._active.get(route, 0),
+                    "queued": self._queued.get(route, 0),
+                    "avg_service_seconds": round(self._service_ewma.get(route, 0.0), 3),
+                }
+                for route in _DEFAULT_POLICIES
+            }
+            active = sum(self._active.values())
+        return {
+            "capacity": self._class_limit("interactive"),
+            "bulk_capacity": self._class_limit("bulk"),
+            "active": active,
+            "routes": routes,
+        }
+
+
+_CONTROLLER = _Controller()
+
+
+@contextmanager
+def admission_slot(route: str, block: bool = False) -> Iterator[None]:
+    _CONTROLLER.acquire(route, block=block)
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        _CONTROLLER.release(route, time.monotonic() - started)
+
+
+def admission_state() -> dict:
+    return _CONTROLLER.state()
+
+
+def admission_controlled(route: str):
+    """Run a view inside `route`'s admission slot; overload becomes 503 + Retry-After."""
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            try:
+                _CONTROLLER.acquire(route)
+            except AdmissionRejected as exc:
+                response = jsonify({"error": "Server is busy, please retry shortly.", "reason": exc.reason})
+                response.headers["Retry-After"] = str(exc.retry_after)
+                return response, 503
+            started = time.monotonic()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                _CONTROLLER.release(route, time.monotonic() - started)
+
+        return wrapper
+
+    return decorator
+
+
+metrics.describe("visionix_admission_wait_seconds", "histogram", "Time admitted requests waited for a slot, by route.")
+metrics.describe("visionix_admission_rejected_total", "counter", "Requests shed by admission control, by route and reason.")
@@ -0,0 +1,145 @@
+import hashlib
+import hmac
+import io
+import os
+import re
+import shutil
+import tempfile
+from typing import BinaryIO
+from urllib.parse import quote
+
+from PIL import Image
+
+from app.config import Config
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+# Two content-addressed namespaces with separate retention budgets (see
+# upload_manager): chat images, which chat history links to, and every other
+# upload, which only lives as long as the request or job that needs it.
+_NAMESPACE_ROOTS = {
+    "chat": ("CHAT_BLOB_ROOT", "uploads/blobs"),
+    "uploads": ("UPLOAD_BLOB_ROOT", "uploads/store"),
+}
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def blob_root(namespace: str = "chat") -> str:
+    env_name, default = _NAMESPACE_ROOTS[namespace]
+    return os.getenv(env_name, default)
+
+
+def _is_valid_hash(blob_hash: str) -> bool:
+    return bool(blob_hash) and bool(_HASH_RE.match(blob_hash))
+
+
+def blob_path(blob_hash: str, thumbnail: bool = False, namespace: str = "chat") -> str:
+    """Path of a blob on disk, sharded by the first two hex bytes of its sha256."""
+    if not _is_valid_hash(blob_hash):
+        raise ValueError("Invalid blob hash")
+    kind = "thumbs" if thumbnail else "objects"
+    suffix = ".jpg" if thumbnail else ""
+    return os.path.join(blob_root(namespace), kind, blob_hash[:2], blob_hash[2:4], f"{blob_hash}{suffix}")
+
+
+def _write_thumbnail(source_path: str, blob_hash: str) -> bool:
+    thumb_path = blob_path(blob_hash, thumbnail=True)
+    if os.path.exists(thumb_path):
+        return True
+
+    size = int(os.getenv("CHAT_THUMBNAIL_SIZE", "256"))
+    try:
+        with Image.open(source_path) as image:
+            image.draft("RGB", (size, size))
+            image = image.convert("RGB")
+            image.thumbnail((size, size))
+            os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(thumb_path), prefix=".tmp-")
+            with os.fdopen(fd, "wb") as out:
+                image.save(out, format="JPEG", quality=80)
+            os.replace(tmp_path, thumb_path)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def put_blob_stream(stream: BinaryIO, namespace: str = "chat", thumbnail: bool | None = None) -> dict:
+    """Store a stream once under its sha256, hashing it while it is spooled.
+
+    Bodies up to UPLOAD_SPOOL_MAX_BYTES stay in memory; larger ones spill to a
+    temp file. Identical content maps to the same file, so a repeat upload only
+    refreshes the blob's mtime (which retention GC reads as last use). Chat
+    blobs also get a JPEG thumbnail unless `thumbnail` says otherwise.
+    """
+    spool_max = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.SpooledTemporaryFile(max_size=spool_max) as spool:
+        while True:
+            chunk = stream.read(_COPY_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+            spool.write(chunk)
+            size += len(chunk)
+
+        blob_hash = digest.hexdigest()
+        path = blob_path(blob_hash, namespace=namespace)
+        deduplicated = os.path.exists(path)
+        if deduplicated:
+            os.utime(path)
+        else:
+            spool.seek(0)
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    shutil.copyfileobj(spool, out, _COPY_CHUNK_BYTES)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    if thumbnail is None:
+        thumbnail = namespace == "chat"
+    has_thumbnail = _write_thumbnail(path, blob_hash) if thumbnail else False
+    return {
+        "hash": blob_hash,
+        "path": path,
+        "size": size,
+        "has_thumbnail": has_thumbnail,
+        "deduplicated": deduplicated,
+    }
+
+
+def put_blob(data: bytes, namespace: str = "chat") -> dict:
+    """Store bytes once under their sha256; see put_blob_stream."""
+    return put_blob_stream(io.BytesIO(data), namespace=namespace)
+
+
+def sign_blob(blob_hash: str) -> str:
+    secret = Config.CHAT_BLOB_URL_SECRET
+    if not secret:
+        raise RuntimeError("CHAT_BLOB_URL_SECRET is not set")
+    return hmac.new(secret.encode("utf-8"), blob_hash.encode("ascii"), hashlib.sha256).hexdigest()[:32]
+
+
+def verify_blob_signature(blob_hash: str, signature: str) -> bool:
+    if not _is_valid_hash(blob_hash) or not signature:
+        return False
+    return hmac.compare_digest(sign_blob(blob_hash), signature)
+
+
+def blob_urls(blob_hash: str | None, mime_type: str | None = None) -> dict:
+    """Signed URLs for the full image and its thumbnail; <img> tags cannot send a bearer token."""
+    if not blob_hash:
+        return {"image_url": None, "thumbnail_url": None}
+    signature = sign_blob(blob_hash)
+    mime_param = f"&type={quote(mime_type, safe='')}" if mime_type else ""
+    return {
+        "image_url": f"/chat/blobs/{blob_hash}?sig={signature}{mime_param}",
+        "thumbnail_url": f"/chat/blobs/{blob_hash}?sig={signature}&thumb=1",
+    }
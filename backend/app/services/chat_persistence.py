@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import queue
+import time
+from threading import Lock, Thread
+from typing import Any, Callable
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+_WRITE_QUEUE: queue.Queue | None = None
+_WRITER_THREAD: Thread | None = None
+_WRITER_LOCK = Lock()
+
+
+def timed_execute(call_name: str, query: Any) -> Any:
+    """Run a Supabase query builder and log how long the round trip took."""
+    started = time.monotonic()
+    status = "ok"
+    try:
+        return query.execute()
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        metrics.observe("visionix_supabase_call_seconds", elapsed, call=call_name, status=status)
+        logger.info(
+            json.dumps(
+                {
+                    "event": "supabase_call",
+                    "call": call_name,
+                    "status": status,
+                    "elapsed_ms": int(elapsed * 1000),
+                }
+            )
+        )
+
+
+def _run_with_retry(call_name: str, build_query: Callable[[], Any]) -> None:
+    max_retries = int(os.getenv("CHAT_WRITE_MAX_RETRIES", "3"))
+    backoff = float(os.getenv("CHAT_WRITE_RETRY_BACKOFF_SECONDS", "0.5"))
+    for attempt in range(max_retries + 1):
+        try:
+            timed_execute(call_name, build_query())
+            return
+        except Exception as exc:
+            if attempt >= max_retries:
+                logger.error(
+                    json.dumps(
+                        {
+                            "event": "supabase_background_write_failed",
+                            "call": call_name,
+                            "attempts": attempt + 1,
+                            "error": str(exc),
+                        }
+                    )
+                )
+                return
+            time.sleep(backoff * (2 ** attempt))
+
+
+def _writer_loop(write_queue: queue.Queue) -> None:
+    while True:
+        call_name, build_query = write_queue.get()
+        try:
+            _run_with_retry(call_name, build_query)
+        finally:
+            write_queue.task_done()
+
+
+def _get_write_queue() -> queue.Queue:
+    global _WRITE_QUEUE, _WRITER_THREAD
+
+    with _WRITER_LOCK:
+        if _WRITE_QUEUE is None:
+            _WRITE_QUEUE = queue.Queue(maxsize=int(os.getenv("CHAT_WRITE_QUEUE_SIZE", "1000")))
+        if _WRITER_THREAD is None or not _WRITER_THREAD.is_alive():
+            _WRITER_THREAD = Thread(
+                target=_writer_loop,
+                args=(_WRITE_QUEUE,),
+                name="chat-background-writer",
+                daemon=True,
+            )
+            _WRITER_THREAD.start()
+        return _WRITE_QUEUE
+
+
+def enqueue_write(call_name: str, build_query: Callable[[], Any]) -> None:
+    """Run a write whose result the response does not need on the background writer.
+
+    `build_query` returns a fresh query builder for every attempt. When the
+    queue is full the write runs inline instead of being dropped.
+    """
+    try:
+        _get_write_queue().put_nowait((call_name, build_query))
+    except queue.Full:
+        logger.warning(json.dumps({"event": "supabase_write_queue_full", "call": call_name}))
+        _run_with_retry(call_name, build_query)
+
+
+def write_queue_depth() -> int:
+    return _WRITE_QUEUE.qsize() if _WRITE_QUEUE is not None else 0
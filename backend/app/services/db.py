@@ -1,19 +1,53 @@
+import os
+import time
+from threading import Lock
 from typing import Optional
+from app.services import metrics
 from app.services.supabase_client import get_supabase_client
 
+# Model rows change rarely, so lookups are cached per id for
+# MODEL_REGISTRY_TTL_SECONDS; misses are cached briefly too.
+_MODEL_CACHE: dict[str, tuple[float, Optional[dict]]] = {}
+_MODEL_CACHE_LOCK = Lock()
 
-def get_model_by_id(model_id):
+
+def _fetch_model(model_id):
     supabase=get_supabase_client()
     response = (
         supabase
         .table("models")
         .select("*")
         .eq("id", model_id)
-        .single()
+        .limit(1)
         .execute()
     )
 
     if response.data:
-        return response.data
+        return response.data[0]
+
+    return None
+
+
+def get_model_by_id(model_id):
+    now = time.monotonic()
+    with _MODEL_CACHE_LOCK:
+        cached = _MODEL_CACHE.get(model_id)
+        hit = bool(cached and cached[0] > now)
+    metrics.count_cache("model_registry", hit)
+    if hit:
+        return cached[1]
+
+    model = _fetch_model(model_id)
+    ttl_env = "MODEL_REGISTRY_TTL_SECONDS" if model else "MODEL_REGISTRY_MISS_TTL_SECONDS"
+    ttl = float(os.getenv(ttl_env, "300" if model else "30"))
+    with _MODEL_CACHE_LOCK:
+        _MODEL_CACHE[model_id] = (now + ttl, model)
+    return model
+
 
-    return None
\ No newline at end of file
+def invalidate_model(model_id=None):
+    with _MODEL_CACHE_LOCK:
+        if model_id is None:
+            _MODEL_CACHE.clear()
+        else:
+            _MODEL_CACHE.pop(model_id, None)
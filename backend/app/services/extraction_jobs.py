@@ -0,0 +1,380 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from threading import Event, Lock, Thread, local
+from typing import Any, Callable
+
+from app.services.admission import admission_slot
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ("extract", "describe", "search")
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class JobQueueFull(Exception):
+    """Raised when the number of queued jobs has reached EXTRACTION_JOB_MAX_QUEUED."""
+
+
+def _now() -> float:
+    return time.time()
+
+
+class JobQueue:
+    """Extraction jobs in a WAL-mode SQLite file, so queued work survives restarts
+    and every worker process on the node drains the same queue.
+
+    Jobs move queued -> running -> succeeded | failed. A running job whose
+    heartbeat (updated_at) goes stale is assumed to belong to a dead worker and
+    is queued again until it runs out of attempts.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "create table if not exists extraction_jobs ("
+            " id text primary key,"
+            " kind text not null,"
+            " status text not null,"
+            " stage text,"
+            " user_id text,"
+            " params text not null,"
+            " result text,"
+            " error text,"
+            " attempts integer not null default 0,"
+            " created_at real not null,"
+            " started_at real,"
+            " finished_at real,"
+            " updated_at real not null)"
+        )
+        conn.execute(
+            "create index if not exists idx_extraction_jobs_status_created_at"
+            " on extraction_jobs (status, created_at)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, kind: str, params: dict[str, Any], user_id: str | None = None) -> dict[str, Any]:
+        max_queued = int(os.getenv("EXTRACTION_JOB_MAX_QUEUED", "200"))
+        now = _now()
+        job_id = str(uuid.uuid4())
+        conn = self._conn()
+        conn.execute("begin immediate")
+        try:
+            (queued,) = conn.execute(
+                "select count(*) from extraction_jobs where status = 'queued'"
+            ).fetchone()
+            if queued >= max_queued:
+                raise JobQueueFull(f"{queued} extraction jobs already queued")
+            conn.execute(
+                "insert into extraction_jobs (id, kind, status, user_id, params, created_at, updated_at)"
+                " values (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, user_id, json.dumps(params, ensure_ascii=False), now, now),
+            )
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        row = self._conn().execute("select * from extraction_jobs where id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def queue_position(self, job: dict[str, Any]) -> int | None:
+        if job["status"] != "queued":
+            return None
+        (ahead,) = self._conn().execute(
+            "select count(*) from extraction_jobs where status = 'queued' and created_at < ?",
+            (job["created_at"],),
+        ).fetchone()
+        return ahead
+
+    def claim(self) -> dict[str, Any] | None:
+        """Atomically move the oldest queued job to running and return it."""
+        now = _now()
+        conn = self._conn()
+        conn.execute("begin immediate")
+        try:
+            row = conn.execute(
+                "select id from extraction_jobs where status = 'queued' order by created_at limit 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("rollback")
+                return None
+            conn.execute(
+                "update extraction_jobs set status = 'running', stage = 'starting', attempts = attempts + 1,"
+                " started_at = ?, updated_at = ? where id = ?",
+                (now, now, row["id"]),
+            )
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+        return self.get(row["id"])
+
+    def set_stage(self, job_id: str, stage: str) -> None:
+        self._conn().execute(
+            "update extraction_jobs set stage = ?, updated_at = ? where id = ? and status = 'running'",
+            (stage, _now(), job_id),
+        )
+
+    def finish(self, job_id: str, result: Any = None, error: str | None = None) -> None:
+        now = _now()
+        self._conn().execute(
+            "update extraction_jobs set status = ?, stage = ?, result = ?, error = ?,"
+            " finished_at = ?, updated_at = ? where id = ?",
+            (
+                "failed" if error is not None else "succeeded",
+                "failed" if error is not None else "done",
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                error,
+                now,
+                now,
+                job_id,
+            ),
+        )
+
+    def requeue_stale(self) -> int:
+        """Return abandoned running jobs to the queue, or fail them once out of attempts."""
+        stale_before = _now() - float(os.getenv("EXTRACTION_JOB_STALE_SECONDS", "600"))
+        max_attempts = int(os.getenv("EXTRACTION_JOB_MAX_ATTEMPTS", "2"))
+        conn = self._conn()
+        conn.execute(
+            "update extraction_jobs set status = 'failed', stage = 'failed', error = 'worker lost',"
+            " finished_at = ?, updated_at = ? where status = 'running' and updated_at < ? and attempts >= ?",
+            (_now(), _now(), stale_before, max_attempts),
+        )
+        cursor = conn.execute(
+            "update extraction_jobs set status = 'queued', stage = null, updated_at = ?"
+            " where status = 'running' and updated_at < ?",
+            (_now(), stale_before),
+        )
+        return cursor.rowcount
+
+    def status_counts(self) -> dict[str, int]:
+        rows = self._conn().execute(
+            "select status, count(*) from extraction_jobs where status in ('queued', 'running') group by status"
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+    def purge_finished(self) -> int:
+        keep_seconds = float(os.getenv("EXTRACTION_JOB_RETENTION_SECONDS", "86400"))
+        cursor = self._conn().execute(
+            "delete from extraction_jobs where status in ('succeeded', 'failed') and finished_at < ?",
+            (_now() - keep_seconds,),
+        )
+        return cursor.rowcount
+
+
+_JOB_QUEUE: JobQueue | None = None
+_JOB_QUEUE_LOCK = Lock()
+_WORKERS: list[Thread] = []
+_WORKERS_LOCK = Lock()
+_WAKE = Event()
+_DRAINING = Event()
+
+
+def begin_drain() -> None:
+    """Ask open job event streams to end; the process is about to exit."""
+    _DRAINING.set()
+
+
+def draining() -> bool:
+    return _DRAINING.is_set()
+
+
+def get_job_queue() -> JobQueue:
+    global _JOB_QUEUE
+
+    with _JOB_QUEUE_LOCK:
+        if _JOB_QUEUE is None:
+            _JOB_QUEUE = JobQueue(os.getenv("EXTRACTION_JOB_DB_PATH", "data/extraction_jobs.sqlite3"))
+        return _JOB_QUEUE
+
+
+def submit_job(kind: str, params: dict[str, Any], user_id: str | None = None) -> dict[str, Any]:
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = get_job_queue().submit(kind, params, user_id)
+    _WAKE.set()
+    return job
+
+
+def _run_extract(job: dict[str, Any], progress: Callable[[str], None]) -> dict[str, Any]:
+    # Same pipeline as POST /extract.
+    import numpy as np
+
+    from app.services.extraction_store import add_extraction_record
+    from app.services.inference import extract_features_with_model
+    from app.services.vector_store import add_vector
+
+    params = job["params"]
+    features = extract_features_with_model(params["image_path"], params.get("model_id"), progress)
+    progress("indexing")
+    embedding = np.load(features["clip_embedding_path"])
+    add_vector(
+        embedding.tolist(),
+        {
+            "filename": params["image_name"],
+            "caption": features["caption"],
+            "objects": features["objects"],
+            "scene": features["scene_labels"],
+            "model_id": params.get("model_id"),
+            "user_id": job["user_id"],
+        },
+    )
+    record = add_extraction_record(
+        features=features,
+        image_name=params["image_name"],
+        image_path=params["image_path"],
+        source="extract",
+        user_id=job["user_id"],
+    )
+    return {**features, "id": record["id"], "timestamp": record["timestamp"], "source": record["source"]}
+
+
+def _run_describe(job: dict[str, Any], progress: Callable[[str], None]) -> dict[str, Any]:
+    # Same pipeline as POST /describe.
+    from app.services.extraction_store import add_extraction_record
+    from app.services.inference import extract_features
+    from app.services.ollama_service import generate_with_ollama
+
+    params = job["params"]
+    features = extract_features(params["image_path"], progress)
+    record = add_extraction_record(
+        features=features,
+        image_name=params["image_name"],
+        image_path=params["image_path"],
+        source="describe",
+        user_id=job["user_id"],
+    )
+    progress("reasoning")
+    model = params.get("model") or os.getenv("OLLAMA_MODEL", "qwen3-vl:8b")
+    llm_text = generate_with_ollama(
+        features=features,
+        image_path=params["image_path"],
+        user_prompt=params.get("prompt"),
+        ollama_model=params.get("model"),
+    )
+    return {"model": model, "features": features, "extraction_id": record["id"], "llm_response": llm_text}
+
+
+def _run_search(job: dict[str, Any], progress: Callable[[str], None]) -> list[dict[str, Any]]:
+    # Same pipeline as POST /search.
+    from app.services.inference import extract_features
+    from app.services.vector_store import search_vector
+
+    features = extract_features(job["params"]["image_path"], progress)
+    progress("searching")
+    return search_vector(features["embed"])
+
+
+_HANDLERS: dict[str, Callable[[dict[str, Any], Callable[[str], None]], Any]] = {
+    "extract": _run_extract,
+    "describe": _run_describe,
+    "search": _run_search,
+}
+
+
+def _run_job(queue: JobQueue, job: dict[str, Any]) -> None:
+    started = time.monotonic()
+    try:
+        # Queued jobs yield to interactive requests for inference and Ollama time.
+        with admission_slot("jobs", block=True):
+            result = _HANDLERS[job["kind"]](job, lambda stage: queue.set_stage(job["id"], stage))
+    except Exception as exc:
+        queue.finish(job["id"], error=str(exc) or exc.__class__.__name__)
+        status = "failed"
+    else:
+        queue.finish(job["id"], result=result)
+        status = "succeeded"
+    logger.info(
+        json.dumps(
+            {
+                "event": "extraction_job_finished",
+                "job_id": job["id"],
+                "kind": job["kind"],
+                "status": status,
+                "attempt": job["attempts"],
+                "queue_wait_ms": int((job["started_at"] - job["created_at"]) * 1000),
+                "run_ms": int((time.monotonic() - started) * 1000),
+            }
+        )
+    )
+
+
+def _worker_loop() -> None:
+    queue = get_job_queue()
+    poll_seconds = float(os.getenv("EXTRACTION_JOB_POLL_SECONDS", "2"))
+    while True:
+        try:
+            job = queue.claim()
+        except sqlite3.Error as exc:
+            logger.warning(json.dumps({"event": "extraction_job_claim_failed", "error": str(exc)}))
+            job = None
+        if job is None:
+            # Woken early by submit_job in this process; the poll picks up jobs
+            # submitted by other processes sharing the queue file.
+            _WAKE.wait(poll_seconds)
+            _WAKE.clear()
+            continue
+        _run_job(queue, job)
+
+
+def _maintenance_loop() -> None:
+    queue = get_job_queue()
+    interval = float(os.getenv("EXTRACTION_JOB_SWEEP_SECONDS", "60"))
+    while True:
+        try:
+            requeued = queue.requeue_stale()
+            purged = queue.purge_finished()
+            if requeued:
+                logger.warning(json.dumps({"event": "extraction_jobs_requeued", "count": requeued}))
+                _WAKE.set()
+            if purged:
+                logger.info(json.dumps({"event": "extraction_jobs_purged", "count": purged}))
+        except sqlite3.Error as exc:
+            logger.warning(json.dumps({"event": "extraction_job_sweep_failed", "error": str(exc)}))
+        time.sleep(interval)
+
+
+def start_job_workers() -> None:
+    """Start EXTRACTION_WORKERS job threads plus a sweeper; safe to call more than once."""
+    if os.getenv("EXTRACTION_JOBS_ENABLED", "true").lower() != "true":
+        return
+
+    with _WORKERS_LOCK:
+        if any(worker.is_alive() for worker in _WORKERS):
+            return
+        _WORKERS.clear()
+        workers = max(int(os.getenv("EXTRACTION_WORKERS", "2")), 1)
+        targets = [(_worker_loop, f"extraction-worker-{i}") for i in range(workers)]
+        targets.append((_maintenance_loop, "extraction-job-sweeper"))
+        for target, name in targets:
+            thread = Thread(target=target, name=name, daemon=True)
+            thread.start()
+            _WORKERS.append(thread)
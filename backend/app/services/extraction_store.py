@@ -1,12 +1,55 @@
 from __future__ import annotations
 
-from copy import deepcopy
+import json
+import os
+import sqlite3
 from datetime import datetime, timezone
-from threading import Lock
+from threading import Lock, local
 import uuid
 
-_EXTRACTIONS: list[dict] = []
-_EXTRACTION_LOCK = Lock()
+# Records live in SQLite so history survives restarts and is shared by every
+# worker process. `seq` gives newest-first order and doubles as the page cursor,
+# so listing a page costs the same however long the history grows.
+_SCHEMA = (
+    "create table if not exists extractions ("
+    " seq integer primary key autoincrement,"
+    " id text not null unique,"
+    " timestamp text not null,"
+    " source text not null,"
+    " user_id text,"
+    " image_path text,"
+    " data text not null)",
+    "create index if not exists idx_extractions_source_seq on extractions (source, seq)",
+    "create index if not exists idx_extractions_user_id_seq on extractions (user_id, seq)",
+    "create index if not exists idx_extractions_timestamp on extractions (timestamp)",
+    "create index if not exists idx_extractions_image_path on extractions (image_path)",
+)
+
+_LOCAL = local()
+_INIT_LOCK = Lock()
+_INITIALIZED_PATHS: set[str] = set()
+
+
+def _conn() -> sqlite3.Connection:
+    path = os.getenv("EXTRACTION_DB_PATH", "data/extractions.sqlite3")
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is not None and getattr(_LOCAL, "path", None) == path:
+        return conn
+
+    with _INIT_LOCK:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.execute("pragma journal_mode=wal")
+        conn.execute("pragma synchronous=normal")
+        if path not in _INITIALIZED_PATHS:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            _INITIALIZED_PATHS.add(path)
+    _LOCAL.conn = conn
+    _LOCAL.path = path
+    return conn
 
 
 def _now_utc_iso() -> str:
@@ -38,6 +81,7 @@ def add_extraction_record(
     image_name: str,
     image_path: str | None = None,
     source: str = "unknown",
+    user_id: str | None = None,
 ) -> dict:
     record = {
         "id": str(uuid.uuid4()),
@@ -56,22 +100,84 @@ def add_extraction_record(
 
     if image_path:
         record["image_path"] = image_path
+    if user_id:
+        record["user_id"] = user_id
+
+    _conn().execute(
+        "insert into extractions (id, timestamp, source, user_id, image_path, data) values (?, ?, ?, ?, ?, ?)",
+        (
+            record["id"],
+            record["timestamp"],
+            source,
+            user_id,
+            image_path,
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")),
+        ),
+    )
+    return record
+
+
+def list_extraction_records(
+    *,
+    limit: int = 50,
+    cursor: int | None = None,
+    source: str | None = None,
+    user_id: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+) -> dict:
+    """Return one newest-first page: {"extractions", "next_cursor", "has_more"}.
+
+    `cursor` is the `next_cursor` of the previous page; `since`/`until` bound
+    the ISO timestamp.
+    """
+    clauses: list[str] = []
+    params: list = []
+    if cursor is not None:
+        clauses.append("seq < ?")
+        params.append(cursor)
+    for column, value in (("source", source), ("user_id", user_id)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(until)
+
+    where = f" where {' and '.join(clauses)}" if clauses else ""
+    rows = _conn().execute(
+        f"select seq, data from extractions{where} order by seq desc limit ?",
+        (*params, limit + 1),
+    ).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "extractions": [json.loads(data) for _, data in rows],
+        "next_cursor": rows[-1][0] if has_more else None,
+        "has_more": has_more,
+    }
 
-    with _EXTRACTION_LOCK:
-        _EXTRACTIONS.insert(0, record)
 
-    return deepcopy(record)
+def find_extraction_by_image_path(image_path: str) -> dict | None:
+    row = _conn().execute(
+        "select data from extractions where image_path = ? order by seq desc limit 1",
+        (image_path,),
+    ).fetchone()
+    return json.loads(row[0]) if row else None
 
 
-def list_extraction_records() -> list[dict]:
-    with _EXTRACTION_LOCK:
-        return deepcopy(_EXTRACTIONS)
+def delete_extraction_record(extraction_id: str) -> bool:
+    cursor = _conn().execute("delete from extractions where id = ?", (extraction_id,))
+    return cursor.rowcount > 0
 
 
-def delete_extraction_record(extraction_id: str) -> bool:
-    with _EXTRACTION_LOCK:
-        for idx, record in enumerate(_EXTRACTIONS):
-            if record.get("id") == extraction_id:
-                del _EXTRACTIONS[idx]
-                return True
-    return False
+def referenced_embedding_files() -> set[str]:
+    """Embedding file names still referenced by an extraction record."""
+    rows = _conn().execute(
+        "select json_extract(data, '$.clip_embedding_file') from extractions"
+    ).fetchall()
+    return {name for (name,) in rows if name}
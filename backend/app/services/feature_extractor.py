@@ -1,13 +1,15 @@
 import os
 import base64
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from threading import Lock
 
 import numpy as np
 import torch
-from doctr.io import DocumentFile
-from PIL import Image
 
+from app.services import metrics, torch_runtime
+from app.services.image_ingest import load_image, load_ocr_image
 from app.models import (
     blip_model,
     blip_processor,
@@ -24,50 +26,92 @@ os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
 
+def _run_ocr(image):
+    with torch_runtime.inference("ocr"):
+        result = ocr_model([np.asarray(image)])
+
+    ocr_text = ""
+    for page in result.pages:
+        for block in page.blocks:
+            for line in block.lines:
+                ocr_text += " ".join([word.value for word in line.words]) + " "
+    return ocr_text
+
+
+def _has_text(image):
+    # Detection only: the text-box network without the recognition model.
+    with torch_runtime.inference("ocr"):
+        detections = ocr_model.det_predictor([np.asarray(image)])
+
+    boxes = detections[0]
+    if isinstance(boxes, dict):
+        return any(len(class_boxes) for class_boxes in boxes.values())
+    return len(boxes) > 0
+
+
+def _ocr_text(image_path, image):
+    # A detection-only pass at working resolution decides whether there is
+    # text at all; only then does the full OCR run, once, at OCR resolution.
+    if not _has_text(image):
+        return ""
+    full = load_ocr_image(image_path, image)
+    return _run_ocr(full if full is not None else image)
+
+
+def _color_texture(image):
+    # Computed on the working-resolution image. The per-channel mean matches
+    # a full-resolution decode closely, but the variance is lower for images
+    # whose texture is finer than the downscale, so texture_features from
+    # before uploads were decoded at working resolution are not comparable.
+    img_array = np.array(image)
+    return img_array.mean(axis=(0, 1)).tolist(), img_array.var(axis=(0, 1)).tolist()
+
+
 # ==============================
 # EXISTING LOCAL EXTRACTION
 # ==============================
-def extract_features(image_path):
+def extract_features(image_path, progress=None, image=None):
+    # `image` is an already decoded RGB image (e.g. from an inference worker's
+    # shared memory); every stage below reuses it instead of re-reading the file.
     print("🎶🎶🎶 Local")
-    image = Image.open(image_path).convert("RGB")
+    stage = metrics.StageClock("local", progress)
+    stage("caption")
+    if image is None:
+        image = load_image(image_path)
 
     # BLIP Caption
     inputs = blip_processor(image, return_tensors="pt").to(device)
-    out = blip_model.generate(**inputs)
+    with torch_runtime.inference("blip"):
+        out = blip_model.generate(**inputs)
     caption = blip_processor.decode(out[0], skip_special_tokens=True)
 
     # YOLO Objects
-    results = yolo_model(image)
+    stage("objects")
+    with torch_runtime.inference("yolo"):
+        results = yolo_model(image)
     objects = [
         yolo_model.names[int(box.cls)]
         for box in results[0].boxes
     ]
 
     # OCR
-    doc = DocumentFile.from_images(image_path)
-    result = ocr_model(doc)
-
-    ocr_text = ""
-    for page in result.pages:
-        for block in page.blocks:
-            for line in block.lines:
-                ocr_text += " ".join([word.value for word in line.words]) + " "
+    stage("ocr")
+    ocr_text = _ocr_text(image_path, image)
 
     # Scene
-    scene = classify_scene(image_path)
+    stage("scene")
+    scene = classify_scene(image_path, image=image)
 
-    # Color
-    img_array = np.array(image)
-    mean_color = img_array.mean(axis=(0, 1)).tolist()
-
-    # Texture
-    texture = img_array.var(axis=(0, 1)).tolist()
+    # Color and texture
+    stage("color_texture")
+    mean_color, texture = _color_texture(image)
 
     # CLIP Embedding
+    stage("embedding")
     clip_inputs = clip_processor(images=image, return_tensors="pt")
     clip_inputs = {k: v.to(device) for k, v in clip_inputs.items()}
 
-    with torch.no_grad():
+    with torch_runtime.inference("clip"):
         clip_vector = clip_model.get_image_features(
             pixel_values=clip_inputs["pixel_values"]
         )
@@ -77,6 +121,7 @@ def extract_features(image_path):
     )
     clip_vector = clip_vector.detach().cpu().numpy().flatten()
 
+    stage.finish()
     return _finalize_output(
         image_path,
         caption,
@@ -92,69 +137,78 @@ def extract_features(image_path):
 # ==============================
 # NEW: HF REMOTE EXTRACTION
 # ==============================
-from gradio_client import Client, handle_file
+from gradio_client import handle_file
 
-def _extract_from_hf(image_path, model_url):
+from app.services.db import get_model_by_id
+from app.services.gradio_pool import lease_client
 
-    print("😊😊 Hugging Face")
+_REMOTE_EXECUTOR = None
+_REMOTE_EXECUTOR_LOCK = Lock()
 
-    try:
-        client = Client(model_url)
 
-        result = client.predict(
-            handle_file(image_path),
-            api_name="/predict"
-        )
+def _get_remote_executor():
+    global _REMOTE_EXECUTOR
+
+    with _REMOTE_EXECUTOR_LOCK:
+        if _REMOTE_EXECUTOR is None:
+            _REMOTE_EXECUTOR = ThreadPoolExecutor(
+                max_workers=int(os.getenv("HF_REMOTE_WORKERS", "8")),
+                thread_name_prefix="hf-remote",
+            )
+        return _REMOTE_EXECUTOR
+
 
+def _predict_remote(image_path, model_url):
+    try:
+        with metrics.timed("visionix_hf_remote_seconds", space=model_url), lease_client(model_url) as client:
+            return client.predict(
+                handle_file(image_path),
+                api_name="/predict"
+            )
     except Exception as e:
         raise Exception(f"HF Gradio Client Error: {str(e)}")
 
-    # ----------------------------------------
-    # HF RETURNS ONLY YOLO DETECTIONS
-    # ----------------------------------------
-    detections = result.get("detections", [])
 
-    # Extract class_ids
-    class_ids = [d["class_id"] for d in detections]
+def _extract_from_hf(image_path, model_url, progress=None, image=None):
 
-    # Convert class_ids -> names using local YOLO model
-    objects = [yolo_model.names[int(cid)] for cid in class_ids]
+    print("😊😊 Hugging Face")
+    stage = metrics.StageClock("hf", progress)
+
+    # The Space call runs in the background while the local stages below run,
+    # so the request costs roughly max(remote, local) instead of the sum.
+    remote = _get_remote_executor().submit(_predict_remote, image_path, model_url)
 
     # ----------------------------------------
     # RUN ALL OTHER FEATURES LOCALLY
     # ----------------------------------------
-    image = Image.open(image_path).convert("RGB")
+    stage("caption")
+    if image is None:
+        image = load_image(image_path)
 
     # BLIP Caption
     inputs = blip_processor(image, return_tensors="pt").to(device)
-    out = blip_model.generate(**inputs)
+    with torch_runtime.inference("blip"):
+        out = blip_model.generate(**inputs)
     caption = blip_processor.decode(out[0], skip_special_tokens=True)
 
     # OCR
-    doc = DocumentFile.from_images(image_path)
-    ocr_result = ocr_model(doc)
-
-    ocr_text = ""
-    for page in ocr_result.pages:
-        for block in page.blocks:
-            for line in block.lines:
-                ocr_text += " ".join([word.value for word in line.words]) + " "
+    stage("ocr")
+    ocr_text = _ocr_text(image_path, image)
 
     # Scene
-    scene = classify_scene(image_path)
-
-    # Color
-    img_array = np.array(image)
-    mean_color = img_array.mean(axis=(0, 1)).tolist()
+    stage("scene")
+    scene = classify_scene(image_path, image=image)
 
-    # Texture
-    texture = img_array.var(axis=(0, 1)).tolist()
+    # Color and texture
+    stage("color_texture")
+    mean_color, texture = _color_texture(image)
 
     # CLIP Embedding (LOCAL)
+    stage("embedding")
     clip_inputs = clip_processor(images=image, return_tensors="pt")
     clip_inputs = {k: v.to(device) for k, v in clip_inputs.items()}
 
-    with torch.no_grad():
+    with torch_runtime.inference("clip"):
         clip_vector = clip_model.get_image_features(
             pixel_values=clip_inputs["pixel_values"]
         )
@@ -164,9 +218,23 @@ def _extract_from_hf(image_path, model_url):
     )
     clip_vector = clip_vector.detach().cpu().numpy().flatten()
 
+    # ----------------------------------------
+    # HF RETURNS ONLY YOLO DETECTIONS
+    # ----------------------------------------
+    stage("objects")
+    result = remote.result()
+    detections = result.get("detections", [])
+
+    # Extract class_ids
+    class_ids = [d["class_id"] for d in detections]
+
+    # Convert class_ids -> names using local YOLO model
+    objects = [yolo_model.names[int(cid)] for cid in class_ids]
+
     # ----------------------------------------
     # FINAL OUTPUT
     # ----------------------------------------
+    stage.finish()
     return _finalize_output(
         image_path,
         caption,
@@ -182,18 +250,22 @@ def _extract_from_hf(image_path, model_url):
 # ==============================
 # NEW: SMART ROUTER FUNCTION
 # ==============================
-def extract_features_with_model(image_path, model_id):
+def extract_features_with_model(image_path, model_id, progress=None, image=None):
     """
-    model -> DB model object
+    model -> DB model object, or its id (resolved through the cached registry)
     """
 
     # LOCAL DEFAULT MODEL
     print(model_id)
+    if isinstance(model_id, str) and model_id:
+        model_id = get_model_by_id(model_id)
+        if not model_id:
+            raise ValueError("Model not found")
     if model_id:
-        return  _extract_from_hf(image_path, model_id["hf_space_url"]) 
+        return  _extract_from_hf(image_path, model_id["hf_space_url"], progress, image) 
 
     # HF MODEL
-    return extract_features(image_path)
+    return extract_features(image_path, progress, image)
 
 
 # ==============================
@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator
+
+from gradio_client import Client
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+_POOL_LOCK = Lock()
+_IDLE: dict[str, list[Client]] = {}
+_CREATED: dict[str, int] = {}
+
+
+def _max_idle_per_space() -> int:
+    return int(os.getenv("GRADIO_CLIENTS_PER_SPACE", "4"))
+
+
+def _new_client(space_url: str) -> Client:
+    # The constructor fetches the Space's API schema, which is why clients are pooled.
+    started = time.monotonic()
+    client = Client(space_url)
+    logger.info(
+        json.dumps(
+            {
+                "event": "gradio_client_created",
+                "space": space_url,
+                "elapsed_ms": int((time.monotonic() - started) * 1000),
+            }
+        )
+    )
+    return client
+
+
+@contextmanager
+def lease_client(space_url: str) -> Iterator[Client]:
+    """Borrow a ready Client for a Space, creating one only when none is idle.
+
+    A client whose call raises is dropped rather than returned, so a broken
+    connection or stale schema is rebuilt on the next lease.
+    """
+    with _POOL_LOCK:
+        idle = _IDLE.setdefault(space_url, [])
+        client = idle.pop() if idle else None
+    metrics.count_cache("gradio_client", client is not None)
+
+    if client is None:
+        client = _new_client(space_url)
+        with _POOL_LOCK:
+            _CREATED[space_url] = _CREATED.get(space_url, 0) + 1
+
+    # An exception raised in the block propagates from this yield, so the
+    # client is only pooled again after a clean call.
+    yield client
+    with _POOL_LOCK:
+        idle = _IDLE.setdefault(space_url, [])
+        if len(idle) < _max_idle_per_space():
+            idle.append(client)
+
+
+def drop_space(space_url: str) -> None:
+    with _POOL_LOCK:
+        _IDLE.pop(space_url, None)
+
+
+def pool_stats() -> dict[str, dict[str, int]]:
+    with _POOL_LOCK:
+        return {
+            url: {"idle": len(_IDLE.get(url, [])), "created": _CREATED.get(url, 0)}
+            for url in set(_IDLE) | set(_CREATED)
+        }
@@ -0,0 +1,76 @@
+import os
+from typing import BinaryIO
+
+from PIL import Image
+
+# Uploads are probed from their header before anything decodes them, and are
+# then decoded straight to the working resolution the pipeline needs. Every
+# model resizes far below camera resolution (CLIP 224, scene 256, BLIP 384,
+# YOLO 640, docTR detection 1024), so decoding a 50 MP photo in full only to
+# throw most of it away costs hundreds of MB and milliseconds. JPEGs use
+# draft mode (the decoder's DCT scaling); other formats use Image.reduce via
+# thumbnail's reducing_gap. Only OCR goes back to a higher resolution, and
+# only when text detection at working resolution found text.
+
+
+class ImageRejected(ValueError):
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _max_pixels() -> int:
+    return int(os.getenv("INGEST_MAX_PIXELS", str(80_000_000)))
+
+
+def working_max_side() -> int:
+    return int(os.getenv("INGEST_WORK_MAX_SIDE", "1024"))
+
+
+def probe_image(source: str | BinaryIO) -> dict:
+    """Format and size from the header only; raises ImageRejected for bombs and non-images.
+
+    A file-like `source` is rewound afterwards so it can still be stored.
+    """
+    position = source.tell() if hasattr(source, "tell") else None
+    try:
+        with Image.open(source) as image:
+            width, height = image.size
+            info = {"format": image.format, "width": width, "height": height, "mode": image.mode}
+    except Image.DecompressionBombError as exc:
+        raise ImageRejected(str(exc), status=413) from exc
+    except (OSError, SyntaxError) as exc:
+        raise ImageRejected("Uploaded file is not a readable image") from exc
+    finally:
+        if position is not None:
+            source.seek(position)
+
+    if width * height > _max_pixels():
+        raise ImageRejected(
+            f"Image is {width}x{height} ({width * height / 1e6:.0f} MP); the limit is {_max_pixels() / 1e6:.0f} MP",
+            status=413,
+        )
+    return info
+
+
+def load_image(image_path: str, max_side: int | None = None) -> Image.Image:
+    """Decode `image_path` as RGB with its longer side at most `max_side` (default INGEST_WORK_MAX_SIDE)."""
+    max_side = max_side or working_max_side()
+    probe_image(image_path)
+    with Image.open(image_path) as image:
+        if max(image.size) > max_side:
+            # Only JPEG honours draft(); it picks the smallest DCT scale that
+            # still covers max_side, and thumbnail() finishes the resize.
+            image.draft("RGB", (max_side, max_side))
+            image.thumbnail((max_side, max_side), Image.Resampling.BICUBIC, reducing_gap=2.0)
+        return image.convert("RGB")
+
+
+def load_ocr_image(image_path: str, working: Image.Image) -> Image.Image | None:
+    """A higher-resolution decode for OCR, or None if `working` is already the full image."""
+    max_side = int(os.getenv("INGEST_OCR_MAX_SIDE", "2560"))
+    with Image.open(image_path) as image:
+        full_side = max(image.size)
+    if full_side <= max(working.size) or max(working.size) >= max_side:
+        return None
+    return load_image(image_path, max_side)
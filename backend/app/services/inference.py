@@ -0,0 +1,258 @@
+import json
+import logging
+import multiprocessing as mp
+import os
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+from multiprocessing import shared_memory
+from threading import Lock, Thread
+from typing import Any, Callable
+
+import numpy as np
+from PIL import Image
+
+from app.services import metrics, torch_runtime
+from app.services.image_ingest import load_image
+
+# Feature extraction entry points for the HTTP tier.
+#
+# With INFERENCE_WORKERS=0 (the default) they call feature_extractor in this
+# process. Otherwise N spawned worker processes each own a copy of the models
+# and this process never imports them: the image is decoded here once, its
+# pixels go to the worker through shared memory, and only the task header and
+# the features dict cross the IPC queues. Workers take tasks from one shared
+# queue, so throughput scales with the number of workers rather than being
+# bounded by this process's GIL.
+
+logger = logging.getLogger(__name__)
+
+_POOL_LOCK = Lock()
+_POOL: "_InferencePool | None" = None
+
+
+def _worker_count() -> int:
+    return int(os.getenv("INFERENCE_WORKERS", "0"))
+
+
+def _worker_main(tasks, results, torch_threads: int) -> None:
+    # Runs in a spawned process: loading feature_extractor loads every model.
+    torch_runtime.configure_process(torch_threads)
+    from app.services import feature_extractor
+
+    results.put(("ready", None, os.getpid()))
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id = task["id"]
+        results.put(("started", task_id, os.getpid()))
+        try:
+            shm = shared_memory.SharedMemory(name=task["shm_name"])
+            try:
+                # Copy out of the segment so the parent can unlink it as soon as
+                # the result arrives; the view itself must not outlive close().
+                pixels = np.ndarray(task["shape"], dtype=np.uint8, buffer=shm.buf).copy()
+            finally:
+                shm.close()
+            image = Image.fromarray(pixels, "RGB")
+
+            def _progress(stage: str) -> None:
+                results.put(("progress", task_id, stage))
+
+            if task["model"]:
+                features = feature_extractor.extract_features_with_model(
+                    task["image_path"], task["model"], _progress, image
+                )
+            else:
+                features = feature_extractor.extract_features(task["image_path"], _progress, image)
+            results.put(("done", task_id, features))
+        except Exception as exc:
+            results.put(("error", task_id, f"{exc.__class__.__name__}: {exc}"))
+
+
+class _InferencePool:
+    def __init__(self, workers: int) -> None:
+        self._ctx = mp.get_context("spawn")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._workers = workers
+        self._torch_threads = int(
+            os.getenv("INFERENCE_TORCH_THREADS")
+            or torch_runtime.process_threads(max((os.cpu_count() or 1) // workers, 1))
+        )
+        self._processes: list = []
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._lock = Lock()
+        for _ in range(workers):
+            self._spawn()
+        Thread(target=self._dispatch_loop, name="inference-dispatch", daemon=True).start()
+        Thread(target=self._monitor_loop, name="inference-monitor", daemon=True).start()
+
+    def _spawn(self) -> None:
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._tasks, self._results, self._torch_threads),
+            name="inference-worker",
+            daemon=True,
+        )
+        process.start()
+        self._processes.append(process)
+
+    def submit(
+        self, image_path: str, model: dict | None, progress: Callable[[str], Any] | None
+    ) -> tuple[str, Future]:
+        pixels = np.asarray(load_image(image_path))
+        shm = shared_memory.SharedMemory(create=True, size=max(pixels.nbytes, 1))
+        np.ndarray(pixels.shape, dtype=np.uint8, buffer=shm.buf)[:] = pixels
+
+        task_id = uuid.uuid4().hex
+        future: Future = Future()
+        with self._lock:
+            self._pending[task_id] = {
+                "future": future,
+                "shm": shm,
+                "clock": metrics.StageClock("hf" if model else "local", progress),
+                "pid": None,
+                "submitted_at": time.perf_counter(),
+            }
+        self._tasks.put(
+            {
+                "id": task_id,
+                "image_path": image_path,
+                "model": model,
+                "shm_name": shm.name,
+                "shape": pixels.shape,
+            }
+        )
+        return task_id, future
+
+    def cancel(self, task_id: str, reason: str) -> None:
+        self._complete(task_id, error=reason)
+
+    def _complete(self, task_id: str, result: Any = None, error: str | None = None) -> None:
+        with self._lock:
+            entry = self._pending.pop(task_id, None)
+        if entry is None:
+            return
+        entry["clock"].finish()
+        entry["shm"].close()
+        entry["shm"].unlink()
+        metrics.observe(
+            "visionix_inference_task_seconds",
+            time.perf_counter() - entry["submitted_at"],
+            status="error" if error is not None else "ok",
+        )
+        if error is not None:
+            entry["future"].set_exception(RuntimeError(error))
+        else:
+            entry["future"].set_result(result)
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            kind, task_id, payload = self._results.get()
+            if kind == "ready":
+                logger.info(json.dumps({"event": "inference_worker_ready", "worker_pid": payload}))
+            elif kind == "started":
+                with self._lock:
+                    if task_id in self._pending:
+                        self._pending[task_id]["pid"] = payload
+            elif kind == "progress":
+                with self._lock:
+                    entry = self._pending.get(task_id)
+                if entry is not None:
+                    entry["clock"](payload)
+            elif kind == "done":
+                self._complete(task_id, result=payload)
+            elif kind == "error":
+                self._complete(task_id, error=payload)
+
+    def _monitor_loop(self) -> None:
+        # A worker that dies (OOM, segfault in native code) takes its task with
+        # it: fail that task and start a replacement.
+        while True:
+            time.sleep(1.0)
+            for process in list(self._processes):
+                if process.is_alive():
+                    continue
+                self._processes.remove(process)
+                with self._lock:
+                    lost = [task_id for task_id, entry in self._pending.items() if entry["pid"] == process.pid]
+                for task_id in lost:
+                    self._complete(task_id, error=f"inference worker {process.pid} exited")
+                logger.warning(
+                    json.dumps(
+                        {
+                            "event": "inference_worker_exited",
+                            "worker_pid": process.pid,
+                            "exitcode": process.exitcode,
+                            "lost_tasks": len(lost),
+                        }
+                    )
+                )
+                self._spawn()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "workers": len(self._processes),
+            "alive": sum(process.is_alive() for process in self._processes),
+            "pending": pending,
+        }
+
+
+def _get_pool() -> "_InferencePool | None":
+    global _POOL
+
+    workers = _worker_count()
+    if workers <= 0:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = _InferencePool(workers)
+        return _POOL
+
+
+def start_inference_pool() -> None:
+    """Spawn the workers up front so the first request does not wait for model loading."""
+    _get_pool()
+
+
+def inference_stats() -> dict[str, int]:
+    pool = _POOL
+    return pool.stats() if pool is not None else {"workers": 0, "alive": 0, "pending": 0}
+
+
+def _run(image_path: str, model: dict | None, progress: Callable[[str], Any] | None) -> dict:
+    pool = _get_pool()
+    if pool is None:
+        from app.services import feature_extractor
+
+        if model:
+            return feature_extractor.extract_features_with_model(image_path, model, progress)
+        return feature_extractor.extract_features(image_path, progress)
+
+    timeout = float(os.getenv("INFERENCE_TASK_TIMEOUT_SECONDS", "300"))
+    task_id, future = pool.submit(image_path, model, progress)
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeout:
+        # Frees the shared memory; a late result for this task is ignored.
+        pool.cancel(task_id, f"inference task timed out after {timeout:.0f}s")
+        raise
+
+
+def extract_features(image_path: str, progress: Callable[[str], Any] | None = None) -> dict:
+    return _run(image_path, None, progress)
+
+
+def extract_features_with_model(image_path: str, model_id, progress: Callable[[str], Any] | None = None) -> dict:
+    """`model_id` is a model row or its id; ids are resolved here through the cached registry."""
+    if isinstance(model_id, str) and model_id:
+        from app.services.db import get_model_by_id
+
+        model_id = get_model_by_id(model_id)
+        if not model_id:
+            raise ValueError("Model not found")
+    return _run(image_path, model_id or None, progress)
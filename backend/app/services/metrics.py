@@ -0,0 +1,266 @@
+import math
+import time
+from contextlib import contextmanager
+from threading import Lock, Thread, current_thread, local
+from typing import Any, Callable, Iterator
+
+# Each thread records into its own shard, so the hot path is a dict lookup and
+# a few list increments with no lock; /metrics merges the shards on scrape.
+# The only lock is taken once per thread, when its shard is registered. Shards
+# of finished threads are folded into one retired shard whenever a new shard
+# is registered (and at scrape time), so with a thread per request the list
+# tracks the live threads whether or not anything scrapes.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_METADATA: dict[str, tuple[str, str, tuple[float, ...] | None]] = {}
+_GAUGE_CALLBACKS: dict[str, Callable[[], Any]] = {}
+_SHARDS: list[tuple[Thread, dict[tuple, list[float]]]] = []
+_RETIRED: dict[tuple, list[float]] = {}
+_SHARDS_LOCK = Lock()
+_LOCAL = local()
+
+
+def describe(name: str, kind: str, help_text: str, buckets: tuple[float, ...] | None = None) -> None:
+    """Register a metric's type (counter, histogram, gauge) and help line."""
+    if kind == "histogram" and buckets is None:
+        buckets = DEFAULT_BUCKETS
+    _METADATA[name] = (kind, help_text, buckets)
+
+
+def register_gauge(name: str, help_text: str, callback: Callable[[], Any]) -> None:
+    """Gauge computed at scrape time. `callback` returns a number or a list of (labels, value)."""
+    _METADATA[name] = ("gauge", help_text, None)
+    _GAUGE_CALLBACKS[name] = callback
+
+
+def _shard() -> dict[tuple, list[float]]:
+    shard = getattr(_LOCAL, "shard", None)
+    if shard is None:
+        shard = {}
+        with _SHARDS_LOCK:
+            _retire_dead_locked()
+            _SHARDS.append((current_thread(), shard))
+        _LOCAL.shard = shard
+    return shard
+
+
+def _key(name: str, labels: dict[str, Any]) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def inc(name: str, amount: float = 1.0, **labels: Any) -> None:
+    key = _key(name, labels)
+    shard = _shard()
+    series = shard.get(key)
+    if series is None:
+        series = shard[key] = [0.0]
+    series[0] += amount
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """Record one histogram sample (seconds for every *_seconds metric)."""
+    key = _key(name, labels)
+    shard = _shard()
+    series = shard.get(key)
+    buckets = _METADATA.get(name, ("histogram", "", DEFAULT_BUCKETS))[2] or DEFAULT_BUCKETS
+    if series is None:
+        # Layout: one count per bucket, then +Inf count, then sum.
+        series = shard[key] = [0.0] * (len(buckets) + 2)
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            series[i] += 1
+            break
+    else:
+        series[len(buckets)] += 1
+    series[-1] += value
+
+
+@contextmanager
+def timed(name: str, **labels: Any) -> Iterator[dict[str, Any]]:
+    """Observe the block's duration with a status label (ok or error).
+
+    The yielded dict can add or override labels before the block exits.
+    """
+    extra: dict[str, Any] = {}
+    started = time.perf_counter()
+    try:
+        yield extra
+    except Exception:
+        extra.setdefault("status", "error")
+        raise
+    else:
+        extra.setdefault("status", "ok")
+    finally:
+        observe(name, time.perf_counter() - started, **labels, **extra)
+
+
+@contextmanager
+def track_inflight(name: str, **labels: Any) -> Iterator[None]:
+    # In-flight = started - finished, both plain counters, so no shared gauge to lock.
+    inc(f"{name}__started", **labels)
+    try:
+        yield
+    finally:
+        inc(f"{name}__finished", **labels)
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    inc("visionix_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+class StageClock:
+    """Times each pipeline stage into visionix_extraction_stage_seconds.
+
+    Calling it with a stage name closes the previous stage; `progress` is the
+    optional per-stage callback extraction jobs use to stream progress.
+    """
+
+    def __init__(self, pipeline: str, progress: Callable[[str], Any] | None = None) -> None:
+        self.pipeline = pipeline
+        self.progress = progress
+        self.stage: str | None = None
+        self.started = 0.0
+
+    def __call__(self, stage: str) -> None:
+        self.finish()
+        self.stage = stage
+        self.started = time.perf_counter()
+        if self.progress is not None:
+            self.progress(stage)
+
+    def finish(self) -> None:
+        if self.stage is not None:
+            observe(
+                "visionix_extraction_stage_seconds",
+                time.perf_counter() - self.started,
+                pipeline=self.pipeline,
+                stage=self.stage,
+            )
+            self.stage = None
+
+
+def _fold(target: dict[tuple, list[float]], shard: dict[tuple, list[float]]) -> None:
+    for key, series in list(shard.items()):
+        total = target.get(key)
+        if total is None:
+            target[key] = list(series)
+        else:
+            for i, value in enumerate(series):
+                total[i] += value
+
+
+def _retire_dead_locked() -> None:
+    # A finished thread no longer writes to its shard, so it can be folded.
+    live = []
+    for thread, shard in _SHARDS:
+        if thread.is_alive():
+            live.append((thread, shard))
+        else:
+            _fold(_RETIRED, shard)
+    _SHARDS[:] = live
+
+
+def _merged() -> dict[tuple, list[float]]:
+    merged: dict[tuple, list[float]] = {}
+    with _SHARDS_LOCK:
+        _retire_dead_locked()
+        live = list(_SHARDS)
+        _fold(merged, _RETIRED)
+    for _, shard in live:
+        _fold(merged, shard)
+    return merged
+
+
+def _format_labels(labels: tuple | dict) -> str:
+    items = labels.items() if isinstance(labels, dict) else labels
+    parts = []
+    for key, value in items:
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    merged = _merged()
+    by_name: dict[str, list[tuple[tuple, list[float]]]] = {}
+    for (name, labels), series in merged.items():
+        by_name.setdefault(name, []).append((labels, series))
+
+    lines: list[str] = []
+
+    for name in sorted(by_name):
+        if name.endswith("__started") or name.endswith("__finished"):
+            continue
+        kind, help_text, buckets = _METADATA.get(name, ("counter", "", None))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, series in sorted(by_name[name]):
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(series[0])}")
+                continue
+            bounds = buckets or DEFAULT_BUCKETS
+            cumulative = 0.0
+            for bound, count in zip(bounds + (math.inf,), series[:-1]):
+                cumulative += count
+                bucket_labels = labels + (("le", _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {_format_value(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(series[-1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+
+    inflight_names = sorted({name[: -len("__started")] for name in by_name if name.endswith("__started")})
+    for name in inflight_names:
+        _, help_text, _ = _METADATA.get(name, ("gauge", "", None))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        finished = {labels: series[0] for labels, series in by_name.get(f"{name}__finished", [])}
+        for labels, series in sorted(by_name[f"{name}__started"]):
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(series[0] - finished.get(labels, 0.0))}")
+
+    cache_totals: dict[str, dict[str, float]] = {}
+    for labels, series in by_name.get("visionix_cache_requests_total", []):
+        label_map = dict(labels)
+        cache_totals.setdefault(label_map.get("cache", ""), {})[label_map.get("result", "")] = series[0]
+    if cache_totals:
+        lines.append("# HELP visionix_cache_hit_ratio Hits / lookups since process start.")
+        lines.append("# TYPE visionix_cache_hit_ratio gauge")
+        for cache, results in sorted(cache_totals.items()):
+            lookups = results.get("hit", 0.0) + results.get("miss", 0.0)
+            ratio = results.get("hit", 0.0) / lookups if lookups else 0.0
+            lines.append(f"visionix_cache_hit_ratio{_format_labels({'cache': cache})} {_format_value(round(ratio, 6))}")
+
+    for name in sorted(_GAUGE_CALLBACKS):
+        try:
+            value = _GAUGE_CALLBACKS[name]()
+        except Exception:
+            continue
+        _, help_text, _ = _METADATA[name]
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        if isinstance(value, list):
+            for labels, sample in value:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(sample)}")
+        else:
+            lines.append(f"{name} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+describe("visionix_http_request_duration_seconds", "histogram", "Flask request latency by route, method and status.")
+describe("visionix_http_requests_in_flight", "gauge", "Requests currently being handled, by route.")
+describe("visionix_extraction_stage_seconds", "histogram", "Feature extraction stage latency by pipeline and stage.")
+describe("visionix_hf_remote_seconds", "histogram", "Hugging Face Space prediction latency.")
+describe("visionix_ollama_attempt_seconds", "histogram", "Ollama HTTP attempt latency by attempt type and outcome.")
+describe("visionix_supabase_call_seconds", "histogram", "Supabase round-trip latency by call and status.",
+         buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+describe("visionix_vector_search_seconds", "histogram", "FAISS search latency.",
+         buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+describe("visionix_inference_task_seconds", "histogram", "Inference worker task latency, including queueing.")
+describe("visionix_cache_requests_total", "counter", "Cache lookups by cache and result (hit or miss).")
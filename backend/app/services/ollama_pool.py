@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Callable, Iterator
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+_POOL_LOCK = Lock()
+_BACKENDS: dict[str, dict[str, Any]] = {}
+# Session (or chat room) -> backend that last answered it, so follow-up turns
+# return to the node holding their prompt prefix in its KV cache.
+_AFFINITY: OrderedDict[str, str] = OrderedDict()
+
+
+def configured_urls() -> list[str]:
+    """OLLAMA_BASE_URLS (comma separated) or the single OLLAMA_BASE_URL."""
+    raw = os.getenv("OLLAMA_BASE_URLS") or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    urls = [url.strip().rstrip("/") for url in raw.split(",") if url.strip()]
+    return urls or ["http://localhost:11434"]
+
+
+def normalize_model_name(name: str) -> str:
+    name = (name or "").strip()
+    if name and ":" not in name:
+        return f"{name}:latest"
+    return name
+
+
+def model_names(payload: dict[str, Any]) -> set[str]:
+    names: set[str] = set()
+    for item in payload.get("models", []) or []:
+        if not isinstance(item, dict):
+            continue
+        for key in ("name", "model"):
+            value = item.get(key)
+            if isinstance(value, str) and value.strip():
+                names.add(normalize_model_name(value))
+    return names
+
+
+def _new_backend(url: str) -> dict[str, Any]:
+    return {
+        "url": url,
+        "healthy": True,
+        "ejected_until": 0.0,
+        "eject_reason": None,
+        "outstanding": 0,
+        "requests": 0,
+        "errors": 0,
+        "consecutive_failures": 0,
+        "last_leased_at": 0.0,
+        "ewma_latency_ms": None,
+        "last_latency_ms": None,
+        "available_models": set(),
+        "loaded_models": set(),
+        "probed_at": None,
+    }
+
+
+def _backends_locked() -> list[dict[str, Any]]:
+    # Picks up OLLAMA_BASE_URLS changes without a restart; caller holds _POOL_LOCK.
+    urls = configured_urls()
+    for url in urls:
+        if url not in _BACKENDS:
+            _BACKENDS[url] = _new_backend(url)
+    for url in list(_BACKENDS):
+        if url not in urls:
+            _BACKENDS.pop(url, None)
+    return [_BACKENDS[url] for url in urls]
+
+
+def _is_admitted(backend: dict[str, Any], now: float) -> bool:
+    # Once the ejection window has passed the backend is tried again even if the
+    # prober has not confirmed it yet; a failure there re-ejects it.
+    return backend["ejected_until"] <= now
+
+
+def _eject_locked(backend: dict[str, Any], reason: str) -> None:
+    eject_seconds = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))
+    backend["healthy"] = False
+    backend["ejected_until"] = time.monotonic() + eject_seconds
+    backend["eject_reason"] = reason
+    logger.warning(
+        json.dumps(
+            {
+                "event": "ollama_backend_ejected",
+                "url": backend["url"],
+                "reason": reason,
+                "eject_seconds": eject_seconds,
+            }
+        )
+    )
+
+
+def is_backend_failure(exc: BaseException) -> bool:
+    """Whether an exception says the backend is unhealthy, not that the request was bad.
+
+    Connection errors, timeouts and 5xx count; 4xx (unknown model, bad
+    request) and anything raised by the caller's own code do not.
+    """
+    if isinstance(exc, requests.HTTPError):
+        status = exc.response.status_code if exc.response is not None else None
+        return status is None or status >= 500
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+def _choose_locked(model_name: str | None, affinity_key: str | None = None) -> dict[str, Any]:
+    now = time.monotonic()
+    backends = _backends_locked()
+    wanted = normalize_model_name(model_name or "")
+    admitted = [b for b in backends if _is_admitted(b, now)]
+    if not admitted:
+        # Everything is ejected: try the backend that is due back first rather than fail outright.
+        return min(backends, key=lambda b: b["ejected_until"])
+
+    preferred = _BACKENDS.get(_AFFINITY.get(affinity_key, "")) if affinity_key else None
+    if preferred is not None and preferred in admitted and preferred["healthy"]:
+        # Stay on the session's backend unless it is clearly busier than the rest.
+        spill = int(os.getenv("OLLAMA_AFFINITY_MAX_EXTRA_OUTSTANDING", "2"))
+        if preferred["outstanding"] <= min(b["outstanding"] for b in admitted) + spill:
+            return preferred
+
+    def _rank(backend: dict[str, Any]) -> tuple[int, int, int, float, float]:
+        if wanted and wanted in backend["loaded_models"]:
+            residency = 0
+        elif wanted and wanted in backend["available_models"]:
+            residency = 1
+        else:
+            residency = 2
+        # Ties fall through to the least recently leased backend, i.e. round robin.
+        return (
+            residency,
+            backend["outstanding"],
+            backend["consecutive_failures"],
+            backend["ewma_latency_ms"] or 0.0,
+            backend["last_leased_at"],
+        )
+
+    return min(admitted, key=_rank)
+
+
+@contextmanager
+def lease_backend(
+    model_name: str | None = None,
+    affinity_key: str | None = None,
+    counts_as_failure: Callable[[BaseException], bool] = is_backend_failure,
+) -> Iterator[str]:
+    """Yield the base URL of the least-loaded admitted backend and record the outcome.
+
+    Routing prefers the backend that last served `affinity_key` while it is
+    healthy and not overloaded, then backends that already have `model_name`
+    loaded, then backends that have it pulled, then fewest outstanding
+    requests. An exception raised inside the block counts against the backend
+    only when `counts_as_failure` says so (see is_backend_failure).
+    """
+    with _POOL_LOCK:
+        backend = _choose_locked(model_name, affinity_key)
+        backend["outstanding"] += 1
+        backend["requests"] += 1
+        backend["last_leased_at"] = time.monotonic()
+        url = backend["url"]
+
+    started = time.monotonic()
+    outcome = "ok"
+    try:
+        yield url
+    except BaseException as exc:
+        outcome = "failed" if counts_as_failure(exc) else "rejected"
+        raise
+    finally:
+        elapsed_ms = (time.monotonic() - started) * 1000
+        _record_result(url, elapsed_ms, outcome)
+        if affinity_key and outcome == "ok":
+            _remember_affinity(affinity_key, url)
+
+
+def _remember_affinity(affinity_key: str, url: str) -> None:
+    max_entries = int(os.getenv("OLLAMA_AFFINITY_SIZE", "4096"))
+    with _POOL_LOCK:
+        _AFFINITY[affinity_key] = url
+        _AFFINITY.move_to_end(affinity_key)
+        while len(_AFFINITY) > max_entries:
+            _AFFINITY.popitem(last=False)
+
+
+def _record_result(url: str, elapsed_ms: float, outcome: str) -> None:
+    eject_after = int(os.getenv("OLLAMA_EJECT_AFTER_FAILURES", "3"))
+    eject_latency_ms = float(os.getenv("OLLAMA_EJECT_LATENCY_MS", "0"))
+    alpha = float(os.getenv("OLLAMA_LATENCY_EWMA_ALPHA", "0.3"))
+
+    with _POOL_LOCK:
+        backend = _BACKENDS.get(url)
+        if backend is None:
+            return
+        backend["outstanding"] = max(backend["outstanding"] - 1, 0)
+        if outcome == "rejected":
+            # The backend answered (4xx) or the caller gave up; says nothing about its health.
+            return
+        backend["last_latency_ms"] = int(elapsed_ms)
+        if outcome == "failed":
+            backend["errors"] += 1
+            backend["consecutive_failures"] += 1
+            if backend["consecutive_failures"] >= eject_after:
+                _eject_locked(backend, f"{backend['consecutive_failures']} consecutive failures")
+            return
+
+        backend["consecutive_failures"] = 0
+        backend["healthy"] = True
+        backend["eject_reason"] = None
+        previous = backend["ewma_latency_ms"]
+        backend["ewma_latency_ms"] = elapsed_ms if previous is None else alpha * elapsed_ms + (1 - alpha) * previous
+        if eject_latency_ms > 0 and backend["ewma_latency_ms"] > eject_latency_ms:
+            _eject_locked(backend, f"latency ewma {int(backend['ewma_latency_ms'])}ms")
+
+
+def probe_backend(url: str, timeout: float) -> dict[str, Any]:
+    """Refresh one backend's model lists from /api/tags and /api/ps; re-admit it if it answers."""
+    started = time.monotonic()
+    error = None
+    available: set[str] = set()
+    loaded: set[str] = set()
+    try:
+        tags = requests.get(f"{url}/api/tags", timeout=timeout)
+        tags.raise_for_status()
+        available = model_names(tags.json())
+        ps = requests.get(f"{url}/api/ps", timeout=timeout)
+        ps.raise_for_status()
+        loaded = model_names(ps.json())
+    except (requests.RequestException, ValueError) as exc:
+        error = str(exc)
+
+    with _POOL_LOCK:
+        _backends_locked()
+        backend = _BACKENDS.get(url)
+        if backend is not None:
+            backend["probed_at"] = time.time()
+            if error is None:
+                backend["available_models"] = available
+                backend["loaded_models"] = loaded
+                if not backend["healthy"] and backend["ejected_until"] <= time.monotonic():
+                    backend["healthy"] = True
+                    backend["consecutive_failures"] = 0
+                    backend["eject_reason"] = None
+                    logger.info(json.dumps({"event": "ollama_backend_readmitted", "url": url}))
+            elif _is_admitted(backend, time.monotonic()):
+                _eject_locked(backend, f"probe failed: {error}")
+
+    return {
+        "url": url,
+        "ok": error is None,
+        "available_models": sorted(available),
+        "loaded_models": sorted(loaded),
+        "probe_latency_ms": int((time.monotonic() - started) * 1000),
+        "error": error,
+    }
+
+
+def pool_stats() -> list[dict[str, Any]]:
+    now = time.monotonic()
+    with _POOL_LOCK:
+        stats = []
+        for backend in _backends_locked():
+            stats.append(
+                {
+                    "url": backend["url"],
+                    "admitted": _is_admitted(backend, now),
+                    "eject_reason": backend["eject_reason"],
+                    "outstanding": backend["outstanding"],
+                    "requests": backend["requests"],
+                    "errors": backend["errors"],
+                    "error_rate": round(backend["errors"] / backend["requests"], 4) if backend["requests"] else 0.0,
+                    "ewma_latency_ms": int(backend["ewma_latency_ms"]) if backend["ewma_latency_ms"] is not None else None,
+                    "last_latency_ms": backend["last_latency_ms"],
+                    "available_models": sorted(backend["available_models"]),
+                    "loaded_models": sorted(backend["loaded_models"]),
+                    "probed_at": backend["probed_at"],
+                }
+            )
+        return stats
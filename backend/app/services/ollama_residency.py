@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import time
+from threading import Event, Lock, Thread
+from typing import Any
+
+import requests
+
+from app.services.ollama_pool import configured_urls, normalize_model_name, pool_stats, probe_backend
+
+logger = logging.getLogger(__name__)
+
+_RESIDENCY_LOCK = Lock()
+_RESIDENCY_STATE: dict[str, dict[str, Any]] = {}
+_PROBER_THREAD: Thread | None = None
+_PROBER_STOP = Event()
+# Normalised names from the last /api/tags on any backend; a model outside this
+# set and the configured list is reported but never probed or preloaded.
+_PULLED_MODELS: set[str] = set()
+
+
+def _default_model() -> str:
+    return os.getenv("OLLAMA_MODEL", "qwen3-vl:8b")
+
+
+def keep_alive_value() -> str:
+    """Value sent as `keep_alive` so Ollama keeps the model resident between requests."""
+    return os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+
+def _configured_models() -> set[str]:
+    names = [_default_model(), *os.getenv("OLLAMA_TRACKED_MODELS", "").split(",")]
+    return {normalize_model_name(name.strip()) for name in names if name.strip()}
+
+
+def _trackable(model_name: str) -> bool:
+    wanted = normalize_model_name(model_name)
+    with _RESIDENCY_LOCK:
+        pulled = wanted in _PULLED_MODELS
+    return pulled or wanted in _configured_models()
+
+
+def _unknown_state(model_name: str) -> dict[str, Any]:
+    return {
+        "status": "unknown",
+        "base_urls": configured_urls(),
+        "model": model_name,
+        "available": False,
+        "resident": False,
+        "checked_at": None,
+        "probe_latency_ms": None,
+        "error": "Residency has not been probed yet",
+    }
+
+
+def track_model(model_name: str | None = None) -> str:
+    """Register a model with the background prober and return its name."""
+    model_name = model_name or _default_model()
+    with _RESIDENCY_LOCK:
+        _RESIDENCY_STATE.setdefault(model_name, _unknown_state(model_name))
+    return model_name
+
+
+def probe_residency(model_name: str | None = None) -> dict[str, Any]:
+    """Check availability (/api/tags) and residency (/api/ps) on every backend without running a generation."""
+    model_name = track_model(model_name)
+    timeout = float(os.getenv("OLLAMA_PROBE_TIMEOUT_SECONDS", "5"))
+    wanted = normalize_model_name(model_name)
+
+    started = time.monotonic()
+    probes = [probe_backend(url, timeout) for url in configured_urls()]
+    reachable = [p for p in probes if p["ok"]]
+    if reachable:
+        with _RESIDENCY_LOCK:
+            _PULLED_MODELS.clear()
+            for probe in reachable:
+                _PULLED_MODELS.update(normalize_model_name(name) for name in probe["available_models"])
+    available = [p["url"] for p in reachable if wanted in p["available_models"]]
+    resident = [p["url"] for p in reachable if wanted in p["loaded_models"]]
+
+    state: dict[str, Any] = {
+        "base_urls": configured_urls(),
+        "model": model_name,
+        "available": bool(available),
+        "resident": bool(resident),
+        "available_on": available,
+        "resident_on": resident,
+        "error": None,
+    }
+    if available:
+        state["status"] = "ok"
+    elif reachable:
+        state["status"] = "error"
+        state["error"] = f"Model '{model_name}' is not pulled on any Ollama backend"
+    else:
+        state["status"] = "error"
+        state["error"] = "; ".join(f"{p['url']}: {p['error']}" for p in probes)
+
+    state["checked_at"] = time.time()
+    state["probe_latency_ms"] = int((time.monotonic() - started) * 1000)
+
+    with _RESIDENCY_LOCK:
+        _RESIDENCY_STATE[model_name] = state
+    return dict(state)
+
+
+def preload_model(model_name: str | None = None, base_url: str | None = None) -> bool:
+    """Ask Ollama to load the model into memory (empty prompt, no generation)."""
+    model_name = model_name or _default_model()
+    if base_url is None:
+        results = [preload_model(model_name, url) for url in configured_urls()]
+        return any(results)
+
+    timeout = float(os.getenv("OLLAMA_PRELOAD_TIMEOUT_SECONDS", "300"))
+    started = time.monotonic()
+    try:
+        response = requests.post(
+            f"{base_url}/api/generate",
+            json={"model": model_name, "keep_alive": keep_alive_value()},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+    except requests.RequestException as exc:
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "ollama_preload_failed",
+                    "url": base_url,
+                    "model": model_name,
+                    "elapsed_ms": int((time.monotonic() - started) * 1000),
+                    "error": str(exc),
+                }
+            )
+        )
+        return False
+
+    logger.info(
+        json.dumps(
+            {
+                "event": "ollama_preload_completed",
+                "url": base_url,
+                "model": model_name,
+                "elapsed_ms": int((time.monotonic() - started) * 1000),
+            }
+        )
+    )
+    return True
+
+
+def get_cached_health(model_name: str | None = None) -> dict[str, Any]:
+    """Return the last probed state for a model; never touches the network.
+
+    Only configured models (OLLAMA_MODEL, OLLAMA_TRACKED_MODELS) and models a
+    backend lists in /api/tags are handed to the prober; any other name gets
+    an `unknown` state without being tracked.
+    """
+    model_name = model_name or _default_model()
+    with _RESIDENCY_LOCK:
+        state = _RESIDENCY_STATE.get(model_name)
+    if state is None:
+        state = _unknown_state(model_name)
+        if _trackable(model_name):
+            # First request for this model: let the prober pick it up.
+            with _RESIDENCY_LOCK:
+                state = _RESIDENCY_STATE.setdefault(model_name, state)
+        else:
+            state["error"] = f"Model '{model_name}' is not configured or pulled on any Ollama backend"
+    state = dict(state)
+    state["backends"] = pool_stats()
+    return state
+
+
+def _prober_loop() -> None:
+    interval = float(os.getenv("OLLAMA_PROBE_INTERVAL_SECONDS", "15"))
+    reload_evicted = os.getenv("OLLAMA_RELOAD_EVICTED", "true").lower() == "true"
+    default_model = _default_model()
+
+    if os.getenv("OLLAMA_PRELOAD_ON_STARTUP", "true").lower() == "true":
+        preload_model(default_model)
+
+    while not _PROBER_STOP.is_set():
+        with _RESIDENCY_LOCK:
+            tracked = list(_RESIDENCY_STATE)
+        for model_name in tracked:
+            state = probe_residency(model_name)
+            if reload_evicted and model_name == default_model:
+                for url in state.get("available_on", []):
+                    if url not in state.get("resident_on", []):
+                        preload_model(model_name, url)
+        _PROBER_STOP.wait(interval)
+
+
+def start_residency_manager() -> None:
+    """Start the background preload + prober thread once per process."""
+    global _PROBER_THREAD
+
+    if os.getenv("OLLAMA_RESIDENCY_ENABLED", "true").lower() != "true":
+        return
+
+    track_model(_default_model())
+    with _RESIDENCY_LOCK:
+        if _PROBER_THREAD is not None and _PROBER_THREAD.is_alive():
+            return
+        _PROBER_STOP.clear()
+        _PROBER_THREAD = Thread(target=_prober_loop, name="ollama-residency", daemon=True)
+        _PROBER_THREAD.start()
+
+
+def stop_residency_manager() -> None:
+    _PROBER_STOP.set()
@@ -1,11 +1,21 @@
 import base64
+import io
 import logging
 import os
 import json
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from threading import Event, Lock
 from typing import Any
 
 import requests
+from PIL import Image
+
+from app.services import metrics
+from app.services.admission import process_capacity
+from app.services.ollama_pool import configured_urls, is_backend_failure, lease_backend
+from app.services.ollama_residency import get_cached_health, keep_alive_value
 
 logger = logging.getLogger(__name__)
 
@@ -147,16 +157,32 @@ def _format_conversation_history(
     return "\n".join(lines)
 
 
-def _build_prompt(
-    features: dict,
-    user_prompt: str | None = None,
-    conversation_history: list[dict[str, str]] | None = None,
-) -> str:
-    query = (user_prompt or "").strip() or "Describe this image in detail."
+_ASSISTANT_INTRO = (
+    "You are a visual reasoning assistant. Use both the uploaded image and the provided structured signals "
+    "to answer the user's query accurately.\n\n"
+)
+
+_OUTPUT_POLICY = (
+    "Output policy:\n"
+    "- Return only the answer to the user query.\n"
+    "- Do not force fixed templates (no mandatory Summary/Key tags/Search query sections).\n"
+    "- Never output hidden reasoning, planning text, or chain-of-thought.\n"
+    "- If uncertain, say so briefly and avoid hallucinating.\n\n"
+)
+
+_MULTI_TURN_POLICY = (
+    "Reasoning policy for multi-turn chat:\n"
+    "- Use previous turns to resolve follow-up references like 'this', 'that', 'he', 'it'.\n"
+    "- Keep consistency with earlier answers unless new visual evidence contradicts it.\n\n"
+)
+
+_SESSION_ACK = "Understood. I have the image and its structured signals."
+
+
+def _style_policy(query: str) -> str:
     brief_mode = _wants_brief_response(query)
     concise_mode = _prefers_concise_response(query) and not _wants_detailed_response(query)
-    history_text = _format_conversation_history(conversation_history)
-    style_policy = (
+    return (
         "- Write in complete paragraphs.\n"
         "- Keep the answer concise (2-5 sentences) because the user asked for brief output.\n"
         "- Do not use bullet points unless the user explicitly asks for bullets.\n"
@@ -173,22 +199,10 @@ def _build_prompt(
         "- Do not use bullet points unless the user explicitly asks for bullets.\n"
         "- Do not stop mid-sentence.\n"
     )
+
+
+def _format_signals(features: dict) -> str:
     return (
-        "You are a visual reasoning assistant. Use both the uploaded image and the provided structured signals "
-        "to answer the user's query accurately.\n\n"
-        "Response style policy:\n"
-        f"{style_policy}"
-        "- If the user asks for brief output, keep it brief.\n\n"
-        "Output policy:\n"
-        "- Return only the answer to the user query.\n"
-        "- Do not force fixed templates (no mandatory Summary/Key tags/Search query sections).\n"
-        "- Never output hidden reasoning, planning text, or chain-of-thought.\n"
-        "- If uncertain, say so briefly and avoid hallucinating.\n\n"
-        "Reasoning policy for multi-turn chat:\n"
-        "- Use previous turns to resolve follow-up references like 'this', 'that', 'he', 'it'.\n"
-        "- Keep consistency with earlier answers unless new visual evidence contradicts it.\n\n"
-        f"User query: {query}\n\n"
-        f"Conversation context:\n{history_text or 'No prior conversation.'}\n\n"
         "Structured signals:\n"
         f"Caption: {features.get('caption', '')}\n"
         f"Objects: {features.get('objects', [])}\n"
@@ -199,11 +213,84 @@ def _build_prompt(
     )
 
 
+def _build_prompt(
+    features: dict,
+    user_prompt: str | None = None,
+    conversation_history: list[dict[str, str]] | None = None,
+) -> str:
+    query = (user_prompt or "").strip() or "Describe this image in detail."
+    history_text = _format_conversation_history(conversation_history)
+    return (
+        _ASSISTANT_INTRO
+        + "Response style policy:\n"
+        f"{_style_policy(query)}"
+        "- If the user asks for brief output, keep it brief.\n\n"
+        + _OUTPUT_POLICY
+        + _MULTI_TURN_POLICY
+        + f"User query: {query}\n\n"
+        f"Conversation context:\n{history_text or 'No prior conversation.'}\n\n"
+        + _format_signals(features)
+    )
+
+
+def _build_turn_message(query: str) -> str:
+    return (
+        f"{query}\n\n"
+        "Response style for this answer:\n"
+        f"{_style_policy(query)}"
+    )
+
+
+def _build_session_messages(
+    features: dict,
+    image_b64: str,
+    user_prompt: str | None = None,
+    conversation_history: list[dict[str, str]] | None = None,
+) -> tuple[list[dict[str, Any]], str]:
+    # Static policy, image and signals come first and never change within a
+    # session; earlier turns are replayed exactly as they were sent. Ollama then
+    # finds the whole prefix in its KV cache and only prefills the new turn.
+    query = (user_prompt or "").strip() or "Describe this image in detail."
+    messages: list[dict[str, Any]] = [
+        {"role": "system", "content": _ASSISTANT_INTRO + _OUTPUT_POLICY + _MULTI_TURN_POLICY.rstrip()},
+        {"role": "user", "content": _format_signals(features), "images": [image_b64]},
+        {"role": "assistant", "content": _SESSION_ACK},
+    ]
+    for turn in conversation_history or []:
+        user_text = str(turn.get("user_message") or turn.get("user", "")).strip()
+        assistant_text = str(turn.get("assistant", "")).strip()
+        if user_text:
+            messages.append({"role": "user", "content": user_text})
+        if assistant_text:
+            messages.append({"role": "assistant", "content": assistant_text})
+
+    turn_message = _build_turn_message(query)
+    messages.append({"role": "user", "content": turn_message})
+    return messages, turn_message
+
+
 def _encode_image_base64(image_path: str) -> str:
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
 
+def prepare_vlm_image(image_path: str) -> str:
+    """Base64 image for the VLM, downscaled to OLLAMA_IMAGE_MAX_SIDE when larger."""
+    max_side = int(os.getenv("OLLAMA_IMAGE_MAX_SIDE", "1024"))
+    try:
+        with Image.open(image_path) as image:
+            if max(image.size) <= max_side:
+                return _encode_image_base64(image_path)
+            image.draft("RGB", (max_side, max_side))
+            resized = image.convert("RGB")
+            resized.thumbnail((max_side, max_side))
+            buffer = io.BytesIO()
+            resized.save(buffer, format="JPEG", quality=90)
+            return base64.b64encode(buffer.getvalue()).decode("utf-8")
+    except OSError:
+        return _encode_image_base64(image_path)
+
+
 def _extract_text(payload: dict[str, Any]) -> str:
     message = payload.get("message", {})
     if isinstance(message, dict):
@@ -235,21 +322,168 @@ def _extract_text(payload: dict[str, Any]) -> str:
     return ""
 
 
+class OllamaDeadlineExceeded(requests.Timeout):
+    """Raised when the remaining request budget cannot fit another attempt."""
+
+
+class OllamaCancelled(requests.RequestException):
+    """Raised in a hedged attempt once the other attempt has answered."""
+
+
+_HEDGE_EXECUTOR: ThreadPoolExecutor | None = None
+_HEDGE_EXECUTOR_LOCK = Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _HEDGE_EXECUTOR
+
+    with _HEDGE_EXECUTOR_LOCK:
+        if _HEDGE_EXECUTOR is None:
+            # Every admitted request runs at most two attempts at once (the
+            # primary and its hedge), so this never has to queue behind itself.
+            _HEDGE_EXECUTOR = ThreadPoolExecutor(
+                max_workers=2 * process_capacity(),
+                thread_name_prefix="ollama-hedge",
+            )
+        return _HEDGE_EXECUTOR
+
+
+def _read_stream(response: requests.Response, cancel: Event, deadline: float) -> dict[str, Any]:
+    """Assemble a streamed Ollama reply into the shape of a non-streamed one.
+
+    The reply is read chunk by chunk so the attempt can give up at the next
+    token once `cancel` is set or `deadline` passes; closing the connection
+    makes Ollama stop generating.
+    """
+    content: list[str] = []
+    thinking: list[str] = []
+    text: list[str] = []
+    final: dict[str, Any] = {}
+    with response:
+        for line in response.iter_lines():
+            if cancel.is_set():
+                raise OllamaCancelled("The other hedged attempt already answered")
+            if time.monotonic() >= deadline:
+                raise requests.ReadTimeout("Streamed reply did not finish within the attempt timeout")
+            if not line:
+                continue
+            try:
+                chunk = json.loads(line)
+            except ValueError as exc:
+                raise requests.exceptions.InvalidJSONError(str(exc), response=response) from exc
+            if chunk.get("error"):
+                raise requests.HTTPError(chunk["error"], response=response)
+            message = chunk.get("message") or {}
+            content.append(message.get("content") or "")
+            thinking.append(message.get("thinking") or "")
+            text.append(chunk.get("response") or "")
+            if chunk.get("done"):
+                final = chunk
+                break
+
+    data = {**final, "message": {"role": "assistant", "content": "".join(content)}}
+    if any(thinking):
+        data["message"]["thinking"] = "".join(thinking)
+    if any(text):
+        data["response"] = "".join(text)
+    return data
+
+
+def _min_attempt_seconds() -> float:
+    return float(os.getenv("OLLAMA_MIN_ATTEMPT_SECONDS", "15"))
+
+
 def _post_json(
-    url: str,
+    path: str,
     payload: dict[str, Any],
     timeout: int,
     max_retries: int,
     context: dict[str, Any] | None = None,
+    deadline: float | None = None,
+    reserve_seconds: float = 0.0,
+    affinity_key: str | None = None,
+    cancel: Event | None = None,
 ) -> dict[str, Any]:
+    # `path` is routed through the backend pool on every attempt, so a retry can
+    # land on a different Ollama node than the one that just failed.
+    # `affinity_key` (a session or room id) steers the first attempt back to
+    # the backend that served it last.
+    # `cancel` (set by a hedge's winner) makes the request stream its reply so
+    # it can be abandoned mid-generation; see _read_stream.
+    # `deadline` is a time.monotonic() value shared by the whole fallback ladder;
+    # `reserve_seconds` is kept back for the attempts that come after this one.
     last_exc: Exception | None = None
+    min_attempt = _min_attempt_seconds()
     for attempt in range(max_retries + 1):
+        if cancel is not None and cancel.is_set():
+            raise OllamaCancelled("The other hedged attempt already answered") from last_exc
+        attempt_timeout = float(timeout)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining < min_attempt:
+                logger.info(
+                    json.dumps(
+                        {
+                            "event": "ollama_attempt_skipped",
+                            "attempt": attempt + 1,
+                            "path": path,
+                            "remaining_s": round(max(remaining, 0.0), 2),
+                            "min_attempt_s": min_attempt,
+                            "context": context or {},
+                        }
+                    )
+                )
+                raise OllamaDeadlineExceeded(
+                    f"Request deadline leaves {max(remaining, 0.0):.1f}s, below the {min_attempt:.0f}s minimum per attempt"
+                ) from last_exc
+            attempt_timeout = min(attempt_timeout, max(remaining - reserve_seconds, min_attempt))
+
+        # A timeout the deadline imposed is this request running out of budget,
+        # not the backend failing to answer within OLLAMA_TIMEOUT_SECONDS.
+        shortened = attempt_timeout < float(timeout)
+
+        def _counts_as_failure(exc: BaseException) -> bool:
+            if shortened and isinstance(exc, requests.Timeout):
+                return False
+            if cancel is not None and cancel.is_set():
+                return False
+            return is_backend_failure(exc)
+
+        started = time.monotonic()
+        url = path
         try:
-            response = requests.post(url, json=payload, timeout=timeout)
-            response.raise_for_status()
-            return response.json()
+            with lease_backend(
+                payload.get("model"),
+                affinity_key=affinity_key if attempt == 0 else None,
+                counts_as_failure=_counts_as_failure,
+            ) as base_url:
+                url = f"{base_url}{path}"
+                if cancel is None:
+                    response = requests.post(url, json=payload, timeout=attempt_timeout)
+                    response.raise_for_status()
+                    data = response.json()
+                else:
+                    response = requests.post(
+                        url, json={**payload, "stream": True}, timeout=attempt_timeout, stream=True
+                    )
+                    response.raise_for_status()
+                    data = _read_stream(response, cancel, started + attempt_timeout)
+        except OllamaCancelled:
+            metrics.observe(
+                "visionix_ollama_attempt_seconds",
+                time.monotonic() - started,
+                attempt_type=(context or {}).get("endpoint", path),
+                outcome="cancelled",
+            )
+            raise
         except requests.RequestException as exc:
             last_exc = exc
+            metrics.observe(
+                "visionix_ollama_attempt_seconds",
+                time.monotonic() - started,
+                attempt_type=(context or {}).get("endpoint", path),
+                outcome="error",
+            )
             logger.warning(
                 json.dumps(
                     {
@@ -257,93 +491,107 @@ def _post_json(
                     "attempt": attempt + 1,
                     "max_attempts": max_retries + 1,
                     "url": url,
+                    "elapsed_ms": int((time.monotonic() - started) * 1000),
+                    "timeout_s": round(attempt_timeout, 2),
                     "error": str(exc),
                     "context": context or {},
                     }
                 )
             )
+            continue
+
+        metrics.observe(
+            "visionix_ollama_attempt_seconds",
+            time.monotonic() - started,
+            attempt_type=(context or {}).get("endpoint", path),
+            outcome="ok",
+        )
+        logger.info(
+            json.dumps(
+                {
+                    "event": "ollama_attempt_completed",
+                    "attempt": attempt + 1,
+                    "url": url,
+                    "elapsed_ms": int((time.monotonic() - started) * 1000),
+                    "timeout_s": round(attempt_timeout, 2),
+                    "context": context or {},
+                }
+            )
+        )
+        return data
     if last_exc is not None:
         raise last_exc
     raise RuntimeError("Ollama request failed without exception")
 
 
+def _record_usage(usage: dict[str, Any] | None, endpoint: str, data: dict[str, Any]) -> None:
+    if usage is None or not isinstance(data, dict):
+        return
+    # prompt_eval_count only counts tokens Ollama actually prefilled, so a
+    # cache hit on the session prefix shows up as a small number here.
+    usage["endpoint"] = endpoint
+    usage["prefill_tokens"] = data.get("prompt_eval_count")
+    usage["generated_tokens"] = data.get("eval_count")
+    prompt_eval_ns = data.get("prompt_eval_duration")
+    usage["prefill_ms"] = int(prompt_eval_ns / 1_000_000) if isinstance(prompt_eval_ns, (int, float)) else None
+
+
 def generate_with_ollama(
     features: dict,
     image_path: str,
     user_prompt: str | None = None,
     ollama_model: str | None = None,
     conversation_history: list[dict[str, str]] | None = None,
+    reuse_prefix: bool = False,
+    usage: dict[str, Any] | None = None,
+    image_b64: str | None = None,
+    affinity_key: str | None = None,
 ) -> str:
-    ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # `affinity_key` (the reasoning session or chat room id) routes the primary
+    # attempt to the backend that holds the conversation's cached prefix.
+    # `reuse_prefix` sends the primary attempt as a stable multi-message session
+    # (see _build_session_messages) so Ollama can reuse its KV cache across turns.
+    # `usage`, when given, is filled with token counts of the answering attempt.
+    # `image_b64` lets callers that cache the prepared image skip re-encoding it.
     model_name = ollama_model or os.getenv("OLLAMA_MODEL", "qwen3-vl:8b")
     timeout = int(os.getenv("OLLAMA_TIMEOUT_SECONDS", "120"))
     max_retries = int(os.getenv("OLLAMA_MAX_RETRIES", "1"))
     num_predict = int(os.getenv("OLLAMA_NUM_PREDICT", "1024"))
     min_detailed_chars = int(os.getenv("OLLAMA_MIN_DETAILED_CHARS", "260"))
     disable_thinking = os.getenv("OLLAMA_DISABLE_THINKING", "true").lower() == "true"
+    deadline_seconds = float(os.getenv("OLLAMA_DEADLINE_SECONDS", "180"))
+    hedge_after_seconds = float(os.getenv("OLLAMA_HEDGE_AFTER_SECONDS", "0"))
+    min_attempt = _min_attempt_seconds()
+
+    ladder_started = time.monotonic()
+    deadline = ladder_started + deadline_seconds
 
-    prompt = _build_prompt(
-        features,
-        user_prompt=user_prompt,
-        conversation_history=conversation_history,
-    )
     query_text = (user_prompt or "").strip() or "Describe this image in detail."
     concise_mode = _prefers_concise_response(query_text) and not _wants_detailed_response(query_text)
-    image_b64 = _encode_image_base64(image_path)
+    image_b64 = image_b64 or prepare_vlm_image(image_path)
+    if reuse_prefix:
+        primary_messages, turn_message = _build_session_messages(
+            features,
+            image_b64,
+            user_prompt=user_prompt,
+            conversation_history=conversation_history,
+        )
+        if usage is not None:
+            usage["user_message"] = turn_message
+    else:
+        prompt = _build_prompt(
+            features,
+            user_prompt=user_prompt,
+            conversation_history=conversation_history,
+        )
+        primary_messages = [{"role": "user", "content": prompt, "images": [image_b64]}]
     candidates: list[str] = []
     history_text = _format_conversation_history(conversation_history)
     request_failures = 0
+    deadline_exhausted = False
 
-    chat_url = f"{ollama_base_url}/api/chat"
-    generate_url = f"{ollama_base_url}/api/generate"
-
-    try:
-        chat_data = _post_json(
-            chat_url,
-            {
-                "model": model_name,
-                "stream": False,
-                "think": not disable_thinking,
-                "options": {"num_predict": num_predict},
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt,
-                        "images": [image_b64],
-                    }
-                ],
-            },
-            timeout=timeout,
-            max_retries=max_retries,
-            context={"endpoint": "chat_primary", "model": model_name},
-        )
-        content = _extract_text(chat_data)
-        if content:
-            candidates.append(content)
-        if _is_sufficient_response(content, query_text, min_detailed_chars):
-            return content
-        logger.warning(
-            json.dumps(
-                {
-                    "event": "ollama_empty_response",
-                    "endpoint": "chat_primary",
-                    "model": model_name,
-                    "reason": "empty_or_too_short",
-                    "length": len((content or "").strip()),
-                    "payload_keys": list(chat_data.keys()) if isinstance(chat_data, dict) else [],
-                }
-            )
-        )
-    except requests.RequestException:
-        request_failures += 1
-        logger.info(
-            json.dumps(
-                {
-                    "event": "ollama_chat_fallback_to_retry",
-                    "model": model_name,
-                }
-            )
-        )
+    chat_path = "/api/chat"
+    generate_path = "/api/generate"
 
     retry_prompt = (
         "Answer the user's query directly using the image. "
@@ -354,81 +602,157 @@ def generate_with_ollama(
         f"Conversation context:\n{history_text or 'No prior conversation.'}\n\n"
         f"User query: {query_text}"
     )
-    try:
-        retry_data = _post_json(
-            chat_url,
+
+    retry_messages = [{"role": "user", "content": retry_prompt, "images": [image_b64]}]
+
+    def _chat(
+        endpoint: str,
+        messages: list[dict[str, Any]],
+        reserve_seconds: float,
+        cancel: Event | None = None,
+    ) -> dict[str, Any]:
+        return _post_json(
+            chat_path,
             {
                 "model": model_name,
                 "stream": False,
                 "think": not disable_thinking,
+                "keep_alive": keep_alive_value(),
                 "options": {"num_predict": num_predict},
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": retry_prompt,
-                        "images": [image_b64],
-                    }
-                ],
+                "messages": messages,
             },
             timeout=timeout,
             max_retries=max_retries,
-            context={"endpoint": "chat_retry", "model": model_name},
+            context={"endpoint": endpoint, "model": model_name},
+            deadline=deadline,
+            reserve_seconds=reserve_seconds,
+            # Retries and hedges should be free to go to another backend.
+            affinity_key=affinity_key if endpoint == "chat_primary" else None,
+            cancel=cancel,
         )
-        retry_content = _extract_text(retry_data)
-        if retry_content:
-            candidates.append(retry_content)
-        if _is_sufficient_response(retry_content, query_text, min_detailed_chars):
-            return retry_content
+
+    def _accept(endpoint: str, data: dict[str, Any]) -> str | None:
+        _record_usage(usage, endpoint, data)
+        content = _extract_text(data)
+        if content:
+            candidates.append(content)
+        if _is_sufficient_response(content, query_text, min_detailed_chars):
+            return content
         logger.warning(
             json.dumps(
                 {
                     "event": "ollama_empty_response",
-                    "endpoint": "chat_retry",
+                    "endpoint": endpoint,
                     "model": model_name,
                     "reason": "empty_or_too_short",
-                    "length": len((retry_content or "").strip()),
-                    "payload_keys": list(retry_data.keys()) if isinstance(retry_data, dict) else [],
+                    "length": len((content or "").strip()),
+                    "payload_keys": list(data.keys()) if isinstance(data, dict) else [],
                 }
             )
         )
-    except requests.RequestException:
+        return None
+
+    def _record_failure(exc: requests.RequestException, event: str) -> None:
+        nonlocal request_failures, deadline_exhausted
+        if isinstance(exc, OllamaDeadlineExceeded):
+            deadline_exhausted = True
+            return
         request_failures += 1
-        logger.info(
-            json.dumps(
-                {
-                    "event": "ollama_chat_retry_fallback_to_generate",
-                    "model": model_name,
-                }
+        logger.info(json.dumps({"event": event, "model": model_name}))
+
+    # Primary and retry prompts. In hedged mode the retry prompt is launched in
+    # parallel once the primary has been running for `hedge_after_seconds`, and
+    # whichever answers first cancels the other.
+    primary_done = False
+    if hedge_after_seconds > 0:
+        executor = _get_hedge_executor()
+        cancel = Event()
+        primary_future = executor.submit(_chat, "chat_primary", primary_messages, min_attempt, cancel)
+        done, _ = wait([primary_future], timeout=hedge_after_seconds)
+        if not done:
+            logger.info(
+                json.dumps(
+                    {
+                        "event": "ollama_hedge_launched",
+                        "model": model_name,
+                        "after_s": hedge_after_seconds,
+                    }
+                )
             )
-        )
+            retry_future = executor.submit(_chat, "chat_retry", retry_messages, min_attempt, cancel)
+            endpoints = {primary_future: "chat_primary", retry_future: "chat_retry"}
+            try:
+                for future in as_completed(endpoints):
+                    try:
+                        content = _accept(endpoints[future], future.result())
+                    except requests.RequestException as exc:
+                        _record_failure(exc, f"ollama_{endpoints[future]}_hedge_failed")
+                        continue
+                    if content:
+                        return content
+            finally:
+                cancel.set()
+                for future in endpoints:
+                    future.cancel()
+            primary_done = True
+        else:
+            try:
+                content = _accept("chat_primary", primary_future.result())
+                if content:
+                    return content
+            except requests.RequestException as exc:
+                _record_failure(exc, "ollama_chat_fallback_to_retry")
+    else:
+        try:
+            content = _accept("chat_primary", _chat("chat_primary", primary_messages, min_attempt * 2))
+            if content:
+                return content
+        except requests.RequestException as exc:
+            _record_failure(exc, "ollama_chat_fallback_to_retry")
+
+    if not primary_done:
+        try:
+            content = _accept("chat_retry", _chat("chat_retry", retry_messages, min_attempt))
+            if content:
+                return content
+        except requests.RequestException as exc:
+            _record_failure(exc, "ollama_chat_retry_fallback_to_generate")
 
     try:
         generate_data = _post_json(
-            generate_url,
+            generate_path,
             {
                 "model": model_name,
                 "prompt": retry_prompt,
                 "images": [image_b64],
                 "stream": False,
                 "think": not disable_thinking,
+                "keep_alive": keep_alive_value(),
                 "options": {"num_predict": num_predict},
             },
             timeout=timeout,
             max_retries=max_retries,
             context={"endpoint": "generate_fallback", "model": model_name},
+            deadline=deadline,
         )
+        _record_usage(usage, "generate_fallback", generate_data)
         generate_content = _extract_text(generate_data)
         if generate_content:
             candidates.append(generate_content)
         if _is_sufficient_response(generate_content, query_text, min_detailed_chars):
             return generate_content
-    except requests.RequestException:
-        request_failures += 1
+    except requests.RequestException as exc:
+        _record_failure(exc, "ollama_generate_fallback_failed")
+
+    if deadline_exhausted:
         logger.warning(
             json.dumps(
                 {
-                    "event": "ollama_generate_fallback_failed",
+                    "event": "ollama_deadline_exhausted",
                     "model": model_name,
+                    "deadline_s": deadline_seconds,
+                    "elapsed_ms": int((time.monotonic() - ladder_started) * 1000),
+                    "candidates": len(candidates),
                 }
             )
         )
@@ -451,7 +775,11 @@ def generate_with_ollama(
 
     if request_failures >= 1:
         raise RuntimeError(
-            f"Ollama is unreachable at {ollama_base_url}. Start Ollama and ensure model '{model_name}' is available."
+            f"Ollama is unreachable at {', '.join(configured_urls())}. Start Ollama and ensure model '{model_name}' is available."
+        )
+    if deadline_exhausted:
+        raise RuntimeError(
+            f"Ollama did not answer within the {deadline_seconds:.0f}s request deadline for model '{model_name}'."
         )
 
     caption = str(features.get("caption", "")).strip()
@@ -461,27 +789,39 @@ def generate_with_ollama(
 
 
 def check_ollama_health(ollama_model: str | None = None) -> dict[str, Any]:
-    ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-    model_name = ollama_model or os.getenv("OLLAMA_MODEL", "qwen3-vl:8b")
-    timeout = int(os.getenv("OLLAMA_TIMEOUT_SECONDS", "10"))
-    max_retries = int(os.getenv("OLLAMA_MAX_RETRIES", "0"))
+    # Served from the residency prober's cache; see app/services/ollama_residency.py.
+    return get_cached_health(ollama_model)
 
-    chat_url = f"{ollama_base_url}/api/chat"
+
+def summarize_conversation(
+    turns: list[dict[str, Any]],
+    previous_synopsis: str = "",
+    ollama_model: str | None = None,
+) -> str:
+    """Fold older reasoning turns into a short rolling synopsis (text only, no image)."""
+    model_name = ollama_model or os.getenv("OLLAMA_MODEL", "qwen3-vl:8b")
+    timeout = int(os.getenv("OLLAMA_TIMEOUT_SECONDS", "120"))
+    max_tokens = int(os.getenv("REASONING_SYNOPSIS_MAX_TOKENS", "200"))
+
+    prompt = (
+        "Update the running summary of a conversation about one image. "
+        "Keep facts the user established, questions asked and conclusions reached. "
+        f"Stay under {max_tokens} tokens. Return only the summary.\n\n"
+        f"Current summary:\n{previous_synopsis or 'None yet.'}\n\n"
+        f"New turns:\n{_format_conversation_history(turns, max_turns=len(turns))}"
+    )
     data = _post_json(
-        chat_url,
+        "/api/generate",
         {
             "model": model_name,
+            "prompt": prompt,
             "stream": False,
-            "messages": [{"role": "user", "content": "Reply with: OK"}],
+            "think": False,
+            "keep_alive": keep_alive_value(),
+            "options": {"num_predict": max_tokens},
         },
         timeout=timeout,
-        max_retries=max_retries,
-        context={"endpoint": "health", "model": model_name},
+        max_retries=0,
+        context={"endpoint": "history_synopsis", "model": model_name},
     )
-    content = data.get("message", {}).get("content", "")
-    return {
-        "status": "ok",
-        "base_url": ollama_base_url,
-        "model": model_name,
-        "response_preview": content[:60],
-    }
+    return _extract_text(data)
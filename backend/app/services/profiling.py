@@ -0,0 +1,234 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from threading import Event, Lock, Thread, get_ident
+
+# Opt-in per-request profiling. A request is profiled when it carries
+# `X-Profile: sample|cprofile` with the PROFILING_TOKEN, or is picked by
+# PROFILE_SAMPLE_RATE. "sample" mode has one sampler thread read the request
+# thread's stack from sys._current_frames() every PROFILE_INTERVAL_MS and
+# count collapsed stacks, so time spent inside C extensions (torch, docTR)
+# and blocking I/O (Ollama) is attributed to the Python frame that made the
+# call. With INFERENCE_WORKERS > 0 the models run in other processes, and
+# extraction shows up only as the request thread waiting on the pool.
+# "cprofile" mode runs cProfile on the request thread for exact call counts,
+# at a much higher overhead. Finished profiles are written to PROFILE_DIR,
+# which every prefork worker shares, and pruned to the newest
+# PROFILE_BUFFER_SIZE. With neither trigger present the only cost per request
+# is a header lookup and a comparison; the sampler thread sleeps on an event
+# while nothing is being profiled.
+
+MODES = ("sample", "cprofile")
+
+_LOCK = Lock()
+_ACTIVE: dict[int, dict] = {}
+_SAMPLER: Thread | None = None
+_WAKE = Event()
+_PATH_PREFIXES = tuple(sorted({p for p in sys.path if p}, key=len, reverse=True))
+_ID_RE = re.compile(r"^[0-9a-f]{16}$")
+_SUMMARY_KEYS = ("id", "pid", "mode", "method", "path", "route", "status", "started_at", "duration_ms", "samples")
+
+
+def _profile_dir() -> str:
+    return os.getenv("PROFILE_DIR", "logs/profiles")
+
+
+def token_matches(token: str | None) -> bool:
+    expected = os.getenv("PROFILING_TOKEN")
+    return bool(expected) and hmac.compare_digest((token or "").encode("utf-8"), expected.encode("utf-8"))
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix) :].lstrip(os.sep)
+    return filename
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _sampler_loop() -> None:
+    while True:
+        _WAKE.wait()
+        interval = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+        while True:
+            with _LOCK:
+                # Under the lock, so a profile is never updated after finish_profile took it.
+                targets = [(thread_id, profile) for thread_id, profile in _ACTIVE.items() if profile["mode"] == "sample"]
+                if not targets:
+                    _WAKE.clear()
+                    break
+                frames = sys._current_frames()
+                for thread_id, profile in targets:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile["stacks"][_collapse(frame)] += 1
+                del frames
+            time.sleep(interval)
+
+
+def _ensure_sampler() -> None:
+    global _SAMPLER
+
+    if _SAMPLER is None or not _SAMPLER.is_alive():
+        _SAMPLER = Thread(target=_sampler_loop, name="request-profiler", daemon=True)
+        _SAMPLER.start()
+
+
+def requested_mode(header_value: str | None, token: str | None) -> str | None:
+    """The profiling mode for this request, or None. Cheap when profiling is off."""
+    if header_value:
+        if token_matches(token):
+            mode = header_value.strip().lower()
+            return mode if mode in MODES else "sample"
+    rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0") or 0)
+    if rate > 0 and random.random() < rate:
+        return "sample"
+    return None
+
+
+def start_profile(mode: str, method: str, path: str) -> dict:
+    profile = {
+        "id": uuid.uuid4().hex[:16],
+        "pid": os.getpid(),
+        "mode": mode,
+        "method": method,
+        "path": path,
+        "started_at": time.time(),
+        "perf_started": time.perf_counter(),
+        "thread_id": get_ident(),
+        "stacks": Counter(),
+        "profiler": None,
+    }
+    if mode == "cprofile":
+        profile["profiler"] = cProfile.Profile()
+        profile["profiler"].enable()
+    with _LOCK:
+        _ACTIVE[profile["thread_id"]] = profile
+        if mode == "sample":
+            _ensure_sampler()
+            _WAKE.set()
+    return profile
+
+
+def finish_profile(profile: dict, route: str, status: int | None) -> None:
+    with _LOCK:
+        _ACTIVE.pop(profile["thread_id"], None)
+    profiler = profile.pop("profiler")
+    if profiler is not None:
+        profiler.disable()
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats("cumulative").print_stats(int(os.getenv("PROFILE_PSTATS_LINES", "60")))
+        profile["pstats"] = stream.getvalue()
+        profile["stacks"] = _stacks_from_cprofile(stats)
+    profile["route"] = route
+    profile["status"] = status
+    profile["duration_ms"] = round((time.perf_counter() - profile.pop("perf_started")) * 1000, 1)
+    profile["samples"] = sum(profile["stacks"].values())
+    profile.pop("thread_id", None)
+    _store(profile)
+
+
+def _store(profile: dict) -> None:
+    directory = _profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    record = {**profile, "stacks": dict(profile["stacks"].most_common())}
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(tmp_path, os.path.join(directory, f"{profile['id']}.json"))
+
+    keep = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+    for path in _stored_paths()[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _stored_paths() -> list[str]:
+    """Stored profiles, newest first."""
+    directory = _profile_dir()
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(".json") and not name.startswith(".")]
+    except FileNotFoundError:
+        return []
+    entries = []
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            entries.append((os.stat(path).st_mtime, path))
+        except FileNotFoundError:
+            continue
+    return [path for _, path in sorted(entries, reverse=True)]
+
+
+def _load(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    profile["stacks"] = Counter(profile.get("stacks") or {})
+    return profile
+
+
+def _stacks_from_cprofile(stats: pstats.Stats) -> Counter:
+    # cProfile keeps caller->callee edges, not whole stacks; one level of
+    # caller context per function (in microseconds of own time) is still
+    # enough for a flamegraph to show where self time went.
+    stacks: Counter = Counter()
+    for (filename, line, name), (_, _, own_time, _, callers) in stats.stats.items():
+        label = f"{name} ({_short_path(filename)}:{line})"
+        total_calls = sum(caller[0] for caller in callers.values()) or 1
+        if not callers:
+            stacks[label] += int(own_time * 1e6)
+            continue
+        for (caller_file, caller_line, caller_name), caller_stats in callers.items():
+            share = own_time * caller_stats[0] / total_calls
+            stacks[f"{caller_name} ({_short_path(caller_file)}:{caller_line});{label}"] += int(share * 1e6)
+    return +stacks
+
+
+def profile_summary(profile: dict) -> dict:
+    return {key: profile.get(key) for key in _SUMMARY_KEYS}
+
+
+def list_profiles() -> list[dict]:
+    profiles = (_load(path) for path in _stored_paths())
+    return [profile_summary(profile) for profile in profiles if profile is not None]
+
+
+def get_profile(profile_id: str) -> dict | None:
+    if not _ID_RE.match(profile_id or ""):
+        return None
+    return _load(os.path.join(_profile_dir(), f"{profile_id}.json"))
+
+
+def collapsed_stacks(profile: dict) -> str:
+    """Brendan Gregg's folded format, `frame;frame;frame weight` per line, for flamegraph.pl or speedscope.
+
+    Weights are samples in sample mode and microseconds of own time in cprofile mode.
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].most_common())
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any
+
+from app.services.ollama_service import summarize_conversation
+from app.services.session_store import get_session_store
+
+logger = logging.getLogger(__name__)
+
+_COMPACTION_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-compaction")
+_COMPACTION_LOCK = Lock()
+_COMPACTION_PENDING: set[str] = set()
+
+SYNOPSIS_USER_TEXT = "Summary of our earlier conversation about this image."
+
+
+def estimate_tokens(text: str) -> int:
+    chars_per_token = float(os.getenv("REASONING_CHARS_PER_TOKEN", "4"))
+    return int(len(text or "") / chars_per_token) + 1
+
+
+def _turn_tokens(turn: dict[str, Any]) -> int:
+    user_text = str(turn.get("user_message") or turn.get("user", ""))
+    return estimate_tokens(user_text) + estimate_tokens(str(turn.get("assistant", "")))
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    chars_per_token = float(os.getenv("REASONING_CHARS_PER_TOKEN", "4"))
+    max_chars = max(int(max_tokens * chars_per_token), 0)
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0].rstrip() + " ..."
+
+
+def select_history(session: dict[str, Any]) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """Pick the turns sent to the model: rolling synopsis + every newer turn that fits the token budget.
+
+    Compaction runs in the background, so turns older than the verbatim
+    window may not be in the synopsis yet; they are still sent while the
+    budget allows, and only turns the synopsis covers are skipped.
+
+    Prefix reuse (see ollama_service._build_session_messages): the system,
+    image and signals messages never change, so their KV cache is always
+    reused. The history after them is stable while new turns are appended,
+    and changes when a compaction advances the synopsis (once per
+    REASONING_COMPACTION_BATCH_TURNS turns) or when the budget drops the
+    oldest verbatim turn. A larger batch trades prompt length for fewer
+    re-prefills.
+    """
+    budget = int(os.getenv("REASONING_HISTORY_TOKEN_BUDGET", "1500"))
+
+    history = list(session.get("history", []))
+    synopsis = str(session.get("synopsis") or "").strip()
+    synopsis_through = float(session.get("synopsis_through") or 0)
+
+    selected: list[dict[str, Any]] = []
+    used = 0
+    synopsis_tokens = 0
+    if synopsis:
+        synopsis_tokens = estimate_tokens(synopsis) + estimate_tokens(SYNOPSIS_USER_TEXT)
+        used += synopsis_tokens
+
+    # Newest first, so the latest turns win when the budget is tight.
+    recent: list[dict[str, Any]] = []
+    for turn in reversed(history):
+        if synopsis and float(turn.get("timestamp") or 0) <= synopsis_through:
+            break
+        cost = _turn_tokens(turn)
+        if used + cost > budget:
+            if not recent:
+                # Always keep the last turn, trimmed to whatever budget is left.
+                trimmed = dict(turn)
+                trimmed["assistant"] = _truncate_to_tokens(
+                    str(turn.get("assistant", "")),
+                    max(budget - used - estimate_tokens(str(turn.get("user_message") or turn.get("user", ""))), 0),
+                )
+                recent.append(trimmed)
+                used += _turn_tokens(trimmed)
+            break
+        recent.append(turn)
+        used += cost
+    recent.reverse()
+
+    if synopsis:
+        selected.append({"user": SYNOPSIS_USER_TEXT, "assistant": synopsis})
+    selected.extend(recent)
+
+    report = {
+        "history_tokens": used,
+        "history_token_budget": budget,
+        "synopsis_tokens": synopsis_tokens,
+        "verbatim_turns": len(recent),
+        "omitted_turns": max(len(history) - len(recent), 0),
+    }
+    return selected, report
+
+
+def _compact(session: dict[str, Any], model: str | None) -> None:
+    session_id = str(session.get("session_id"))
+    started = time.monotonic()
+    try:
+        verbatim_turns = int(os.getenv("REASONING_VERBATIM_TURNS", "4"))
+        synopsis_through = float(session.get("synopsis_through") or 0)
+        history = list(session.get("history", []))
+        older = history[:-verbatim_turns] if verbatim_turns > 0 else history
+        pending = [t for t in older if float(t.get("timestamp") or 0) > synopsis_through]
+        if not pending:
+            return
+
+        synopsis = summarize_conversation(
+            pending,
+            previous_synopsis=str(session.get("synopsis") or ""),
+            ollama_model=model,
+        )
+        if not synopsis:
+            return
+        synopsis_fields = {
+            "synopsis": synopsis,
+            "synopsis_through": float(pending[-1].get("timestamp") or 0),
+        }
+        session.update(synopsis_fields)
+        get_session_store().update(session_id, synopsis_fields)
+        logger.info(
+            json.dumps(
+                {
+                    "event": "reasoning_history_compacted",
+                    "session_id": session_id,
+                    "turns_folded": len(pending),
+                    "synopsis_tokens": estimate_tokens(synopsis),
+                    "elapsed_ms": int((time.monotonic() - started) * 1000),
+                }
+            )
+        )
+    except Exception as exc:
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "reasoning_history_compaction_failed",
+                    "session_id": session_id,
+                    "error": str(exc),
+                }
+            )
+        )
+    finally:
+        with _COMPACTION_LOCK:
+            _COMPACTION_PENDING.discard(session_id)
+
+
+def schedule_compaction(session: dict[str, Any], model: str | None = None) -> bool:
+    """Queue a background synopsis update once older turns no longer fit verbatim."""
+    verbatim_turns = int(os.getenv("REASONING_VERBATIM_TURNS", "4"))
+    batch_turns = int(os.getenv("REASONING_COMPACTION_BATCH_TURNS", "2"))
+    synopsis_through = float(session.get("synopsis_through") or 0)
+    history = session.get("history", [])
+    older = history[:-verbatim_turns] if verbatim_turns > 0 else history
+    pending = [t for t in older if float(t.get("timestamp") or 0) > synopsis_through]
+    if len(pending) < batch_turns:
+        return False
+
+    session_id = str(session.get("session_id"))
+    with _COMPACTION_LOCK:
+        if session_id in _COMPACTION_PENDING:
+            return False
+        _COMPACTION_PENDING.add(session_id)
+    _COMPACTION_EXECUTOR.submit(_compact, session, model)
+    return True
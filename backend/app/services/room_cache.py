@@ -0,0 +1,71 @@
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any
+
+from app.services import metrics
+
+# Per-room working set for chat follow-ups: the active image (already prepared
+# for the VLM), its extracted features and extraction id. Populated on upload,
+# read on follow-ups so they skip the blob read, VLM resize and extraction.
+# Each process has its own cache while prefork workers share rooms, so callers
+# pass the room's current image hash from the database and an entry for any
+# other image is never served.
+_ROOM_CACHE: OrderedDict[str, dict[str, Any]] = OrderedDict()
+_ROOM_CACHE_LOCK = Lock()
+
+
+def _max_rooms() -> int:
+    return int(os.getenv("CHAT_ROOM_CACHE_SIZE", "64"))
+
+
+def _ttl_seconds() -> float:
+    return float(os.getenv("CHAT_ROOM_CACHE_TTL_SECONDS", "1800"))
+
+
+def remember_room_image(
+    room_id: str,
+    *,
+    image_hash: str,
+    image_path: str,
+    image_name: str,
+    image_b64: str,
+    features: dict,
+    extraction_id: str | None = None,
+) -> None:
+    entry = {
+        "image_hash": image_hash,
+        "image_path": image_path,
+        "image_name": image_name,
+        "image_b64": image_b64,
+        "features": features,
+        "extraction_id": extraction_id,
+        "cached_at": time.time(),
+    }
+    with _ROOM_CACHE_LOCK:
+        _ROOM_CACHE[room_id] = entry
+        _ROOM_CACHE.move_to_end(room_id)
+        while len(_ROOM_CACHE) > _max_rooms():
+            _ROOM_CACHE.popitem(last=False)
+
+
+def get_room_image(room_id: str, image_hash: str) -> dict[str, Any] | None:
+    with _ROOM_CACHE_LOCK:
+        entry = _ROOM_CACHE.get(room_id)
+        if entry is not None and (
+            entry["image_hash"] != image_hash
+            or time.time() - entry["cached_at"] > _ttl_seconds()
+            or not os.path.exists(entry["image_path"])
+        ):
+            del _ROOM_CACHE[room_id]
+            entry = None
+        if entry is not None:
+            _ROOM_CACHE.move_to_end(room_id)
+    metrics.count_cache("chat_room", entry is not None)
+    return entry
+
+
+def forget_room(room_id: str) -> None:
+    with _ROOM_CACHE_LOCK:
+        _ROOM_CACHE.pop(room_id, None)
@@ -0,0 +1,238 @@
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Lock, Thread
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock, but also no prefork: only this process writes, and
+    # the in-process lock in _Writer._locked is all the coordination needed.
+    fcntl = None
+
+from app.config import Config
+from app.services import metrics
+
+# Describe/reason run events are appended to DESCRIBE_RUNS_LOG_PATH by one
+# background thread instead of an open/append/close on the request path. The
+# queue is bounded: when the disk cannot keep up, events are dropped (and
+# counted) rather than blocking requests. Lines are written in batches and
+# fsynced at most every RUN_LOG_FSYNC_INTERVAL_SECONDS. When the file passes
+# RUN_LOG_MAX_BYTES it is renamed with a timestamp and gzipped, keeping the
+# newest RUN_LOG_BACKUPS archives. Prefork workers share the file: each batch
+# is written under a shared flock on a sidecar lock file, after checking that
+# the path still names the open inode, and the rename happens under the
+# exclusive lock once the size is re-checked. So exactly one worker rotates,
+# and no worker appends to a file that is already being archived.
+
+logger = logging.getLogger(__name__)
+
+_QUEUE: queue.Queue | None = None
+_THREAD: Thread | None = None
+_LOCK = Lock()
+_STOP = object()
+
+
+def _log_path() -> str:
+    return Config.DESCRIBE_RUNS_LOG_PATH
+
+
+def slim_run_event(event: dict[str, Any], route: str) -> dict[str, Any]:
+    """The persisted form of a run event: sizes instead of bulky payloads."""
+    prompt_chars = Config.RUN_LOG_PROMPT_CHARS
+    slim = {"ts": round(time.time(), 3), "route": route}
+    for key, value in event.items():
+        if key == "features":
+            continue
+        if key == "llm_response":
+            slim["response_chars"] = len(value or "")
+        elif key == "prompt" and isinstance(value, str):
+            slim[key] = value[:prompt_chars]
+        else:
+            slim[key] = value
+    return slim
+
+
+class _Writer:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.max_bytes = Config.RUN_LOG_MAX_BYTES
+        self.backups = Config.RUN_LOG_BACKUPS
+        self.fsync_interval = Config.RUN_LOG_FSYNC_INTERVAL_SECONDS
+        self.file = None
+        self.lock_file = None
+        self.thread_lock = Lock()
+        self.last_fsync = time.monotonic()
+        self.dirty = False
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        if fcntl is None:
+            with self.thread_lock:
+                yield
+            return
+        if self.lock_file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.lock_file = open(self.path + ".lock", "a")
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def _reopen_if_rotated(self) -> None:
+        # Another process may have rotated the file under us.
+        try:
+            current = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            current = None
+        if self.file is not None and current != os.fstat(self.file.fileno()).st_ino:
+            self.close()
+        if self.file is None:
+            self._open()
+
+    def write(self, lines: list[str]) -> None:
+        with self._locked(exclusive=False):
+            self._reopen_if_rotated()
+            self.file.write("".join(lines))
+            self.file.flush()
+        self.dirty = True
+        now = time.monotonic()
+        if now - self.last_fsync >= self.fsync_interval:
+            self.sync()
+        if self.file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def sync(self) -> None:
+        if self.file is not None and self.dirty:
+            os.fsync(self.file.fileno())
+            self.dirty = False
+        self.last_fsync = time.monotonic()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def shutdown(self) -> None:
+        self.close()
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+
+    def _rotate(self) -> None:
+        stem, ext = os.path.splitext(self.path)
+        rotated = f"{stem}.{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.{os.getpid()}{ext}"
+        with self._locked(exclusive=True):
+            inode = os.fstat(self.file.fileno()).st_ino
+            self.close()
+            try:
+                current = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            # Another worker may have rotated between our write and the lock.
+            if current.st_ino != inode or current.st_size < self.max_bytes:
+                return
+            os.rename(self.path, rotated)
+        with open(rotated, "rb") as source, gzip.open(rotated + ".gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(rotated)
+        archives = sorted(glob.glob(f"{glob.escape(stem)}.*{ext}.gz"))
+        for old in archives[: max(len(archives) - self.backups, 0)]:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+        logger.info(json.dumps({"event": "run_log_rotated", "archive": rotated + ".gz"}))
+
+
+def _writer_loop(events: queue.Queue) -> None:
+    writer = _Writer(_log_path())
+    batch_size = Config.RUN_LOG_BATCH_SIZE
+    while True:
+        try:
+            item = events.get(timeout=writer.fsync_interval)
+        except queue.Empty:
+            writer.sync()
+            continue
+        lines = []
+        stop = item is _STOP
+        if not stop:
+            lines.append(item)
+        while not stop and len(lines) < batch_size:
+            try:
+                item = events.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+            else:
+                lines.append(item)
+        try:
+            if lines:
+                writer.write(lines)
+        except OSError as exc:
+            metrics.inc("visionix_run_log_dropped_total", len(lines), reason="io_error")
+            logger.warning(json.dumps({"event": "run_log_write_failed", "error": str(exc), "lines": len(lines)}))
+        if stop:
+            writer.shutdown()
+            return
+
+
+def _get_queue() -> queue.Queue:
+    global _QUEUE, _THREAD
+
+    with _LOCK:
+        if _QUEUE is None:
+            _QUEUE = queue.Queue(maxsize=Config.RUN_LOG_QUEUE_SIZE)
+            atexit.register(flush_run_log)
+        if _THREAD is None or not _THREAD.is_alive():
+            _THREAD = Thread(target=_writer_loop, args=(_QUEUE,), name="run-log-writer", daemon=True)
+            _THREAD.start()
+        return _QUEUE
+
+
+def record_run(event: dict[str, Any], route: str) -> None:
+    """Queue a slimmed run event for the log; never blocks the request."""
+    line = json.dumps(slim_run_event(event, route), ensure_ascii=True) + "\n"
+    try:
+        _get_queue().put_nowait(line)
+    except queue.Full:
+        metrics.inc("visionix_run_log_dropped_total", reason="queue_full")
+
+
+def flush_run_log(timeout: float = 5.0) -> None:
+    """Write out everything queued and stop the writer (used at exit)."""
+    global _THREAD
+
+    with _LOCK:
+        thread = _THREAD
+        if _QUEUE is None or thread is None or not thread.is_alive():
+            return
+        _THREAD = None
+    try:
+        _QUEUE.put(_STOP, timeout=timeout)
+    except queue.Full:
+        return
+    thread.join(timeout)
+
+
+metrics.describe("visionix_run_log_dropped_total", "counter", "Run-log events dropped, by reason.")
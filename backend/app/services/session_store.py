@@ -0,0 +1,230 @@
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock, local
+from typing import Any
+
+# Only these feature keys feed the reasoning prompt; the CLIP vector and file
+# paths are dropped so stored sessions stay a few KB.
+_SESSION_FEATURE_KEYS = (
+    "caption",
+    "objects",
+    "ocr_text",
+    "scene_labels",
+    "color_features",
+    "texture_features",
+)
+
+
+def compact_features(features: dict) -> dict:
+    return {key: features[key] for key in _SESSION_FEATURE_KEYS if key in features}
+
+
+def _max_sessions() -> int:
+    return int(os.getenv("REASONING_MAX_SESSIONS", "25"))
+
+
+def _idle_ttl_seconds() -> float:
+    return float(os.getenv("REASONING_SESSION_TTL_SECONDS", "3600"))
+
+
+class MemorySessionStore:
+    """Per-process store: OrderedDict kept in last-use order, so LRU and TTL eviction pop from the front.
+
+    Reads count as use: they move the session to the back and restart its idle TTL.
+    """
+
+    def __init__(self) -> None:
+        self._sessions: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._used_at: dict[str, float] = {}
+        self._lock = Lock()
+
+    def _touch_locked(self, session_id: str, now: float) -> None:
+        self._sessions.move_to_end(session_id)
+        self._used_at[session_id] = now
+
+    def _evict_locked(self, now: float) -> None:
+        ttl = _idle_ttl_seconds()
+        while self._sessions:
+            oldest_id = next(iter(self._sessions))
+            if len(self._sessions) > _max_sessions() or now - self._used_at.get(oldest_id, 0) > ttl:
+                self._sessions.popitem(last=False)
+                self._used_at.pop(oldest_id, None)
+                continue
+            break
+
+    def get(self, session_id: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            self._evict_locked(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            self._touch_locked(session_id, now)
+            return session
+
+    def put(self, session: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._sessions[session["session_id"]] = session
+            self._touch_locked(session["session_id"], now)
+            self._evict_locked(now)
+
+    def update(self, session_id: str, fields: dict[str, Any]) -> bool:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return False
+            session.update(fields)
+            self._touch_locked(session_id, time.time())
+            return True
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._used_at.pop(session_id, None)
+            return self._sessions.pop(session_id, None) is not None
+
+
+class SQLiteSessionStore:
+    """Shared store in a WAL-mode SQLite file, so every worker process on the node sees the same sessions.
+
+    Rows are indexed by updated_at, which keeps LRU and idle-TTL eviction to
+    index range deletes instead of a sort over all sessions. The column is the
+    row's last use: reads refresh it too, while the session's own updated_at
+    field still records its last change.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "create table if not exists reasoning_sessions ("
+            " session_id text primary key,"
+            " data text not null,"
+            " updated_at real not null)"
+        )
+        conn.execute(
+            "create index if not exists idx_reasoning_sessions_updated_at"
+            " on reasoning_sessions (updated_at)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _dumps(session: dict[str, Any]) -> str:
+        return json.dumps(session, separators=(",", ":"), ensure_ascii=False)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("delete from reasoning_sessions where updated_at < ?", (now - _idle_ttl_seconds(),))
+        (count,) = conn.execute("select count(*) from reasoning_sessions").fetchone()
+        overflow = count - _max_sessions()
+        if overflow > 0:
+            conn.execute(
+                "delete from reasoning_sessions where session_id in ("
+                " select session_id from reasoning_sessions order by updated_at limit ?)",
+                (overflow,),
+            )
+
+    def get(self, session_id: str) -> dict[str, Any] | None:
+        conn = self._conn()
+        row = conn.execute(
+            "select data, updated_at from reasoning_sessions where session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > _idle_ttl_seconds():
+            self.delete(session_id)
+            return None
+        conn.execute(
+            "update reasoning_sessions set updated_at = ? where session_id = ?",
+            (now, session_id),
+        )
+        return json.loads(row[0])
+
+    def put(self, session: dict[str, Any]) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("begin immediate")
+        try:
+            conn.execute(
+                "insert into reasoning_sessions (session_id, data, updated_at) values (?, ?, ?)"
+                " on conflict(session_id) do update set data = excluded.data, updated_at = excluded.updated_at",
+                (session["session_id"], self._dumps(session), now),
+            )
+            self._evict(conn, now)
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+
+    def update(self, session_id: str, fields: dict[str, Any]) -> bool:
+        # Read-modify-write in one write transaction so concurrent workers
+        # (and the history compactor) do not drop each other's fields.
+        conn = self._conn()
+        conn.execute("begin immediate")
+        try:
+            row = conn.execute(
+                "select data from reasoning_sessions where session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                conn.execute("rollback")
+                return False
+            session = json.loads(row[0])
+            session.update(fields)
+            conn.execute(
+                "update reasoning_sessions set data = ?, updated_at = ? where session_id = ?",
+                (self._dumps(session), time.time(), session_id),
+            )
+            conn.execute("commit")
+            return True
+        except Exception:
+            conn.execute("rollback")
+            raise
+
+    def delete(self, session_id: str) -> bool:
+        cursor = self._conn().execute(
+            "delete from reasoning_sessions where session_id = ?",
+            (session_id,),
+        )
+        return cursor.rowcount > 0
+
+
+_SESSION_STORE: MemorySessionStore | SQLiteSessionStore | None = None
+_SESSION_STORE_LOCK = Lock()
+
+
+def get_session_store() -> MemorySessionStore | SQLiteSessionStore:
+    """Create and cache the configured reasoning-session store (REASONING_SESSION_BACKEND)."""
+    global _SESSION_STORE
+
+    with _SESSION_STORE_LOCK:
+        if _SESSION_STORE is not None:
+            return _SESSION_STORE
+
+        backend = os.getenv("REASONING_SESSION_BACKEND", "sqlite").strip().lower()
+        if backend == "memory":
+            _SESSION_STORE = MemorySessionStore()
+        elif backend == "sqlite":
+            _SESSION_STORE = SQLiteSessionStore(
+                os.getenv("REASONING_SESSION_DB_PATH", "data/reasoning_sessions.sqlite3")
+            )
+        else:
+            raise ValueError(f"Unknown REASONING_SESSION_BACKEND: {backend}")
+        return _SESSION_STORE
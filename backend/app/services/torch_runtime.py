@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from threading import Lock
+
+# Runtime settings for the local torch models. Every model call runs under
+# torch.inference_mode(), which also skips the version counters and view
+# tracking that no_grad keeps. Convolutional models can hold their weights in
+# channels_last, so oneDNN picks its NHWC kernels. Each model can run with its
+# own intra-op thread count, capped at the process's share of the cores.
+#
+# The settings come from a profile that scripts/autotune_torch.py writes on the
+# node type it is meant for. It is loaded once from TORCH_RUNTIME_PROFILE.
+# Without a profile, every model inherits the process's thread count and only
+# the scene ResNet uses channels_last. torch is imported lazily, so the HTTP
+# process of an inference pool and the prefork master can read the profile
+# without loading it.
+
+logger = logging.getLogger(__name__)
+
+MODELS = ("blip", "yolo", "ocr", "scene", "clip")
+_DEFAULT_CHANNELS_LAST = {"scene": True}
+
+_LOCK = Lock()
+_PROFILE: dict | None = None
+_PROCESS_THREADS: int | None = None
+
+
+def profile_path() -> str:
+    return os.getenv("TORCH_RUNTIME_PROFILE", "torch_runtime_profile.json")
+
+
+def load_profile(reload: bool = False) -> dict:
+    global _PROFILE
+
+    with _LOCK:
+        if _PROFILE is not None and not reload:
+            return _PROFILE
+        path = profile_path()
+        profile: dict = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                profile = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as exc:
+            logger.warning(json.dumps({"event": "torch_profile_invalid", "path": path, "error": str(exc)}))
+        else:
+            meta = profile.get("meta", {})
+            logger.info(
+                json.dumps(
+                    {
+                        "event": "torch_profile_loaded",
+                        "path": path,
+                        "created_at": meta.get("created_at"),
+                        "threads": profile.get("threads"),
+                    }
+                )
+            )
+            if meta.get("cpu_count") not in (None, os.cpu_count()):
+                logger.warning(
+                    json.dumps(
+                        {
+                            "event": "torch_profile_host_mismatch",
+                            "path": path,
+                            "profile_cpu_count": meta.get("cpu_count"),
+                            "cpu_count": os.cpu_count(),
+                        }
+                    )
+                )
+        _PROFILE = profile
+        return profile
+
+
+def _settings(name: str) -> dict:
+    return load_profile().get("models", {}).get(name, {})
+
+
+def process_threads(budget: int) -> int:
+    """Intra-op threads for one process given its share of the cores.
+
+    A profile can lower the budget (more threads measured no faster) but never
+    raise it, so a profile tuned for fewer workers does not oversubscribe.
+    """
+    tuned = load_profile().get("threads")
+    return max(min(int(tuned), budget), 1) if tuned else budget
+
+
+def configure_process(threads: int | None = None) -> int:
+    """Set this process's intra-op thread count; call before the first model runs.
+
+    Without `threads`, the profile's value is applied to torch's default once,
+    and a count set earlier in this process is kept.
+    """
+    global _PROCESS_THREADS
+
+    import torch
+
+    if threads is None:
+        if _PROCESS_THREADS is not None:
+            return _PROCESS_THREADS
+        threads = process_threads(torch.get_num_threads())
+    torch.set_num_threads(threads)
+    _PROCESS_THREADS = threads
+    return threads
+
+
+def model_threads(name: str) -> int | None:
+    configured = _settings(name).get("threads")
+    if not configured:
+        return None
+    return min(int(configured), _PROCESS_THREADS or int(configured))
+
+
+def channels_last(name: str) -> bool:
+    return bool(_settings(name).get("channels_last", _DEFAULT_CHANNELS_LAST.get(name, False)))
+
+
+def prepare_model(name: str, module, use_channels_last: bool | None = None):
+    """Put a loaded module in eval mode and in the memory format for `name`."""
+    import torch
+
+    if use_channels_last is None:
+        use_channels_last = channels_last(name)
+    module.eval()
+    module.to(memory_format=torch.channels_last if use_channels_last else torch.contiguous_format)
+    return module
+
+
+def model_input(name: str, tensor):
+    """Convert a 4-D input batch to the model's memory format."""
+    import torch
+
+    if tensor.dim() == 4 and channels_last(name):
+        return tensor.contiguous(memory_format=torch.channels_last)
+    return tensor
+
+
+@contextmanager
+def inference(name: str):
+    """Run one model call under inference_mode with the model's thread count.
+
+    torch applies set_num_threads to the calling thread and to threads that
+    have not run a parallel op yet. Each request thread therefore sets its own
+    count around each call and restores it afterwards.
+    """
+    import torch
+
+    threads = model_threads(name)
+    previous = torch.get_num_threads()
+    switch = threads is not None and threads != previous
+    if switch:
+        torch.set_num_threads(threads)
+    try:
+        with torch.inference_mode():
+            yield
+    finally:
+        if switch:
+            torch.set_num_threads(previous)
@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import time
+from threading import Event, Lock, Thread
+
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from app.services.blob_store import blob_path, blob_root, put_blob_stream
+from app.services.extraction_store import referenced_embedding_files
+from app.services.image_ingest import probe_image
+
+logger = logging.getLogger(__name__)
+
+_GC_THREAD: Thread | None = None
+_GC_LOCK = Lock()
+_GC_STOP = Event()
+
+
+def save_upload(file: FileStorage, namespace: str = "uploads") -> dict:
+    """Store a multipart upload content-addressed and describe it.
+
+    Concurrent uploads that share a file name no longer collide, and
+    identical uploads share one file on disk. The image header is probed
+    first, so non-images and decompression bombs are rejected
+    (ImageRejected) before anything is written.
+    """
+    probe_image(file.stream)
+    blob = put_blob_stream(file.stream, namespace=namespace)
+    return {
+        **blob,
+        "name": secure_filename(file.filename or "") or "upload",
+        "mime_type": file.mimetype or "application/octet-stream",
+    }
+
+
+def _files_under(root: str):
+    if not os.path.isdir(root):
+        return
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.startswith(".tmp-"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+
+def _legacy_upload_files():
+    # Per-request files written before the content-addressed store: top-level
+    # files in uploads/ and the old uploads/chat_images directory.
+    root = os.getenv("UPLOAD_FOLDER") or "uploads"
+    if os.path.isdir(root):
+        for entry in os.scandir(root):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                yield entry.path, stat.st_size, stat.st_mtime
+    yield from _files_under(os.path.join(root, "chat_images"))
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _enforce_budget(files: list, ttl_seconds: float, max_bytes: int, now: float, on_remove=None) -> dict:
+    # Files younger than UPLOAD_GC_MIN_AGE_SECONDS are never removed, so a
+    # request or job that is still using its upload keeps it.
+    min_age = float(os.getenv("UPLOAD_GC_MIN_AGE_SECONDS", "3600"))
+    files = sorted(files, key=lambda item: item[2])
+    total = sum(size for _, size, _ in files)
+    removed = freed = 0
+    for path, size, mtime in files:
+        age = now - mtime
+        if age < min_age:
+            break
+        expired = ttl_seconds > 0 and age > ttl_seconds
+        over_budget = max_bytes > 0 and total > max_bytes
+        if not (expired or over_budget):
+            break
+        if _remove(path):
+            if on_remove is not None:
+                on_remove(path)
+            removed += 1
+            freed += size
+        total -= size
+    return {"files": len(files), "bytes": total, "removed": removed, "freed_bytes": freed}
+
+
+def _remove_chat_thumbnail(path: str) -> None:
+    try:
+        _remove(blob_path(os.path.basename(path), thumbnail=True))
+    except ValueError:
+        pass
+
+
+def _unreferenced_chat_blobs(files: list) -> list:
+    # Chat blobs are the only copy of each conversation image, so any blob a
+    # chat_messages row still points at is kept whatever its age. What is left
+    # are images of deleted rooms and of sends that never got a message row.
+    from app.services.supabase_client import get_supabase_client
+
+    supabase = get_supabase_client()
+    batch_size = int(os.getenv("UPLOAD_GC_REFERENCE_BATCH", "200"))
+    referenced: set[str] = set()
+    hashes = [os.path.basename(path) for path, _, _ in files]
+    for start in range(0, len(hashes), batch_size):
+        response = (
+            supabase.table("chat_messages")
+            .select("image_hash")
+            .in_("image_hash", hashes[start : start + batch_size])
+            .execute()
+        )
+        referenced.update(row["image_hash"] for row in response.data or [])
+    return [item for item in files if os.path.basename(item[0]) not in referenced]
+
+
+def collect_garbage() -> dict:
+    """One retention pass over uploads, chat images and orphaned embeddings.
+
+    Each pool is trimmed oldest-first (by mtime, which a repeat upload
+    refreshes) until it is within both its TTL and its byte budget. Chat
+    images that a message still references are exempt, and the chat pool is
+    skipped entirely when the references cannot be read.
+    """
+    now = time.time()
+    chat_files = list(_files_under(os.path.join(blob_root("chat"), "objects")))
+    try:
+        chat_files = _unreferenced_chat_blobs(chat_files)
+    except Exception as exc:
+        logger.warning(json.dumps({"event": "upload_gc_chat_skipped", "error": str(exc)}))
+        chat_files = []
+    report = {
+        "uploads": _enforce_budget(
+            list(_files_under(os.path.join(blob_root("uploads"), "objects"))) + list(_legacy_upload_files()),
+            float(os.getenv("UPLOAD_RETENTION_SECONDS", str(7 * 86400))),
+            int(os.getenv("UPLOAD_MAX_BYTES", str(5 * 1024**3))),
+            now,
+        ),
+        "chat_images": _enforce_budget(
+            chat_files,
+            float(os.getenv("CHAT_IMAGE_RETENTION_SECONDS", str(90 * 86400))),
+            int(os.getenv("CHAT_IMAGE_MAX_BYTES", str(5 * 1024**3))),
+            now,
+            on_remove=_remove_chat_thumbnail,
+        ),
+    }
+
+    embeddings_dir = os.getenv("EMBEDDING_FOLDER") or "embeddings"
+    referenced = referenced_embedding_files()
+    orphans = [
+        item for item in _files_under(embeddings_dir) if os.path.basename(item[0]) not in referenced
+    ]
+    report["orphaned_embeddings"] = _enforce_budget(
+        orphans,
+        float(os.getenv("EMBEDDING_ORPHAN_TTL_SECONDS", "86400")),
+        0,
+        now,
+    )
+    return report
+
+
+def _gc_loop() -> None:
+    interval = float(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", "900"))
+    while not _GC_STOP.is_set():
+        started = time.monotonic()
+        try:
+            report = collect_garbage()
+            logger.info(
+                json.dumps(
+                    {
+                        "event": "upload_gc_completed",
+                        "elapsed_ms": int((time.monotonic() - started) * 1000),
+                        **report,
+                    }
+                )
+            )
+        except Exception as exc:
+            logger.warning(json.dumps({"event": "upload_gc_failed", "error": str(exc)}))
+        _GC_STOP.wait(interval)
+
+
+def start_upload_gc() -> None:
+    global _GC_THREAD
+
+    if os.getenv("UPLOAD_GC_ENABLED", "true").lower() != "true":
+        return
+    with _GC_LOCK:
+        if _GC_THREAD is not None and _GC_THREAD.is_alive():
+            return
+        _GC_STOP.clear()
+        _GC_THREAD = Thread(target=_gc_loop, name="upload-gc", daemon=True)
+        _GC_THREAD.start()
@@ -1,6 +1,9 @@
 import faiss
 import numpy as np
 import os
+import time
+
+from app.services import metrics
 
 dimension = 512
 index = faiss.IndexFlatL2(dimension)
@@ -14,6 +17,8 @@ def add_vector(vector, data):
 
 def search_vector(vector, k=5):
     vec = np.array(vector).astype("float32")
+    started = time.perf_counter()
     D, I = index.search(np.expand_dims(vec, axis=0), k)
+    metrics.observe("visionix_vector_search_seconds", time.perf_counter() - started)
     results = [metadata[i] for i in I[0]]
     return results
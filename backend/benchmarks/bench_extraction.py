@@ -0,0 +1,189 @@
+"""Per-stage latency and throughput benchmark for feature extraction.
+
+Runs feature_extractor.extract_features in-process on synthetic JPEGs (with
+printed text, so the OCR stage has something to find) across image sizes, and
+measures throughput with 1..N concurrent extractions. Per-stage timings come
+from the progress callback the pipeline already reports its stages through.
+
+    python benchmarks/bench_extraction.py --mode stub --output benchmarks/baseline.json
+    python benchmarks/bench_extraction.py --mode real --sizes 1920x1080,4000x3000
+    python benchmarks/bench_extraction.py --mode stub --compare benchmarks/baseline.json
+
+--mode stub swaps app.models for benchmarks/stub_models.py, so it needs no
+model weights or network and fits in CI; --mode real loads the real models
+(run it from backend/ on the CPU nodes). --compare exits with status 1 when a
+p50 is more than --threshold slower than the baseline's, or when throughput
+drops by more than that.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from PIL import Image, ImageDraw
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def _load_extractor(mode: str):
+    if mode == "stub":
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import stub_models
+
+        sys.modules["app.models"] = stub_models
+    from app.services import feature_extractor
+
+    return feature_extractor
+
+
+def _make_image(directory: str, width: int, height: int) -> str:
+    image = Image.new("RGB", (width, height), (236, 232, 220))
+    draw = ImageDraw.Draw(image)
+    step = max(height // 12, 1)
+    for i, y in enumerate(range(0, height, step)):
+        draw.rectangle([(i * 37) % width, y, (i * 37) % width + width // 5, y + step // 2], fill=(40 * i % 255, 90, 160))
+        draw.text((width // 20, y + step // 2), f"VisioNiX benchmark line {i}", fill=(0, 0, 0))
+    path = os.path.join(directory, f"bench_{width}x{height}.jpg")
+    image.save(path, quality=90)
+    return path
+
+
+def _extract_once(extractor, image_path: str) -> dict[str, float]:
+    marks: list[tuple[str, float]] = []
+    started = time.perf_counter()
+    features = extractor.extract_features(image_path, lambda stage: marks.append((stage, time.perf_counter())))
+    finished = time.perf_counter()
+    try:
+        os.remove(features["clip_embedding_path"])
+    except OSError:
+        pass
+
+    timings = {"total": (finished - started) * 1000}
+    ends = [t for _, t in marks[1:]] + [finished]
+    for (stage, begin), end in zip(marks, ends):
+        timings[stage] = timings.get(stage, 0.0) + (end - begin) * 1000
+    return timings
+
+
+def _summarise(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)], 2),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+    }
+
+
+def _throughput(extractor, image_path: str, concurrency: int, iterations: int) -> float:
+    total = concurrency * iterations
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda _: _extract_once(extractor, image_path), range(total)))
+    return round(total / (time.perf_counter() - started), 3)
+
+
+def run(args) -> dict:
+    extractor = _load_extractor(args.mode)
+    import torch
+
+    if args.torch_threads:
+        torch.set_num_threads(args.torch_threads)
+
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes.split(","):
+            width, height = (int(part) for part in size.lower().split("x"))
+            image_path = _make_image(directory, width, height)
+            for _ in range(args.warmup):
+                _extract_once(extractor, image_path)
+
+            runs = [_extract_once(extractor, image_path) for _ in range(args.iterations)]
+            stages = sorted({stage for timings in runs for stage in timings})
+            results[size] = {
+                "stages": {stage: _summarise([timings.get(stage, 0.0) for timings in runs]) for stage in stages},
+                "throughput_ips": {
+                    str(concurrency): _throughput(extractor, image_path, concurrency, args.iterations)
+                    for concurrency in (int(value) for value in args.batch_sizes.split(","))
+                },
+            }
+            print(f"{size}: total p50 {results[size]['stages']['total']['p50_ms']} ms", file=sys.stderr)
+
+    return {
+        "meta": {
+            "mode": args.mode,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "torch": torch.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    if current["meta"]["mode"] != baseline["meta"]["mode"]:
+        regressions.append(f"mode differs: {current['meta']['mode']} vs baseline {baseline['meta']['mode']}")
+    for size, result in current["results"].items():
+        base = baseline["results"].get(size)
+        if base is None:
+            continue
+        for stage, summary in result["stages"].items():
+            before = base["stages"].get(stage, {}).get("p50_ms")
+            if before and summary["p50_ms"] > before * (1 + threshold):
+                regressions.append(
+                    f"{size} {stage}: p50 {summary['p50_ms']} ms vs {before} ms (+{summary['p50_ms'] / before - 1:.0%})"
+                )
+        for concurrency, ips in result["throughput_ips"].items():
+            before = base["throughput_ips"].get(concurrency)
+            if before and ips < before * (1 - threshold):
+                regressions.append(
+                    f"{size} x{concurrency}: {ips} img/s vs {before} img/s ({ips / before - 1:.0%})"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the feature extraction pipeline.")
+    parser.add_argument("--mode", choices=("stub", "real"), default="stub")
+    parser.add_argument("--sizes", default="640x480,1920x1080,4000x3000", help="comma-separated WIDTHxHEIGHT list")
+    parser.add_argument("--batch-sizes", default="1,4", help="concurrent extractions for the throughput runs")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--torch-threads", type=int, default=0)
+    parser.add_argument("--output", help="write the results JSON here (e.g. a new baseline)")
+    parser.add_argument("--compare", help="baseline JSON to check the results against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown as a fraction")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions above {args.threshold:.0%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Stand-ins for app/models.py so the extraction benchmark runs offline.
+
+Each stub does the input-side work its real counterpart does (resizing to the
+model's input size and building a normalised tensor) plus a fixed amount of
+tensor math, so the benchmark still measures the pipeline code around the
+models: decoding, the OCR second pass, colour/texture statistics, embedding
+normalisation and the embedding file write. Absolute numbers say nothing
+about real model latency; use --mode real on a CPU node for that.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+from PIL import Image
+
+_WEIGHTS = torch.randn(512, 512)
+
+
+def _tensor(image: Image.Image, side: int) -> torch.Tensor:
+    resized = image.convert("RGB").resize((side, side), Image.Resampling.BICUBIC)
+    array = np.asarray(resized, dtype=np.float32) / 255.0
+    return torch.from_numpy(array).permute(2, 0, 1).unsqueeze(0)
+
+
+def _work(pixels: torch.Tensor, rounds: int) -> torch.Tensor:
+    features = torch.nn.functional.adaptive_avg_pool2d(pixels, 16).flatten()[:512]
+    features = torch.nn.functional.pad(features, (0, 512 - features.numel()))
+    for _ in range(rounds):
+        features = torch.tanh(_WEIGHTS @ features)
+    return features
+
+
+class _Batch(dict):
+    def to(self, device):
+        return self
+
+
+class _BlipProcessor:
+    def __call__(self, image, return_tensors="pt"):
+        return _Batch(pixel_values=_tensor(image, 384))
+
+    def decode(self, tokens, skip_special_tokens=True):
+        return "a stub caption"
+
+
+class _BlipModel:
+    def generate(self, pixel_values):
+        # Captioning is autoregressive: one pass per generated token.
+        _work(pixel_values, 20)
+        return [[0]]
+
+
+class _YoloModel:
+    names = {0: "person", 1: "car"}
+
+    def __call__(self, image):
+        _work(_tensor(image, 640), 10)
+        boxes = [SimpleNamespace(cls=0), SimpleNamespace(cls=1)]
+        return [SimpleNamespace(boxes=boxes)]
+
+
+class _OcrModel:
+    def __call__(self, pages):
+        page = torch.from_numpy(np.ascontiguousarray(pages[0], dtype=np.float32)).permute(2, 0, 1).unsqueeze(0)
+        _work(torch.nn.functional.interpolate(page / 255.0, size=(1024, 1024)), 10)
+        words = [SimpleNamespace(value="stub"), SimpleNamespace(value="text")]
+        line = SimpleNamespace(words=words)
+        return SimpleNamespace(pages=[SimpleNamespace(blocks=[SimpleNamespace(lines=[line])])])
+
+
+class _ClipProcessor:
+    def __call__(self, images, return_tensors="pt"):
+        return {"pixel_values": _tensor(images, 224)}
+
+
+class _ClipModel:
+    def get_image_features(self, pixel_values):
+        return _work(pixel_values, 12).unsqueeze(0)
+
+
+def classify_scene(image_path, image=None):
+    img = image if image is not None else Image.open(image_path).convert("RGB")
+    _work(_tensor(img, 224), 8)
+    return ["stub_scene_a", "stub_scene_b", "stub_scene_c"]
+
+
+blip_processor = _BlipProcessor()
+blip_model = _BlipModel()
+yolo_model = _YoloModel()
+ocr_model = _OcrModel()
+clip_processor = _ClipProcessor()
+clip_model = _ClipModel()
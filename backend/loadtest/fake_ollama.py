@@ -0,0 +1,169 @@
+"""Ollama stand-in for load tests.
+
+Serves the endpoints the backend uses (/api/chat, /api/generate, /api/tags,
+/api/ps, /api/version). Each generation sleeps for a prefill delay plus
+`tokens / token_rate` seconds, so the backend sees realistic response times
+without a GPU, and a configurable share of requests fails with a 500 or
+hangs past the client's timeout.
+
+    python loadtest/fake_ollama.py --port 11534 --token-rate 40 --failure-rate 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = (
+    "the image shows a scene with several objects arranged across the frame while light falls "
+    "from the left and the colours suggest an indoor setting with clear visual evidence"
+).split()
+
+
+@dataclass
+class OllamaBehaviour:
+    models: tuple[str, ...] = ("qwen3-vl:8b",)
+    prefill_ms: float = 150.0
+    token_rate: float = 40.0
+    response_tokens: int = 120
+    jitter: float = 0.2
+    failure_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_seconds: float = 600.0
+    stats: dict = field(default_factory=lambda: {"requests": 0, "failures": 0, "hangs": 0, "in_flight": 0})
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _answer(tokens: int) -> str:
+    # Long enough to pass the backend's "too short" check, so one attempt suffices.
+    return " ".join(_WORDS[i % len(_WORDS)] for i in range(tokens)).capitalize() + "."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    behaviour: OllamaBehaviour
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        b = self.behaviour
+        if self.path == "/api/tags":
+            self._send(200, {"models": [{"name": name, "model": name} for name in b.models]})
+        elif self.path == "/api/ps":
+            self._send(200, {"models": [{"name": name, "model": name, "expires_at": "2999-01-01T00:00:00Z"} for name in b.models]})
+        elif self.path == "/api/version":
+            self._send(200, {"version": "0.0.0-fake"})
+        elif self.path == "/_stats":
+            with b.lock:
+                self._send(200, dict(b.stats))
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        b = self.behaviour
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if self.path not in ("/api/chat", "/api/generate"):
+            self._send(404, {"error": "not found"})
+            return
+        if not payload.get("messages") and not payload.get("prompt"):
+            # Residency warm-up: load the model, generate nothing.
+            self._send(200, {"model": payload.get("model"), "done": True, "response": ""})
+            return
+
+        roll = random.random()
+        with b.lock:
+            b.stats["requests"] += 1
+            b.stats["in_flight"] += 1
+        try:
+            if roll < b.hang_rate:
+                with b.lock:
+                    b.stats["hangs"] += 1
+                time.sleep(b.hang_seconds)
+                return
+            if roll < b.hang_rate + b.failure_rate:
+                with b.lock:
+                    b.stats["failures"] += 1
+                self._send(500, {"error": "injected failure"})
+                return
+
+            scale = 1 + random.uniform(-b.jitter, b.jitter)
+            tokens = max(int(payload.get("options", {}).get("num_predict") or b.response_tokens), 1)
+            tokens = min(tokens, b.response_tokens)
+            prompt_chars = len(json.dumps(payload.get("messages") or payload.get("prompt") or ""))
+            prefill_s = b.prefill_ms / 1000 * scale
+            decode_s = tokens / b.token_rate * scale
+            time.sleep(prefill_s + decode_s)
+
+            text = _answer(tokens)
+            result = {
+                "model": payload.get("model"),
+                "done": True,
+                "prompt_eval_count": prompt_chars // 4,
+                "prompt_eval_duration": int(prefill_s * 1e9),
+                "eval_count": tokens,
+                "eval_duration": int(decode_s * 1e9),
+                "total_duration": int((prefill_s + decode_s) * 1e9),
+            }
+            if self.path == "/api/chat":
+                result["message"] = {"role": "assistant", "content": text}
+            else:
+                result["response"] = text
+            self._send(200, result)
+        finally:
+            with b.lock:
+                b.stats["in_flight"] -= 1
+
+
+def make_server(host: str, port: int, behaviour: OllamaBehaviour) -> ThreadingHTTPServer:
+    handler = type("FakeOllamaHandler", (_Handler,), {"behaviour": behaviour})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser, prefix: str = "") -> None:
+    parser.add_argument(f"--{prefix}models", default="qwen3-vl:8b", help="comma-separated model names to advertise")
+    parser.add_argument(f"--{prefix}prefill-ms", type=float, default=150.0)
+    parser.add_argument(f"--{prefix}token-rate", type=float, default=40.0, help="generated tokens per second")
+    parser.add_argument(f"--{prefix}response-tokens", type=int, default=120)
+    parser.add_argument(f"--{prefix}failure-rate", type=float, default=0.0, help="share of generations answered 500")
+    parser.add_argument(f"--{prefix}hang-rate", type=float, default=0.0, help="share of generations that never answer")
+
+
+def behaviour_from_args(args, prefix: str = "") -> OllamaBehaviour:
+    value = lambda name: getattr(args, (prefix + name).replace("-", "_"))
+    return OllamaBehaviour(
+        models=tuple(name.strip() for name in value("models").split(",") if name.strip()),
+        prefill_ms=value("prefill-ms"),
+        token_rate=value("token-rate"),
+        response_tokens=value("response-tokens"),
+        failure_rate=value("failure-rate"),
+        hang_rate=value("hang-rate"),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Ollama server for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11534)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, behaviour_from_args(args))
+    print(f"fake ollama on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
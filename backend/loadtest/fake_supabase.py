@@ -0,0 +1,344 @@
+"""In-memory Supabase stand-in (PostgREST + GoTrue subset) for load tests.
+
+Implements what the backend's supabase-py calls send:
+
+* PostgREST: /rest/v1/<table> GET/POST/PATCH/DELETE with select, order,
+  limit, offset, `col=op.value` filters (eq, neq, gt, gte, lt, lte, in, is)
+  and nested or=(...)/and(...) groups. id, created_at and updated_at are
+  filled in on insert. Upserts are not implemented.
+* GoTrue: /auth/v1/signup, /auth/v1/token?grant_type=password and
+  /auth/v1/user. Access tokens are HS256 JWTs signed with --jwt-secret, so
+  the backend verifies them locally exactly as it does Supabase's.
+
+`latency_ms` adds a fixed delay to every call to model the network hop to a
+hosted project.
+
+    python loadtest/fake_supabase.py --port 54321 --jwt-secret dev-secret --latency-ms 20
+"""
+import argparse
+import copy
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import jwt
+
+_TIMESTAMPED = ("created_at", "updated_at")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def mint_access_token(secret: str, user_id: str, email: str = "", ttl_seconds: int = 3600, role: str = "authenticated") -> str:
+    now = int(time.time())
+    claims = {
+        "sub": user_id,
+        "aud": "authenticated",
+        "role": role,
+        "email": email,
+        "iat": now,
+        "exp": now + ttl_seconds,
+        "session_id": str(uuid.uuid4()),
+    }
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def _split_top_level(text: str) -> list[str]:
+    parts, depth, current, quoted = [], 0, [], False
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _coerce(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _compare(op: str, actual, expected: str) -> bool:
+    expected = expected.strip('"')
+    if op == "is":
+        return {"null": actual is None, "true": actual is True, "false": actual is False}.get(expected, False)
+    if op == "in":
+        options = [item.strip('"') for item in _split_top_level(expected.strip("()"))]
+        return str(actual) in options
+    if actual is None:
+        return op == "neq"
+    a, b = _coerce(actual), _coerce(expected)
+    if type(a) is not type(b):
+        a, b = str(actual), expected
+    return {
+        "eq": a == b,
+        "neq": a != b,
+        "gt": a > b,
+        "gte": a >= b,
+        "lt": a < b,
+        "lte": a <= b,
+    }.get(op, False)
+
+
+def _condition(expression: str):
+    # col.op.value | and(...) | or(...)
+    for group in ("and", "or"):
+        if expression.startswith(f"{group}(") and expression.endswith(")"):
+            children = [_condition(part) for part in _split_top_level(expression[len(group) + 1 : -1])]
+            combine = all if group == "and" else any
+            return lambda row: combine(child(row) for child in children)
+    column, op, value = expression.split(".", 2)
+    negate = op == "not"
+    if negate:
+        op, value = value.split(".", 1)
+    test = lambda row: _compare(op, row.get(column), value)
+    return (lambda row: not test(row)) if negate else test
+
+
+def _filters(params: list[tuple[str, str]]):
+    conditions = []
+    for key, value in params:
+        if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+            continue
+        if key in ("or", "and"):
+            conditions.append(_condition(f"{key}{value}"))
+        else:
+            conditions.append(_condition(f"{key}.{value}"))
+    return lambda row: all(condition(row) for condition in conditions)
+
+
+def _project(row: dict, select: str | None) -> dict:
+    if not select or select.strip() == "*":
+        return copy.deepcopy(row)
+    columns = [column.strip() for column in select.split(",") if column.strip() and "(" not in column]
+    return {column: copy.deepcopy(row.get(column)) for column in columns}
+
+
+def _sort(rows: list[dict], order: str | None) -> list[dict]:
+    if not order:
+        return rows
+    for clause in reversed(order.split(",")):
+        parts = clause.split(".")
+        column, descending = parts[0], "desc" in parts[1:]
+        # NULLs sort after values; the fake never stores NULL order keys in practice.
+        rows = sorted(rows, key=lambda row: (row.get(column) is None, _coerce(row.get(column)) if row.get(column) is not None else 0), reverse=descending)
+    return rows
+
+
+class FakeSupabase:
+    def __init__(self, jwt_secret: str, latency_ms: float = 0.0) -> None:
+        self.jwt_secret = jwt_secret
+        self.latency_ms = latency_ms
+        self.tables: dict[str, list[dict]] = {}
+        self.users: dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def seed(self, table: str, rows: list[dict]) -> None:
+        with self.lock:
+            self.tables.setdefault(table, []).extend(copy.deepcopy(rows))
+
+    def create_user(self, email: str, password: str) -> dict:
+        with self.lock:
+            user = self.users.get(email)
+            if user is None:
+                user = {
+                    "id": str(uuid.uuid4()),
+                    "aud": "authenticated",
+                    "role": "authenticated",
+                    "email": email,
+                    "created_at": _now_iso(),
+                    "app_metadata": {"provider": "email"},
+                    "user_metadata": {},
+                    "_password": password,
+                }
+                self.users[email] = user
+            return user
+
+    def session_for(self, user: dict) -> dict:
+        expires_in = 3600
+        public = {key: value for key, value in user.items() if not key.startswith("_")}
+        return {
+            "access_token": mint_access_token(self.jwt_secret, user["id"], user["email"], expires_in),
+            "token_type": "bearer",
+            "expires_in": expires_in,
+            "expires_at": int(time.time()) + expires_in,
+            "refresh_token": uuid.uuid4().hex,
+            "user": public,
+        }
+
+    # PostgREST -------------------------------------------------------------
+
+    def select(self, table: str, params: list[tuple[str, str]]) -> list[dict]:
+        query = dict(params)
+        match = _filters(params)
+        with self.lock:
+            rows = [row for row in self.tables.get(table, []) if match(row)]
+        rows = _sort(rows, query.get("order"))
+        offset = int(query.get("offset", 0))
+        if "limit" in query:
+            rows = rows[offset : offset + int(query["limit"])]
+        else:
+            rows = rows[offset:]
+        return [_project(row, query.get("select")) for row in rows]
+
+    def insert(self, table: str, payload) -> list[dict]:
+        rows = payload if isinstance(payload, list) else [payload]
+        created = []
+        with self.lock:
+            target = self.tables.setdefault(table, [])
+            for row in rows:
+                row = dict(row)
+                row.setdefault("id", str(uuid.uuid4()))
+                for column in _TIMESTAMPED:
+                    row.setdefault(column, _now_iso())
+                target.append(row)
+                created.append(copy.deepcopy(row))
+        return created
+
+    def update(self, table: str, params: list[tuple[str, str]], changes: dict) -> list[dict]:
+        match = _filters(params)
+        updated = []
+        with self.lock:
+            for row in self.tables.get(table, []):
+                if match(row):
+                    row.update(changes)
+                    updated.append(copy.deepcopy(row))
+        return updated
+
+    def delete(self, table: str, params: list[tuple[str, str]]) -> list[dict]:
+        match = _filters(params)
+        with self.lock:
+            rows = self.tables.get(table, [])
+            removed = [row for row in rows if match(row)]
+            self.tables[table] = [row for row in rows if not match(row)]
+        return removed
+
+
+class _Handler(BaseHTTPRequestHandler):
+    backend: FakeSupabase
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, payload, headers: dict | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _route(self, method: str) -> None:
+        backend = self.backend
+        backend.calls += 1
+        if backend.latency_ms:
+            time.sleep(backend.latency_ms / 1000)
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+
+        if url.path.startswith("/rest/v1/"):
+            table = url.path[len("/rest/v1/") :].strip("/")
+            if method == "GET":
+                rows = backend.select(table, params)
+            elif method == "POST":
+                rows = backend.insert(table, self._body())
+            elif method == "PATCH":
+                rows = backend.update(table, params, self._body() or {})
+            elif method == "DELETE":
+                rows = backend.delete(table, params)
+            else:
+                self._send(405, {"message": "method not allowed"})
+                return
+            status = 201 if method == "POST" else 200
+            self._send(status, rows, {"Content-Range": f"0-{max(len(rows) - 1, 0)}/*"})
+            return
+
+        if url.path == "/auth/v1/signup" and method == "POST":
+            body = self._body() or {}
+            self._send(200, backend.session_for(backend.create_user(body.get("email", ""), body.get("password", ""))))
+            return
+        if url.path == "/auth/v1/token" and method == "POST":
+            body = self._body() or {}
+            user = backend.users.get(body.get("email", ""))
+            if user is None or user["_password"] != body.get("password"):
+                self._send(400, {"error": "invalid_grant", "error_description": "Invalid login credentials"})
+                return
+            self._send(200, backend.session_for(user))
+            return
+        if url.path == "/auth/v1/user" and method == "GET":
+            token = (self.headers.get("Authorization") or "").split(" ", 1)[-1]
+            try:
+                claims = jwt.decode(token, backend.jwt_secret, algorithms=["HS256"], audience="authenticated")
+            except jwt.InvalidTokenError as exc:
+                self._send(401, {"code": 401, "msg": str(exc)})
+                return
+            user = next((u for u in backend.users.values() if u["id"] == claims["sub"]), None)
+            public = {key: value for key, value in (user or {}).items() if not key.startswith("_")}
+            self._send(200, public or {"id": claims["sub"], "aud": "authenticated", "role": "authenticated", "email": claims.get("email", "")})
+            return
+
+        self._send(404, {"message": f"no route for {method} {url.path}"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PATCH(self):
+        self._route("PATCH")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+def make_server(host: str, port: int, backend: FakeSupabase) -> ThreadingHTTPServer:
+    handler = type("FakeSupabaseHandler", (_Handler,), {"backend": backend})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Supabase (PostgREST + GoTrue subset) for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--jwt-secret", required=True)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, FakeSupabase(args.jwt_secret, args.latency_ms))
+    print(f"fake supabase on http://{args.host}:{args.port}")
+    print(f"anon key: {mint_access_token(args.jwt_secret, 'anon', role='anon', ttl_seconds=10 * 365 * 86400)}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Offline load test: fake Ollama + fake Supabase + the Flask app + a load generator.
+
+Starts both stand-ins on free local ports, points the app at them through its
+usual environment variables, serves the app with a threaded WSGI server and
+drives it with closed-loop virtual users running a weighted mix of
+/describe, /reason (a session start plus follow-ups), /search and chat
+(message sends and history pages). Reports throughput, latency percentiles,
+error and shed (503) rates per route.
+
+    python loadtest/run_load.py --stub-models --users 16 --duration 60
+    python loadtest/run_load.py --stub-models --mix describe=1,chat=3 --ollama-token-rate 20 --json out.json
+    python loadtest/run_load.py --target http://127.0.0.1:5000 --jwt-secret $SUPABASE_JWT_SECRET
+
+--stub-models swaps in benchmarks/stub_models.py so no model weights are
+needed; without it the real models load (run from backend/). With --target
+the app is not started here; that server must already be configured against
+stand-ins (or real services) that accept tokens signed with --jwt-secret.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+from PIL import Image, ImageDraw
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(LOADTEST_DIR)
+sys.path.insert(0, LOADTEST_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import fake_ollama  # noqa: E402
+import fake_supabase  # noqa: E402
+
+SCENARIOS = ("describe", "reason", "search", "chat")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(server) -> str:
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def _test_image(width: int, height: int) -> bytes:
+    image = Image.new("RGB", (width, height), (220, 226, 232))
+    draw = ImageDraw.Draw(image)
+    for i in range(8):
+        draw.rectangle([i * width // 9, i * height // 11, i * width // 9 + width // 6, i * height // 11 + height // 7], fill=(30 * i, 120, 200 - 20 * i))
+    draw.text((width // 10, height // 2), "load test", fill=(0, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=88)
+    return buffer.getvalue()
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.samples: dict[str, list[tuple[float, int]]] = {}
+
+    def record(self, route: str, seconds: float, status: int) -> None:
+        with self.lock:
+            self.samples.setdefault(route, []).append((seconds, status))
+
+    def report(self, elapsed: float) -> list[dict]:
+        rows = []
+        for route, samples in sorted(self.samples.items()):
+            latencies = sorted(seconds * 1000 for seconds, _ in samples)
+            statuses = [status for _, status in samples]
+            pick = lambda q: round(latencies[max(math.ceil(q * len(latencies)), 1) - 1], 1)
+            rows.append(
+                {
+                    "route": route,
+                    "requests": len(samples),
+                    "rps": round(len(samples) / elapsed, 2),
+                    "p50_ms": pick(0.50),
+                    "p95_ms": pick(0.95),
+                    "p99_ms": pick(0.99),
+                    "error_rate": round(sum(1 for s in statuses if s == 0 or (s >= 400 and s != 503)) / len(samples), 4),
+                    "shed_rate": round(statuses.count(503) / len(samples), 4),
+                }
+            )
+        return rows
+
+
+class VirtualUser:
+    def __init__(self, base_url: str, token: str, image: bytes, recorder: Recorder, args) -> None:
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        self.image = image
+        self.recorder = recorder
+        self.args = args
+        self.reason_session: str | None = None
+        self.reason_turns = 0
+        self.room_id: str | None = None
+
+    def _call(self, route: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        status = 0
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.args.timeout, **kwargs)
+            status = response.status_code
+            return response
+        except requests.RequestException:
+            return None
+        finally:
+            self.recorder.record(route, time.perf_counter() - started, status)
+
+    def _files(self):
+        return {"image": ("load.jpg", self.image, "image/jpeg")}
+
+    def describe(self) -> None:
+        self._call("POST /describe", "POST", "/describe", files=self._files(), data={"prompt": "Describe this image."})
+
+    def search(self) -> None:
+        self._call("POST /search", "POST", "/search", files=self._files())
+
+    def reason(self) -> None:
+        if self.reason_session is None or self.reason_turns >= self.args.reason_turns:
+            response = self._call("POST /reason (new)", "POST", "/reason", files=self._files(), data={"prompt": "What stands out?"})
+            if response is not None and response.ok:
+                self.reason_session = response.json().get("session_id")
+                self.reason_turns = 1
+            return
+        response = self._call(
+            "POST /reason (follow-up)", "POST", "/reason", data={"session_id": self.reason_session, "prompt": "And what else?"}
+        )
+        self.reason_turns += 1
+        if response is None or response.status_code == 404:
+            self.reason_session = None
+
+    def chat(self) -> None:
+        if self.room_id is None:
+            response = self._call("POST /chat/rooms", "POST", "/chat/rooms", json={"title": "load test"})
+            if response is None or not response.ok:
+                return
+            self.room_id = response.json()["room"]["id"]
+            self._call(
+                "POST /chat/rooms/<id>/messages (image)",
+                "POST",
+                f"/chat/rooms/{self.room_id}/messages",
+                files=self._files(),
+                data={"prompt": "What is in this picture?"},
+            )
+            return
+        if random.random() < 0.25:
+            self._call("GET /chat/rooms/<id>/messages", "GET", f"/chat/rooms/{self.room_id}/messages?limit=20")
+        else:
+            self._call(
+                "POST /chat/rooms/<id>/messages",
+                "POST",
+                f"/chat/rooms/{self.room_id}/messages",
+                data={"prompt": "Tell me more about the colours."},
+            )
+
+    def run(self, mix: list[tuple[str, float]], stop_at: float) -> None:
+        names = [name for name, _ in mix]
+        weights = [weight for _, weight in mix]
+        while time.monotonic() < stop_at:
+            getattr(self, random.choices(names, weights)[0])()
+            if self.args.think_ms:
+                time.sleep(random.expovariate(1000 / self.args.think_ms))
+
+
+def _parse_mix(text: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def _start_app(args, ollama_url: str, supabase_url: str, workdir: str) -> str:
+    os.environ.update(
+        {
+            "OLLAMA_BASE_URL": ollama_url,
+            "OLLAMA_BASE_URLS": "",
+            "SUPABASE_URL": supabase_url,
+            "SUPABASE_KEY": fake_supabase.mint_access_token(args.jwt_secret, "anon", role="anon", ttl_seconds=86400),
+            "SUPABASE_JWT_SECRET": args.jwt_secret,
+            "EXTRACTION_DB_PATH": os.path.join(workdir, "extractions.sqlite3"),
+            "EXTRACTION_JOB_DB_PATH": os.path.join(workdir, "extraction_jobs.sqlite3"),
+            "REASONING_SESSION_DB_PATH": os.path.join(workdir, "sessions.sqlite3"),
+            "UPLOAD_BLOB_ROOT": os.path.join(workdir, "uploads"),
+            "CHAT_BLOB_ROOT": os.path.join(workdir, "blobs"),
+            "CHAT_BLOB_URL_SECRET": uuid.uuid4().hex,
+            "DESCRIBE_RUNS_LOG_PATH": os.path.join(workdir, "describe_runs.jsonl"),
+            "UPLOAD_GC_ENABLED": "false",
+        }
+    )
+    if args.stub_models:
+        sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+        import stub_models
+
+        sys.modules["app.models"] = stub_models
+
+    from werkzeug.serving import make_server
+
+    from app import create_app
+
+    server = make_server("127.0.0.1", _free_port(), create_app(), threaded=True)
+    return _serve(server)
+
+
+def _print_table(rows: list[dict]) -> None:
+    columns = ["route", "requests", "rps", "p50_ms", "p95_ms", "p99_ms", "error_rate", "shed_rate"]
+    widths = {column: max([len(column)] + [len(str(row[column])) for row in rows]) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(widths[column]) for column in columns))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline load test for the VisioNiX backend.")
+    parser.add_argument("--target", help="base URL of an already running backend; otherwise one is started here")
+    parser.add_argument("--stub-models", action="store_true", help="use benchmarks/stub_models.py instead of the real models")
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load after warm-up")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's requests")
+    parser.add_argument("--mix", default="describe=1,reason=2,search=1,chat=3", help="scenario weights")
+    parser.add_argument("--reason-turns", type=int, default=5, help="follow-ups per /reason session")
+    parser.add_argument("--image-size", default="1280x960")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--jwt-secret", default="visionix-loadtest-secret-not-for-production")
+    parser.add_argument("--supabase-latency-ms", type=float, default=15.0)
+    parser.add_argument("--json", help="also write the report to this file")
+    fake_ollama.add_arguments(parser, prefix="ollama-")
+    args = parser.parse_args()
+
+    ollama = fake_ollama.behaviour_from_args(args, prefix="ollama_")
+    ollama_url = _serve(fake_ollama.make_server("127.0.0.1", _free_port(), ollama))
+    supabase = fake_supabase.FakeSupabase(args.jwt_secret, args.supabase_latency_ms)
+    supabase_url = _serve(fake_supabase.make_server("127.0.0.1", _free_port(), supabase))
+
+    with tempfile.TemporaryDirectory(prefix="visionix-load-") as workdir:
+        base_url = args.target or _start_app(args, ollama_url, supabase_url, workdir)
+        width, height = (int(part) for part in args.image_size.lower().split("x"))
+        image = _test_image(width, height)
+        recorder = Recorder()
+        users = [
+            VirtualUser(base_url, fake_supabase.mint_access_token(args.jwt_secret, str(uuid.uuid4())), image, recorder, args)
+            for _ in range(args.users)
+        ]
+
+        print(f"app {base_url}, fake ollama {ollama_url}, fake supabase {supabase_url}", file=sys.stderr)
+        started = time.monotonic()
+        stop_at = started + args.duration
+        mix = _parse_mix(args.mix)
+        threads = [threading.Thread(target=user.run, args=(mix, stop_at), daemon=True) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(args.duration + args.timeout)
+        elapsed = time.monotonic() - started
+
+        rows = recorder.report(elapsed)
+        report = {
+            "users": args.users,
+            "duration_s": round(elapsed, 1),
+            "mix": dict(mix),
+            "routes": rows,
+            "fake_ollama": dict(ollama.stats),
+            "fake_supabase_calls": supabase.calls,
+        }
+        _print_table(rows)
+        print(f"ollama {report['fake_ollama']}, supabase calls {supabase.calls}", file=sys.stderr)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""Production launcher: load the models once, then fork HTTP workers that share them.
+
+The master imports the app (and with it app/models.py) before forking, so the
+BLIP, CLIP, docTR, YOLO and ResNet18 weights are shared copy-on-write instead
+of loaded once per worker. Each worker serves the master's listening socket
+with a threaded WSGI server and a slice of the CPU's torch threads. It exits
+gracefully after VISIONIX_MAX_REQUESTS requests and the master forks a
+replacement, while the other workers keep accepting connections. A stopping
+worker stops accepting, ends its job event streams with an SSE `retry` event
+so clients reconnect to another worker, and is killed if ordinary requests
+are still running after VISIONIX_GRACEFUL_TIMEOUT seconds.
+
+    python prefork_server.py
+
+Signals to the master: SIGTERM/SIGINT stop everything gracefully, SIGHUP
+recycles the workers one at a time. Fork is POSIX-only; elsewhere this falls
+back to a single threaded process.
+"""
+import gc
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+logger = logging.getLogger("prefork")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _log(event: str, **fields) -> None:
+    logger.info(json.dumps({"event": event, "pid": os.getpid(), **fields}))
+
+
+def _torch_threads_per_worker(workers: int) -> int:
+    configured = os.getenv("VISIONIX_TORCH_THREADS")
+    if configured:
+        return max(int(configured), 1)
+    from app.services import torch_runtime
+
+    return torch_runtime.process_threads(max((os.cpu_count() or 1) // workers, 1))
+
+
+class _RequestBudget:
+    """WSGI wrapper that asks the server to stop after `limit` completed requests."""
+
+    def __init__(self, app, limit: int, on_exhausted) -> None:
+        self._app = app
+        self._limit = limit
+        self._on_exhausted = on_exhausted
+        self._served = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        try:
+            return self._app(environ, start_response)
+        finally:
+            with self._lock:
+                self._served += 1
+                exhausted = self._limit > 0 and self._served == self._limit
+            if exhausted:
+                self._on_exhausted("max_requests")
+
+
+def _run_worker(listen_fd: int, host: str, port: int, worker_id: int, threads: int) -> None:
+    from werkzeug.serving import make_server
+
+    from app import create_app
+    from app.services import torch_runtime
+    from app.services.extraction_jobs import begin_drain
+
+    torch_runtime.configure_process(threads)
+    # Background threads (job workers, Ollama prober, inference dispatch) do not survive fork, so
+    # the app and its threads are created here rather than in the master.
+    flask_app = create_app()
+
+    max_requests = _env_int("VISIONIX_MAX_REQUESTS", 1000)
+    if max_requests > 0:
+        max_requests += random.randint(0, _env_int("VISIONIX_MAX_REQUESTS_JITTER", 100))
+    graceful_timeout = float(os.getenv("VISIONIX_GRACEFUL_TIMEOUT", "60"))
+    stopping = threading.Event()
+    server = None
+
+    def _stop(reason: str) -> None:
+        if stopping.is_set():
+            return
+        stopping.set()
+        _log("worker_stopping", worker=worker_id, reason=reason)
+        # Job event streams can stay open for up to EXTRACTION_JOB_SSE_MAX_SECONDS;
+        # end them now rather than letting them run into the forced exit.
+        begin_drain()
+
+        def _force_exit():
+            time.sleep(graceful_timeout)
+            _log("worker_killed", worker=worker_id, reason="graceful_timeout")
+            os._exit(1)
+
+        threading.Thread(target=_force_exit, daemon=True).start()
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    server = make_server(
+        host,
+        port,
+        _RequestBudget(flask_app, max_requests, _stop),
+        threaded=True,
+        fd=listen_fd,
+    )
+    # Non-daemon handler threads plus block_on_close make server_close() wait
+    # for in-flight requests before the worker exits.
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    signal.signal(signal.SIGTERM, lambda *_: _stop("sigterm"))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+
+    _log("worker_started", worker=worker_id, torch_threads=threads, max_requests=max_requests)
+    server.serve_forever()
+    server.server_close()
+    # Workers leave through os._exit, which skips atexit handlers.
+    from app.services.run_log import flush_run_log
+
+    flush_run_log()
+    _log("worker_exited", worker=worker_id)
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(_env_int("VISIONIX_BACKLOG", 2048))
+    sock.set_inheritable(True)
+    return sock
+
+
+def main() -> None:
+    host = os.getenv("VISIONIX_HOST", "0.0.0.0")
+    port = _env_int("VISIONIX_PORT", 5000)
+
+    if not hasattr(os, "fork"):
+        from app import create_app
+
+        create_app().run(host=host, port=port, threaded=True)
+        return
+
+    workers = max(_env_int("VISIONIX_WORKERS", 2), 1)
+    threads = _torch_threads_per_worker(workers)
+
+    started = time.monotonic()
+    if int(os.getenv("INFERENCE_WORKERS", "0")) <= 0:
+        # Models run in the HTTP workers: load every one here, once.
+        import app.services.feature_extractor  # noqa: F401
+    import app  # noqa: F401
+
+    # Keep the preloaded objects out of the collector so it does not touch
+    # (and thereby copy) their pages in every worker.
+    gc.collect()
+    gc.freeze()
+    _log("models_preloaded", elapsed_ms=int((time.monotonic() - started) * 1000), workers=workers)
+
+    sock = _bind(host, port)
+    children: dict[int, int] = {}
+    spawned_at: dict[int, float] = {}
+    state = {"stopping": False, "recycle": [], "draining": None}
+
+    def _spawn(worker_id: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(sock.fileno(), host, port, worker_id, threads)
+            except Exception:
+                logger.exception("worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = worker_id
+        spawned_at[pid] = time.monotonic()
+
+    def _on_stop(*_):
+        state["stopping"] = True
+
+    def _on_hup(*_):
+        state["recycle"] = list(children)
+
+    signal.signal(signal.SIGTERM, _on_stop)
+    signal.signal(signal.SIGINT, _on_stop)
+    signal.signal(signal.SIGHUP, _on_hup)
+
+    for worker_id in range(workers):
+        _spawn(worker_id)
+    _log("master_listening", host=host, port=port, workers=workers)
+
+    signalled = False
+    while children:
+        if state["stopping"] and not signalled:
+            for pid in children:
+                os.kill(pid, signal.SIGTERM)
+            signalled = True
+        elif state["recycle"] and state["draining"] is None and not state["stopping"]:
+            # Rolling restart: the next worker is only stopped once the previous
+            # one has been replaced, so the others keep serving throughout.
+            pid = state["recycle"].pop(0)
+            if pid in children:
+                os.kill(pid, signal.SIGTERM)
+                state["draining"] = pid
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+
+        worker_id = children.pop(pid)
+        if pid == state["draining"]:
+            state["draining"] = None
+        _log("worker_reaped", worker=worker_id, child=pid, exit_status=os.waitstatus_to_exitcode(status))
+        if not state["stopping"]:
+            if time.monotonic() - spawned_at.pop(pid, 0.0) < 1.0:
+                # Died right after starting: back off instead of fork-looping.
+                time.sleep(1.0)
+            _spawn(worker_id)
+
+    sock.close()
+    _log("master_exited")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Measure the local torch models on this host and write a runtime profile.
+
+Loads the real models (run it from backend/ on the node type being tuned) and
+times each of them on synthetic images. Every combination of intra-op thread
+count, batch size and, for convolutional models, channels_last on or off is
+measured. For each model the profile keeps the fewest threads whose
+single-image p50 is within --tolerance of the best, with the memory format of
+that best run. The throughput-optimal batch size at those settings is
+recorded too. The app loads the profile at startup through
+TORCH_RUNTIME_PROFILE (see app/services/torch_runtime.py).
+
+    python scripts/autotune_torch.py
+    python scripts/autotune_torch.py --budget 8 --batch-sizes 1,2,4,8 --output profiles/c6i.4xlarge.json
+    python scripts/autotune_torch.py --models scene,clip --iterations 10
+
+--budget is one process's share of the cores. By default it follows the
+prefork split (cpu_count // VISIONIX_WORKERS), or the inference pool's split
+(cpu_count // INFERENCE_WORKERS) when the pool is enabled. Thread counts above
+the budget are never tried, so the profile cannot oversubscribe the node.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def _default_budget() -> int:
+    inference_workers = int(os.getenv("INFERENCE_WORKERS", "0"))
+    workers = inference_workers if inference_workers > 0 else int(os.getenv("VISIONIX_WORKERS", "2"))
+    return max((os.cpu_count() or 1) // max(workers, 1), 1)
+
+
+def _thread_candidates(budget: int) -> list[int]:
+    candidates = {budget}
+    threads = 1
+    while threads < budget:
+        candidates.add(threads)
+        threads *= 2
+    return sorted(candidates)
+
+
+def _make_image(width: int, height: int, seed: int) -> Image.Image:
+    image = Image.new("RGB", (width, height), (236 - seed * 7, 232, 220))
+    draw = ImageDraw.Draw(image)
+    step = max(height // 12, 1)
+    for i, y in enumerate(range(0, height, step)):
+        draw.rectangle([(i * 37 + seed * 50) % width, y, (i * 37 + seed * 50) % width + width // 5, y + step // 2], fill=(40 * i % 255, 90, 160))
+        draw.text((width // 20, y + step // 2), f"VisioNiX autotune line {i}", fill=(0, 0, 0))
+    return image
+
+
+def _runners(models) -> dict:
+    """name -> (prepare(batch, channels_last) -> inputs, run(inputs)).
+
+    prepare does the preprocessing the pipeline does outside the model call, so
+    only the part that torch's thread count affects is timed.
+    """
+    import torch
+
+    device = models.device
+
+    def scene_inputs(batch, use_channels_last):
+        pixels = torch.stack([models.scene_transform(image) for image in batch]).to(device)
+        return pixels.contiguous(memory_format=torch.channels_last) if use_channels_last else pixels
+
+    return {
+        "blip": (
+            lambda batch, _: models.blip_processor(images=batch, return_tensors="pt").to(device),
+            lambda inputs: models.blip_model.generate(**inputs),
+        ),
+        "yolo": (
+            lambda batch, _: batch,
+            lambda inputs: models.yolo_model(inputs, verbose=False),
+        ),
+        "ocr": (
+            lambda batch, _: [np.asarray(image) for image in batch],
+            lambda inputs: models.ocr_model(inputs),
+        ),
+        "scene": (
+            scene_inputs,
+            lambda inputs: models.scene_model(inputs),
+        ),
+        "clip": (
+            lambda batch, _: models.clip_processor(images=batch, return_tensors="pt")["pixel_values"].to(device),
+            lambda inputs: models.clip_model.get_image_features(pixel_values=inputs),
+        ),
+    }
+
+
+def _conv_modules(models) -> dict:
+    # YOLO is left out: ultralytics fuses Conv+BN into new layers on its first
+    # prediction, so a memory format set on the loaded weights does not survive.
+    return {
+        "scene": models.scene_model,
+        "ocr": models.ocr_model.det_predictor.model,
+    }
+
+
+def _time_calls(run, inputs, warmup: int, iterations: int) -> float:
+    import torch
+
+    with torch.inference_mode():
+        for _ in range(warmup):
+            run(inputs)
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            run(inputs)
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def measure(models, names: list[str], images: list[Image.Image], args) -> list[dict]:
+    import torch
+
+    from app.services import torch_runtime
+
+    runners = _runners(models)
+    conv_modules = _conv_modules(models)
+    rows = []
+    for name in names:
+        prepare, run = runners[name]
+        layouts = (False, True) if name in conv_modules else (False,)
+        for use_channels_last in layouts:
+            if name in conv_modules:
+                torch_runtime.prepare_model(name, conv_modules[name], use_channels_last)
+            for threads in _thread_candidates(args.budget):
+                torch.set_num_threads(threads)
+                for batch_size in args.batch_sizes:
+                    inputs = prepare(images[:batch_size], use_channels_last)
+                    p50_ms = _time_calls(run, inputs, args.warmup, args.iterations)
+                    row = {
+                        "model": name,
+                        "channels_last": use_channels_last,
+                        "threads": threads,
+                        "batch_size": batch_size,
+                        "p50_ms": round(p50_ms, 2),
+                        "images_per_s": round(batch_size * 1000 / p50_ms, 3),
+                    }
+                    rows.append(row)
+                    print(
+                        f"{name:<6} channels_last={int(use_channels_last)} threads={threads:<3} batch={batch_size:<3} "
+                        f"p50 {row['p50_ms']:>9} ms  {row['images_per_s']:>8} img/s",
+                        file=sys.stderr,
+                    )
+    return rows
+
+
+def choose(rows: list[dict], tolerance: float) -> dict:
+    single = [row for row in rows if row["batch_size"] == 1]
+    best = min(single, key=lambda row: row["p50_ms"])
+    layout = best["channels_last"]
+    # Fewer threads at near-best latency leave cores for concurrent requests.
+    near_best = [
+        row for row in single if row["channels_last"] == layout and row["p50_ms"] <= best["p50_ms"] * (1 + tolerance)
+    ]
+    chosen = min(near_best, key=lambda row: row["threads"])
+    at_setting = [row for row in rows if row["channels_last"] == layout and row["threads"] == chosen["threads"]]
+    return {
+        "threads": chosen["threads"],
+        "channels_last": layout,
+        "batch_size": max(at_setting, key=lambda row: row["images_per_s"])["batch_size"],
+        "p50_ms": chosen["p50_ms"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Autotune torch runtime settings for the local models.")
+    parser.add_argument("--models", default=",".join(("blip", "yolo", "ocr", "scene", "clip")))
+    parser.add_argument("--budget", type=int, default=_default_budget(), help="max intra-op threads for one process")
+    parser.add_argument("--batch-sizes", default="1,2,4", help="comma-separated batch sizes; 1 is always measured")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--tolerance", type=float, default=0.05, help="latency slack for choosing fewer threads")
+    parser.add_argument("--image-size", default="1024x768", help="WIDTHxHEIGHT of the synthetic images")
+    parser.add_argument("--output", help="profile path (default: TORCH_RUNTIME_PROFILE or torch_runtime_profile.json)")
+    args = parser.parse_args()
+    args.batch_sizes = sorted({1, *(int(value) for value in args.batch_sizes.split(","))})
+
+    from app.services import torch_runtime
+
+    names = [name.strip() for name in args.models.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(torch_runtime.MODELS))
+    if unknown:
+        parser.error(f"unknown models {', '.join(unknown)}; choose from {', '.join(torch_runtime.MODELS)}")
+
+    import torch
+
+    from app import models
+
+    width, height = (int(part) for part in args.image_size.lower().split("x"))
+    images = [_make_image(width, height, seed) for seed in range(max(args.batch_sizes))]
+    started = time.monotonic()
+    rows = measure(models, names, images, args)
+    chosen = {name: choose([row for row in rows if row["model"] == name], args.tolerance) for name in names}
+
+    profile = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "device": models.device,
+            "budget": args.budget,
+            "iterations": args.iterations,
+            "image_size": args.image_size,
+            "elapsed_s": round(time.monotonic() - started, 1),
+        },
+        "threads": max(settings["threads"] for settings in chosen.values()),
+        "models": chosen,
+        "measurements": rows,
+    }
+    output = args.output or torch_runtime.profile_path()
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+        f.write("\n")
+
+    for name, settings in chosen.items():
+        print(
+            f"{name:<6} threads={settings['threads']:<3} channels_last={settings['channels_last']!s:<5} "
+            f"batch={settings['batch_size']:<3} p50 {settings['p50_ms']} ms",
+            file=sys.stderr,
+        )
+    print(f"wrote {output} (process threads {profile['threads']} of budget {args.budget})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
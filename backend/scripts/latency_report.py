@@ -0,0 +1,126 @@
+"""Latency percentiles from the describe/reason run logs.
+
+Streams the live log and its rotated .gz archives line by line and prints
+count, error rate and p50/p95/p99 latency per group:
+
+    python scripts/latency_report.py
+    python scripts/latency_report.py --group-by route,model --since 24h
+    python scripts/latency_report.py logs/describe_runs.jsonl --json
+"""
+import argparse
+import glob
+import gzip
+import json
+import math
+import os
+import sys
+import time
+
+DEFAULT_LOG = os.getenv("DESCRIBE_RUNS_LOG_PATH", "logs/describe_runs.jsonl")
+GROUP_FIELDS = ("event", "model", "route")
+
+
+def _log_files(path: str) -> list[str]:
+    stem, ext = os.path.splitext(path)
+    archives = sorted(glob.glob(f"{glob.escape(stem)}.*{ext}.gz"))
+    return archives + ([path] if os.path.exists(path) else [])
+
+
+def _records(paths: list[str]):
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as lines:
+            for line in lines:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def _route(record: dict) -> str:
+    # Entries written before the slim schema carry no route.
+    return record.get("route") or "/" + str(record.get("event", "")).split("_", 1)[0]
+
+
+def _percentile(sorted_values: list[int], q: float) -> int:
+    # Nearest-rank, so every reported value is one that was actually observed.
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _parse_since(value: str | None) -> float | None:
+    if not value:
+        return None
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1] in units:
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def build_report(paths: list[str], group_by: tuple[str, ...], since: float | None) -> list[dict]:
+    groups: dict[tuple, dict] = {}
+    for record in _records(paths):
+        latency = record.get("latency_ms")
+        if latency is None:
+            continue
+        if since is not None and record.get("ts", 0) < since:
+            continue
+        values = {"event": record.get("event"), "model": record.get("model"), "route": _route(record)}
+        key = tuple(values[field] or "-" for field in group_by)
+        group = groups.setdefault(key, {"latencies": [], "errors": 0})
+        group["latencies"].append(int(latency))
+        if record.get("status") == "error":
+            group["errors"] += 1
+
+    rows = []
+    for key, group in sorted(groups.items()):
+        latencies = sorted(group["latencies"])
+        rows.append(
+            {
+                **dict(zip(group_by, key)),
+                "count": len(latencies),
+                "error_rate": round(group["errors"] / len(latencies), 4),
+                "p50_ms": _percentile(latencies, 50),
+                "p95_ms": _percentile(latencies, 95),
+                "p99_ms": _percentile(latencies, 99),
+                "max_ms": latencies[-1],
+            }
+        )
+    return rows
+
+
+def _print_table(rows: list[dict], group_by: tuple[str, ...]) -> None:
+    columns = list(group_by) + ["count", "error_rate", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    widths = {column: max([len(column)] + [len(str(row[column])) for row in rows]) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(widths[column]) for column in columns))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", nargs="?", default=DEFAULT_LOG, help="live run log; rotated archives next to it are included")
+    parser.add_argument("--group-by", default="event,model,route", help=f"comma-separated subset of {','.join(GROUP_FIELDS)}")
+    parser.add_argument("--since", help="only records newer than this: a unix timestamp or a duration such as 30m, 24h, 7d")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    group_by = tuple(field.strip() for field in args.group_by.split(",") if field.strip())
+    unknown = set(group_by) - set(GROUP_FIELDS)
+    if unknown:
+        parser.error(f"unknown group field(s): {', '.join(sorted(unknown))}")
+
+    paths = _log_files(args.log)
+    if not paths:
+        print(f"no run logs found at {args.log}", file=sys.stderr)
+        return 1
+    rows = build_report(paths, group_by, _parse_since(args.since))
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_table(rows, group_by)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,15 +19,29 @@ create table if not exists public.chat_messages (
   image_name text,
   image_mime_type text,
   image_data text,
+  image_hash text,
   created_at timestamptz not null default timezone('utc', now())
 );
 
+-- Images live in the backend blob store (sha256 addressed); image_data is
+-- only kept for rows written before blob storage and is migrated on read.
+alter table public.chat_messages add column if not exists image_hash text;
+
 create index if not exists idx_chat_rooms_user_id_updated_at
   on public.chat_rooms (user_id, updated_at desc);
 
 create index if not exists idx_chat_messages_room_id_created_at
   on public.chat_messages (room_id, created_at asc);
 
+-- Keyset pagination orders by (created_at, id); including id keeps ties on
+-- created_at inside the index.
+create index if not exists idx_chat_messages_room_id_created_at_id
+  on public.chat_messages (room_id, created_at, id);
+
+create index if not exists idx_chat_messages_room_id_image
+  on public.chat_messages (room_id, created_at desc)
+  where image_hash is not null;
+
 alter table public.chat_rooms enable row level security;
 alter table public.chat_messages enable row level security;
 
@@ -36,6 +36,8 @@ export default function ChatWindow({ currentChatId }) {
   const [selectedFile, setSelectedFile] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
 
   const [modelsLoading, setModelsLoading] = useState(true);
 
@@ -45,6 +47,7 @@ export default function ChatWindow({ currentChatId }) {
 
   const messagesEndRef = useRef(null);
   const previewUrlsRef = useRef([]);
+  const skipScrollRef = useRef(false);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -118,9 +121,11 @@ export default function ChatWindow({ currentChatId }) {
     const isUser = message?.role === "user";
     const mime = message?.image_mime_type || "image/jpeg";
 
-    const imageUrl = message?.image_data
-      ? `data:${mime};base64,${message.image_data}`
-      : undefined;
+    const imageUrl = message?.image_url
+      ? `${apiBaseUrl}${message.image_url}`
+      : message?.image_data
+        ? `data:${mime};base64,${message.image_data}`
+        : undefined;
 
     return {
       id: message?.id || createMessageId(),
@@ -131,10 +136,62 @@ export default function ChatWindow({ currentChatId }) {
         ? new Date(message.created_at)
         : new Date(),
     };
-  }, []);
+  }, [apiBaseUrl]);
+
+  const fetchMessagePage = useCallback(async (token, before) => {
+    // Newest page first; older pages are fetched with the `before` cursor.
+    const params = new URLSearchParams({ include_images: "1", limit: "50" });
+    if (before) params.set("before", before);
+
+    const response = await fetch(
+      `${apiBaseUrl}/chat/rooms/${currentChatId}/messages?${params}`,
+      {
+        headers: { Authorization: `Bearer ${token}` },
+      }
+    );
+
+    const data = await response.json();
+
+    if (!response.ok)
+      throw new Error(data.error || "Failed to load messages");
+
+    return data;
+  }, [apiBaseUrl, currentChatId]);
+
+  const resolveLegacyImages = useCallback(async (token, rows) => {
+    // Rows written before blob storage have an image but no URL in the
+    // listing; the per-message endpoint moves them to a blob on first view.
+    const legacy = rows.filter((row) => row?.has_image && !row?.image_url);
+
+    await Promise.all(
+      legacy.map(async (row) => {
+        try {
+          const response = await fetch(
+            `${apiBaseUrl}/chat/rooms/${currentChatId}/messages/${row.id}/image`,
+            {
+              headers: { Authorization: `Bearer ${token}` },
+            }
+          );
+          const data = await response.json();
+          if (!response.ok || !data.image_url) return;
+
+          setMessages((prev) =>
+            prev.map((message) =>
+              message.id === row.id
+                ? { ...message, imageUrl: `${apiBaseUrl}${data.image_url}` }
+                : message
+            )
+          );
+        } catch (err) {
+          console.error("Load message image failed:", err);
+        }
+      })
+    );
+  }, [apiBaseUrl, currentChatId]);
 
   const loadMessages = useCallback(async () => {
     const token = localStorage.getItem("token");
+    setOlderCursor(null);
 
     if (!token || !currentChatId) {
       setMessages([getWelcomeMessage()]);
@@ -149,18 +206,7 @@ export default function ChatWindow({ currentChatId }) {
     }
 
     try {
-      const response = await fetch(
-        `${apiBaseUrl}/chat/rooms/${currentChatId}/messages`,
-        {
-          headers: { Authorization: `Bearer ${token}` },
-        }
-      );
-
-      const data = await response.json();
-
-      if (!response.ok)
-        throw new Error(data.error || "Failed to load messages");
-
+      const data = await fetchMessagePage(token);
       const rows = data.messages || [];
 
       setMessages(
@@ -168,17 +214,43 @@ export default function ChatWindow({ currentChatId }) {
           ? [getWelcomeMessage()]
           : rows.map(mapServerMessage)
       );
+      setOlderCursor(data.has_more ? data.next_before : null);
+      resolveLegacyImages(token, rows);
     } catch (err) {
       setError(err.message);
       setMessages([getWelcomeMessage()]);
     }
-  }, [apiBaseUrl, currentChatId, mapServerMessage]);
+  }, [currentChatId, fetchMessagePage, mapServerMessage, resolveLegacyImages]);
+
+  const loadOlderMessages = async () => {
+    const token = localStorage.getItem("token");
+    if (!token || !olderCursor || loadingOlder) return;
+
+    setLoadingOlder(true);
+    try {
+      const data = await fetchMessagePage(token, olderCursor);
+      const rows = data.messages || [];
+
+      skipScrollRef.current = true;
+      setMessages((prev) => [...rows.map(mapServerMessage), ...prev]);
+      setOlderCursor(data.has_more ? data.next_before : null);
+      resolveLegacyImages(token, rows);
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
 
   useEffect(() => {
     loadMessages();
   }, [loadMessages]);
 
   useEffect(() => {
+    if (skipScrollRef.current) {
+      skipScrollRef.current = false;
+      return;
+    }
     scrollToBottom();
   }, [messages]);
 
@@ -281,6 +353,19 @@ export default function ChatWindow({ currentChatId }) {
   return (
     <div className="flex-1 flex flex-col overflow-hidden bg-primary">
       <div className="flex-1 overflow-y-auto p-6 space-y-4">
+        {olderCursor && (
+          <div className="flex justify-center">
+            <button
+              type="button"
+              onClick={loadOlderMessages}
+              disabled={loadingOlder}
+              className="text-sm text-text-secondary hover:text-text-primary disabled:opacity-50"
+            >
+              {loadingOlder ? "Loading..." : "Load earlier messages"}
+            </button>
+          </div>
+        )}
+
         {messages.map((msg) => (
           <Message key={msg.id} message={msg} />
         ))}
@@ -33,12 +33,18 @@ const parseExtractionsPayload = (payload) => {
   return [];
 };
 
+// GET /extractions returns one page plus next_cursor/has_more.
+const parseNextCursor = (payload) =>
+  payload?.has_more && payload.next_cursor != null ? payload.next_cursor : null;
+
 export function ExtractionProvider({ children }) {
   const [extractions, setExtractions] = useState([]);
   const [selectedExtraction, setSelectedExtraction] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [activePathPrefix, setActivePathPrefix] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const getCurrentExtraction = useCallback(() => {
     return extractions.find(e => e.id === selectedExtraction);
@@ -51,9 +57,11 @@ export function ExtractionProvider({ children }) {
     try {
       let lastError = null;
       let payload = [];
+      let cursor = null;
       let didLoad = false;
       let firstSuccessfulPrefix = '';
       let firstSuccessfulPayload = [];
+      let firstSuccessfulCursor = null;
 
       for (const prefix of extractionPathPrefixes) {
         try {
@@ -73,10 +81,12 @@ export function ExtractionProvider({ children }) {
           if (!didLoad) {
             firstSuccessfulPrefix = prefix;
             firstSuccessfulPayload = parsedRows;
+            firstSuccessfulCursor = parseNextCursor(parsedPayload);
             didLoad = true;
           }
           if (parsedRows.length > 0) {
             payload = parsedRows;
+            cursor = parseNextCursor(parsedPayload);
             setActivePathPrefix(prefix);
             break;
           }
@@ -90,12 +100,14 @@ export function ExtractionProvider({ children }) {
       }
       if (payload.length === 0) {
         payload = firstSuccessfulPayload;
+        cursor = firstSuccessfulCursor;
         setActivePathPrefix(firstSuccessfulPrefix);
       }
 
       const normalized = payload.map(normalizeExtraction);
 
       setExtractions(normalized);
+      setNextCursor(cursor);
       setSelectedExtraction(prevSelected => {
         if (normalized.length === 0) return null;
         if (prevSelected && normalized.some(item => item.id === prevSelected)) {
@@ -114,6 +126,33 @@ export function ExtractionProvider({ children }) {
     refreshExtractions();
   }, [refreshExtractions]);
 
+  const loadMoreExtractions = useCallback(async () => {
+    if (nextCursor == null || loadingMore) return;
+
+    setLoadingMore(true);
+    setError('');
+    try {
+      const response = await fetch(
+        `${apiBaseUrl}${activePathPrefix}/extractions?cursor=${encodeURIComponent(nextCursor)}`
+      );
+      const parsedPayload = await response.json().catch(() => ({}));
+      if (!response.ok) {
+        throw new Error(parsedPayload?.error || `Failed to load extractions (${response.status})`);
+      }
+
+      const normalized = parseExtractionsPayload(parsedPayload).map(normalizeExtraction);
+      setExtractions(prev => {
+        const seen = new Set(prev.map(item => item.id));
+        return [...prev, ...normalized.filter(item => !seen.has(item.id))];
+      });
+      setNextCursor(parseNextCursor(parsedPayload));
+    } catch (err) {
+      setError(err.message || 'Failed to load extractions');
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [activePathPrefix, loadingMore, nextCursor]);
+
   const addExtraction = useCallback((data) => {
     const normalized = normalizeExtraction(data);
     setExtractions(prev => [normalized, ...prev.filter(item => item.id !== normalized.id)]);
@@ -171,8 +210,11 @@ export function ExtractionProvider({ children }) {
       selectedExtraction,
       loading,
       error,
+      hasMore: nextCursor != null,
+      loadingMore,
       getCurrentExtraction,
       refreshExtractions,
+      loadMoreExtractions,
       addExtraction,
       deleteExtraction,
       setSelectedExtraction
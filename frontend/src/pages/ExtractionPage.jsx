@@ -15,8 +15,11 @@ export default function ExtractionPage() {
     selectedExtraction,
     loading,
     error,
+    hasMore,
+    loadingMore,
     getCurrentExtraction,
     refreshExtractions,
+    loadMoreExtractions,
     deleteExtraction,
     setSelectedExtraction,
   } = useExtraction();
@@ -92,7 +95,9 @@ export default function ExtractionPage() {
             <div className="lg:col-span-1">
               <div className="bg-secondary rounded-lg border border-border p-4 sticky top-20">
                 <h2 className="font-semibold text-light mb-4">Analyzed Images</h2>
-                <p className="text-xs text-text-secondary mb-4">{extractions.length} extraction(s)</p>
+                <p className="text-xs text-text-secondary mb-4">
+                  {extractions.length}{hasMore ? '+' : ''} extraction(s)
+                </p>
                 <div className="space-y-3 max-h-96 overflow-y-auto">
                   {extractions.map(extraction => (
                     <ExtractionCard
@@ -103,6 +108,16 @@ export default function ExtractionPage() {
                       onDelete={handleDeleteExtraction}
                     />
                   ))}
+                  {hasMore && (
+                    <button
+                      type="button"
+                      onClick={loadMoreExtractions}
+                      disabled={loadingMore}
+                      className="w-full py-2 text-sm text-text-secondary hover:text-text-primary disabled:opacity-50"
+                    >
+                      {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                  )}
                 </div>
               </div>
             </div>